@@ -0,0 +1,211 @@
+import bisect
+import cProfile
+import functools
+import json
+import os
+import pstats
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, TypeVar
+
+from langchain_core.messages.ai import UsageMetadata
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+NodeT = TypeVar("NodeT", bound=Callable[..., Any])
+T = TypeVar("T")
+
+
+@dataclass
+class Histogram:
+    buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    counts: list[int] = field(default_factory=list)
+    total: float = 0.0
+    count: int = 0
+
+    def __post_init__(self) -> None:
+        if not self.counts:
+            self.counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def cumulative_counts(self) -> list[int]:
+        cumulative, running = [], 0
+        for bucket_count in self.counts:
+            running += bucket_count
+            cumulative.append(running)
+        return cumulative
+
+
+class AgentMetrics:
+    """Latency histograms per graph node and per tool plus token counters.
+
+    `cache_stats` maps a cache name to an object with `hits` and `misses`
+    counters, read when metrics are exported. Nodes listed in
+    `profile_nodes` also run under cProfile, one profile per node merged
+    from the profiles of its calls. Tool calls run on worker threads, so
+    the "tools" profile comes from `profile_call` around each tool call.
+    On Python 3.12+ only one profiler runs at a time in the process and
+    it sees every thread: a call starting while another one is profiled
+    is left out, and a profile includes work of other threads meanwhile.
+    """
+
+    def __init__(
+        self,
+        profile_nodes: tuple[str, ...] = (),
+        cache_stats: dict[str, Any] | None = None,
+    ) -> None:
+        self._lock = threading.Lock()
+        self.node_latency: dict[str, Histogram] = {}
+        self.tool_latency: dict[str, Histogram] = {}
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cache_stats = cache_stats or {}
+        self.profile_nodes = frozenset(profile_nodes)
+        self.profiles: dict[str, pstats.Stats] = {}
+
+    def observe_node(self, node: str, seconds: float) -> None:
+        with self._lock:
+            self.node_latency.setdefault(node, Histogram()).observe(seconds)
+
+    def observe_tool(self, tool: str, seconds: float) -> None:
+        with self._lock:
+            self.tool_latency.setdefault(tool, Histogram()).observe(seconds)
+
+    def observe_tokens(self, usage: UsageMetadata | None) -> None:
+        if not usage:
+            return
+        with self._lock:
+            self.prompt_tokens += usage["input_tokens"]
+            self.completion_tokens += usage["output_tokens"]
+
+    def profile_call(self, node: str, func: Callable[[], T]) -> T:
+        """Run `func` under its own profiler if `node` is profiled, on any thread
+
+        Args:
+            node (str): node whose profile the call is merged into
+            func (Callable[[], T]): call to run
+
+        Returns:
+            T: result of `func`
+        """
+        if node not in self.profile_nodes:
+            return func()
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another call is profiled and this Python runs one profiler at a time
+            return func()
+        try:
+            return func()
+        finally:
+            profile.disable()
+            with self._lock:
+                if node in self.profiles:
+                    self.profiles[node].add(profile)
+                else:
+                    self.profiles[node] = pstats.Stats(profile)
+
+    def timed_node(self, node: str, func: NodeT, profile: bool = True) -> NodeT:
+        """Wrap a graph node to record its latency and profile it if requested
+
+        Args:
+            node (str): node name
+            func (NodeT): node function
+            profile (bool): False if the node profiles its own work with `profile_call`
+
+        Returns:
+            NodeT: wrapped node function
+        """
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            started_at = time.perf_counter()
+            try:
+                if not profile:
+                    return func(*args, **kwargs)
+                return self.profile_call(node, lambda: func(*args, **kwargs))
+            finally:
+                self.observe_node(node, time.perf_counter() - started_at)
+
+        return wrapper  # pyright: ignore[reportReturnType]
+
+    def dump_profiles(self, directory: str) -> list[str]:
+        """Write one .prof file per profiled node that has run
+
+        Args:
+            directory (str): output directory
+
+        Returns:
+            list[str]: written file paths
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        with self._lock:
+            for node, stats in self.profiles.items():
+                path = os.path.join(directory, f"{node}.prof")
+                stats.dump_stats(path)
+                paths.append(path)
+        return paths
+
+    def _cache_counters(self) -> dict[str, dict[str, int]]:
+        return {
+            name: {"hits": stats.hits, "misses": stats.misses}
+            for name, stats in self.cache_stats.items()
+        }
+
+    def to_json_lines(self) -> str:
+        lines = []
+        with self._lock:
+            for kind, histograms in (("node", self.node_latency), ("tool", self.tool_latency)):
+                for name, histogram in histograms.items():
+                    lines.append(
+                        {
+                            "metric": f"{kind}_latency_seconds",
+                            kind: name,
+                            "count": histogram.count,
+                            "sum": histogram.total,
+                            "buckets": dict(
+                                zip(
+                                    [*map(str, histogram.buckets), "+Inf"],
+                                    histogram.cumulative_counts(),
+                                )
+                            ),
+                        }
+                    )
+            lines.append({"metric": "prompt_tokens", "value": self.prompt_tokens})
+            lines.append({"metric": "completion_tokens", "value": self.completion_tokens})
+        for name, counters in self._cache_counters().items():
+            lines.append({"metric": "cache", "cache": name, **counters})
+        return "".join(json.dumps(line) + "\n" for line in lines)
+
+    def to_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for kind, histograms in (("node", self.node_latency), ("tool", self.tool_latency)):
+                metric = f"agent_{kind}_latency_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                for name, histogram in histograms.items():
+                    bounds = [*map(str, histogram.buckets), "+Inf"]
+                    for bound, count in zip(bounds, histogram.cumulative_counts()):
+                        lines.append(f'{metric}_bucket{{{kind}="{name}",le="{bound}"}} {count}')
+                    lines.append(f'{metric}_sum{{{kind}="{name}"}} {histogram.total}')
+                    lines.append(f'{metric}_count{{{kind}="{name}"}} {histogram.count}')
+            lines.append("# TYPE agent_prompt_tokens_total counter")
+            lines.append(f"agent_prompt_tokens_total {self.prompt_tokens}")
+            lines.append("# TYPE agent_completion_tokens_total counter")
+            lines.append(f"agent_completion_tokens_total {self.completion_tokens}")
+        cache_counters = self._cache_counters()
+        if cache_counters:
+            for counter in ("hits", "misses"):
+                lines.append(f"# TYPE agent_cache_{counter}_total counter")
+                for name, counters in cache_counters.items():
+                    lines.append(
+                        f'agent_cache_{counter}_total{{cache="{name}"}} {counters[counter]}'
+                    )
+        return "\n".join(lines) + "\n"
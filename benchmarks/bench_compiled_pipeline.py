@@ -0,0 +1,71 @@
+"""Invocations per second of `runnable.pipeline`, compiled and not.
+
+`pipeline.invoke` runs the full Runnable machinery for every step,
+`compiled_pipeline` is the same graph flattened by `compile_runnable`.
+"traced" compiles with `trace=True` and passes a callback handler, so
+every call is one traced run. Every variant must return the same roots
+as `pipeline.invoke`. Run from the repository root:
+
+    python -m benchmarks.bench_compiled_pipeline [--calls N]
+"""
+
+import argparse
+import random
+import time
+from typing import Any, Callable
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from runnable import compiled_pipeline, pipeline
+from runnable_compiler import compile_runnable
+
+
+class RunCounter(BaseCallbackHandler):
+    def __init__(self) -> None:
+        self.runs = 0
+
+    def on_chain_start(self, *args: Any, **kwargs: Any) -> None:
+        self.runs += 1
+
+
+def measure(call: Callable[[dict[str, float]], Any], inputs: list[dict[str, float]]) -> float:
+    start = time.perf_counter()
+    for coef in inputs:
+        call(dict(coef))
+    return len(inputs) / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=20_000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    inputs = [
+        {"a": rng.choice([-2.0, -1.0, 1.0, 2.0]), "b": rng.randint(-10, 10), "c": rng.randint(-10, 10)}
+        for _ in range(args.calls)
+    ]
+    counter = RunCounter()
+    traced_pipeline = compile_runnable(pipeline, trace=True)
+    variants = {
+        "pipeline.invoke": pipeline.invoke,
+        "compiled.invoke": compiled_pipeline.invoke,
+        "compiled()": compiled_pipeline,
+        "traced.invoke": lambda coef: traced_pipeline.invoke(coef, {"callbacks": [counter]}),
+    }
+
+    for coef in inputs[:1_000]:
+        expected = pipeline.invoke(dict(coef))
+        for name, call in variants.items():
+            if call(dict(coef)) != expected:
+                raise AssertionError(f"{name} differs from pipeline.invoke for {coef}")
+
+    baseline = measure(pipeline.invoke, inputs)
+    print(f"{'variant':<16} {'calls/s':>10} {'speedup':>8}")
+    for name, call in variants.items():
+        calls_per_second = baseline if name == "pipeline.invoke" else measure(call, inputs)
+        print(f"{name:<16} {calls_per_second:>10.0f} {calls_per_second / baseline:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
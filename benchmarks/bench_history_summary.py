@@ -0,0 +1,108 @@
+"""Order conversations with a bounded history: dropping vs summarizing old turns.
+
+Every turn asks `order_tool.respond` to create an order; the scripted
+model calls `create_order` and then answers. The summarizer is a stub
+sleeping `--summary-latency` seconds, as a model call would. "drop" is the
+plain token budget history, "inline" summarizes dropped turns inside the
+turn and "background" uses `SummarizingChatMessageHistory` on its worker
+thread. Prompt tokens are the history tokens sent with the last turn,
+orders kept counts the created order ids still visible in that history.
+Run from the repository root:
+
+    python -m benchmarks.bench_history_summary [--turns N] [--summary-latency S]
+"""
+
+import argparse
+import os
+import re
+import statistics
+import time
+from concurrent.futures import Executor, Future
+from typing import Any, Callable
+
+from langchain_core.messages import BaseMessage, get_buffer_string
+from langchain_core.messages.utils import count_tokens_approximately
+
+from llm_factory import set_model_factory
+from scripted_chat_model import ScriptedModelFactory, scripted_response
+
+for name in ("API_PROVIDER", "API_KEY", "TAVILY_API_KEY"):
+    os.environ.setdefault(name, "scripted")
+
+QUESTION = "Please create a new order for me, I will tell you the items for it a bit later. " * 3
+SUMMARY_WORDS = 60
+
+
+class InlineExecutor(Executor):
+    def submit(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Future[Any]:
+        future: Future[Any] = Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+
+def stub_summarizer(latency: float) -> Callable[[str, list[BaseMessage]], str]:
+    def summarize(summary: str, messages: list[BaseMessage]) -> str:
+        time.sleep(latency)
+        return " ".join(f"{summary} {get_buffer_string(messages)}".split()[-SUMMARY_WORDS:])
+
+    return summarize
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=15)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--summary-latency", type=float, default=0.5)
+    parser.add_argument("--max-tokens", type=int, default=600)
+    parser.add_argument("--summary-tokens", type=int, default=200)
+    args = parser.parse_args()
+
+    set_model_factory(
+        ScriptedModelFactory(
+            [
+                scripted_response(tool_calls=[("create_order", {})]),
+                scripted_response("Your order is created, what should I add?"),
+            ],
+            latency=args.latency,
+        )
+    )
+    import order_tool
+    from order_store import get_order_store
+    from summary_memory import SummarizingChatMessageHistory, summary_executor
+    from token_budget import TokenBudgetChatMessageHistory
+
+    def open_history(mode: str) -> Any:
+        if mode == "drop":
+            return TokenBudgetChatMessageHistory(args.max_tokens)
+        return SummarizingChatMessageHistory(
+            TokenBudgetChatMessageHistory(args.max_tokens),
+            stub_summarizer(args.summary_latency),
+            order_tool.order_facts,
+            args.summary_tokens,
+            InlineExecutor() if mode == "inline" else summary_executor,
+        )
+
+    print(f"{'history':<11} {'p50 turn s':>10} {'max turn s':>10} {'prompt tokens':>14} {'orders kept':>12}")
+    for mode in ("drop", "inline", "background"):
+        history = open_history(mode)
+        order_tool.session_histories[mode] = history
+        created = get_order_store().get_orders()
+        seconds = []
+        for _ in range(args.turns):
+            start = time.perf_counter()
+            for _ in order_tool.respond(QUESTION, session_id=mode):
+                pass
+            seconds.append(time.perf_counter() - start)
+        created = sorted(set(get_order_store().get_orders()) - set(created))
+        if mode == "background":
+            history.wait_for_summary()
+        text = get_buffer_string(history.messages)
+        kept = sum(bool(re.search(rf"\b(order|Tool:) {order_id}\b", text)) for order_id in created)
+        print(
+            f"{mode:<11} {statistics.median(seconds):>10.3f} {max(seconds):>10.3f} "
+            f"{count_tokens_approximately(history.messages):>14} {f'{kept}/{len(created)}':>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
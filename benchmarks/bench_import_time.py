@@ -0,0 +1,68 @@
+"""Cold start of the bots: import time in fresh interpreters.
+
+Every sample starts a new Python process, so nothing is shared between
+samples except the OS page cache. `import` is the time of the module
+import alone, `process` the wall time of the whole interpreter run. Run
+from the repository root:
+
+    python -m benchmarks.bench_import_time [--repeat N] [--modules m1,m2]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+DEFAULT_MODULES = (
+    "settings",
+    "llm_factory",
+    "cli",
+    "langgraph_agent",
+    "order_tool",
+    "order_tool_agent",
+    "parser",
+)
+
+IMPORT_SNIPPET = """
+import time
+started_at = time.perf_counter()
+import {module}
+print(time.perf_counter() - started_at)
+"""
+
+
+def sample(module: str, env: dict[str, str]) -> tuple[float, float]:
+    started_at = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", IMPORT_SNIPPET.format(module=module)],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1]), time.perf_counter() - started_at
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--modules", default=",".join(DEFAULT_MODULES))
+    args = parser.parse_args()
+
+    env = {**os.environ}
+    for name in ("API_PROVIDER", "API_KEY", "TAVILY_API_KEY"):
+        env.setdefault(name, "scripted")
+
+    print(f"{'module':<18} {'import ms':>10} {'process ms':>11}  (median of {args.repeat})")
+    for module in args.modules.split(","):
+        sample(module, env)
+        samples = [sample(module, env) for _ in range(args.repeat)]
+        import_time = statistics.median(import_seconds for import_seconds, _ in samples)
+        process_time = statistics.median(process_seconds for _, process_seconds in samples)
+        print(f"{module:<18} {import_time * 1000:>10.1f} {process_time * 1000:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
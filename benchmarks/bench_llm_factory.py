@@ -0,0 +1,83 @@
+"""Per-step model overhead: a new client per step vs the shared factory.
+
+Both variants call a local stub endpoint, so the numbers are the client
+side overhead plus a loopback round trip. Run from the repository root:
+
+    python -m benchmarks.bench_llm_factory [--steps N]
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+from langchain_core.messages import HumanMessage
+from langchain_core.tools import tool
+from langchain_mistralai import ChatMistralAI
+from pydantic import SecretStr
+
+from benchmarks.stub_endpoint import StubHandler, start_stub_endpoint
+from llm_factory import ChatModelFactory
+
+MODEL = "mistral-large-latest"
+
+
+@tool
+def get_this_year_tool() -> int:
+    """Return current year"""
+    return datetime.now().year
+
+
+@tool
+def search_stub(query: str) -> str:
+    """Search stub"""
+    return query
+
+
+TOOLS = [get_this_year_tool, search_stub]
+MESSAGES = [HumanMessage(content="ping")]
+
+
+def per_step_client(base_url: str) -> None:
+    model = ChatMistralAI(
+        model=MODEL,  # pyright: ignore[reportCallIssue]
+        temperature=0,
+        api_key=SecretStr("stub"),
+        base_url=base_url,
+    )
+    model.bind_tools(TOOLS).invoke(MESSAGES)
+
+
+def report(name: str, seconds: float, steps: int) -> None:
+    connections = len(StubHandler.connections)
+    print(f"{name:<20} {seconds / steps * 1000:8.3f} ms/step  {connections:5} connections")
+    StubHandler.connections.clear()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--steps", type=int, default=300)
+    args = parser.parse_args()
+
+    server, base_url = start_stub_endpoint()
+    factory = ChatModelFactory("stub", base_url)
+
+    per_step_client(base_url)
+    factory.chat_model_with_tools(MODEL, TOOLS).invoke(MESSAGES)
+    StubHandler.connections.clear()
+
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        per_step_client(base_url)
+    report("client per step", time.perf_counter() - start, args.steps)
+
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        factory.chat_model_with_tools(MODEL, TOOLS).invoke(MESSAGES)
+    report("shared factory", time.perf_counter() - start, args.steps)
+
+    factory.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Latency of order questions: always the large model vs `ModelRouter`.
+
+Both models are scripted with the order tools bound: the small one
+answers after `--small-latency` seconds and every `--bad-every`-th of its
+answers calls a tool with invalid arguments, the large one answers after
+`--large-latency` seconds. The router sends the questions to the small
+model and escalates answers failing the tool call check. Run from the
+repository root:
+
+    python -m benchmarks.bench_model_router [--requests N] [--bad-every N] [--log]
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import time
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from model_router import ModelRouter
+from scripted_chat_model import ScriptedChatModel, scripted_response
+
+for name in ("API_PROVIDER", "API_KEY", "TAVILY_API_KEY"):
+    os.environ.setdefault(name, "scripted")
+
+GOOD_ANSWER = scripted_response(tool_calls=[("get_order_items", {"order_id": 1})])
+BAD_ANSWER = scripted_response(tool_calls=[("get_order_items", {"order": "first"})])
+MESSAGES = [
+    SystemMessage(content="You are an expert in online shop assistent. Your task help consumers"),
+    HumanMessage(content="What is in my order 1?"),
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--small-latency", type=float, default=0.15)
+    parser.add_argument("--large-latency", type=float, default=0.6)
+    parser.add_argument("--bad-every", type=int, default=5)
+    parser.add_argument("--log", action="store_true", help="print routing decisions")
+    args = parser.parse_args()
+    if args.log:
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    from order_tools import tools
+
+    small_responses = [GOOD_ANSWER] * (args.bad_every - 1) + [BAD_ANSWER]
+    small = ScriptedChatModel(responses=small_responses, latency=args.small_latency)
+    large = ScriptedChatModel(responses=[GOOD_ANSWER], latency=args.large_latency)
+    router = ModelRouter(small, large).bind_tools(list(tools.values()))
+    large_only = large.bind_tools(list(tools.values()))
+
+    print(f"{'model':<12} {'mean s':>7} {'p95 s':>7} {'small':>6} {'large':>6} {'escalated':>10}")
+    for name, model in (("large only", large_only), ("router", router)):
+        seconds = []
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            answer = model.invoke(MESSAGES)
+            seconds.append(time.perf_counter() - start)
+            if answer.tool_calls[0]["args"] != {"order_id": 1}:
+                raise AssertionError(f"{name} returned an invalid tool call")
+        stats = router.stats if model is router else None
+        print(
+            f"{name:<12} {statistics.mean(seconds):>7.3f} "
+            f"{statistics.quantiles(seconds, n=20)[-1]:>7.3f} "
+            f"{stats.small if stats else 0:>6} {stats.large if stats else args.requests:>6} "
+            f"{stats.escalated if stats else 0:>10}"
+        )
+    print(f"router estimated saving: {router.stats.saved_seconds:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Model round trips per order scenario, single-item tools vs bulk tools.
+
+Every scenario runs the `order_tool_agent` AgentExecutor twice: once with
+the single-item tools only ("before") and once with the bulk tools too
+("after"), each on a fresh in-memory order store.
+
+Only `--live` measures round trips: the configured model chooses the
+tool calls, and the model calls and wall time of both runs are
+reported. Without it the model is a `ScriptedChatModel` replaying
+hand-written tool calls for each tool set. Its call counts are just the
+script lengths, so that mode only checks that both tool sets leave the
+expected order items. Run from the repository root:
+
+    python -m benchmarks.bench_order_round_trips [--live]
+"""
+
+import argparse
+import os
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from langchain_classic.agents import AgentExecutor, create_tool_calling_agent
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage
+
+from llm_factory import get_chat_model
+from order_store import InMemoryOrderStore, set_order_store
+from scripted_chat_model import ScriptedChatModel, scripted_response
+
+for name in ("API_PROVIDER", "API_KEY", "TAVILY_API_KEY"):
+    os.environ.setdefault(name, "scripted")
+
+SINGLE_ITEM_TOOLS = (
+    "create_order",
+    "add_item_to_order",
+    "remove_item_from_order",
+    "get_order_items",
+    "get_orders",
+)
+
+
+def calls(*tool_calls: tuple[str, dict[str, Any]]) -> AIMessage:
+    return scripted_response(tool_calls=tool_calls)
+
+
+def adds(order_id: int, item_ids: range) -> AIMessage:
+    return calls(
+        *[("add_item_to_order", {"order_id": order_id, "item_id": item_id}) for item_id in item_ids]
+    )
+
+
+@dataclass
+class Scenario:
+    name: str
+    question: str
+    initial_items: list[int]
+    expected_items: list[int]
+    before: list[AIMessage]
+    after: list[AIMessage]
+
+
+DONE = scripted_response("Done.")
+
+SCENARIOS = [
+    Scenario(
+        "new order, 10 items",
+        "Create an order with items 1 to 10",
+        [],
+        list(range(1, 11)),
+        [
+            calls(("create_order", {})),
+            adds(1, range(1, 4)),
+            adds(1, range(4, 7)),
+            adds(1, range(7, 11)),
+            DONE,
+        ],
+        [calls(("create_order_with_items", {"item_ids": list(range(1, 11))})), DONE],
+    ),
+    Scenario(
+        "add 5 items",
+        "Add items 11 to 15 to order 1",
+        [1, 2],
+        [1, 2, *range(11, 16)],
+        [adds(1, range(11, 13)), adds(1, range(13, 16)), DONE],
+        [calls(("add_items_to_order", {"order_id": 1, "item_ids": list(range(11, 16))})), DONE],
+    ),
+    Scenario(
+        "remove 3 items",
+        "Remove items 1, 2 and 3 from order 1",
+        [1, 2, 3, 4],
+        [4],
+        [
+            calls(("remove_item_from_order", {"order_id": 1, "item_id": 1})),
+            calls(
+                ("remove_item_from_order", {"order_id": 1, "item_id": 2}),
+                ("remove_item_from_order", {"order_id": 1, "item_id": 3}),
+            ),
+            DONE,
+        ],
+        [calls(("remove_items_from_order", {"order_id": 1, "item_ids": [1, 2, 3]})), DONE],
+    ),
+]
+
+
+class ModelCallCounter(BaseCallbackHandler):
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def on_chat_model_start(self, *args: Any, **kwargs: Any) -> None:
+        self.calls += 1
+
+
+def run(scenario: Scenario, bulk: bool, latency: float, live: bool) -> tuple[int, float, list[int]]:
+    import order_tool_agent
+
+    store = InMemoryOrderStore()
+    if scenario.initial_items:
+        store.create_order(scenario.initial_items)
+    set_order_store(store)
+
+    if live:
+        model = get_chat_model("mistral-large-latest")
+    else:
+        model = ScriptedChatModel(
+            responses=scenario.after if bulk else scenario.before, latency=latency
+        )
+    tools = [
+        tool for name, tool in order_tool_agent.tools.items() if bulk or name in SINGLE_ITEM_TOOLS
+    ]
+    agent = create_tool_calling_agent(model, tools, order_tool_agent.prompt)
+    executor = AgentExecutor(agent=agent, tools=tools)  # pyright: ignore[reportArgumentType]
+
+    counter = ModelCallCounter()
+    start = time.perf_counter()
+    executor.invoke(
+        {"input": scenario.question, "chat_history": []}, {"callbacks": [counter]}
+    )
+    elapsed = time.perf_counter() - start
+    return counter.calls, elapsed, sorted(store.get_order_items(1)) if store.get_orders() else []
+
+
+def check_scripted(latency: float) -> None:
+    print(f"{'scenario':<22} {'single-item tools':>17} {'bulk tools':>10}")
+    for scenario in SCENARIOS:
+        outcomes = []
+        for bulk in (False, True):
+            _, _, items = run(scenario, bulk, latency, live=False)
+            if items != scenario.expected_items:
+                raise AssertionError(f"{scenario.name}: {items} != {scenario.expected_items}")
+            outcomes.append("ok")
+        print(f"{scenario.name:<22} {outcomes[0]:>17} {outcomes[1]:>10}")
+    print("scripted tool calls: run with --live to count model round trips")
+
+
+def measure_live() -> None:
+    print(
+        f"{'scenario':<22} {'calls before':>12} {'calls after':>11} "
+        f"{'s before':>9} {'s after':>8} {'items':>8}"
+    )
+    for scenario in SCENARIOS:
+        calls_before, seconds_before, items_before = run(scenario, False, 0.0, live=True)
+        calls_after, seconds_after, items_after = run(scenario, True, 0.0, live=True)
+        correct = items_before == items_after == scenario.expected_items
+        print(
+            f"{scenario.name:<22} {calls_before:>12} {calls_after:>11} "
+            f"{seconds_before:>9.2f} {seconds_after:>8.2f} {'ok' if correct else 'wrong':>8}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.0, help="scripted model latency")
+    parser.add_argument("--live", action="store_true", help="measure with the configured model")
+    args = parser.parse_args()
+
+    if args.live:
+        measure_live()
+    else:
+        check_scripted(args.latency)
+
+
+if __name__ == "__main__":
+    main()
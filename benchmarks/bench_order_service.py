@@ -0,0 +1,126 @@
+"""Throughput and consistency of the order service with several bot workers.
+
+Starts `order_service` in a subprocess, then runs 1, 2, 4... worker
+processes, each with `--threads` threads sharing one `RemoteOrderStore`.
+Every thread creates orders and adds and removes items on its own orders
+and on a few orders shared by all workers. At the end every order id must
+be unique and the shared orders must hold exactly the items that were
+added and not removed. Run from the repository root:
+
+    python -m benchmarks.bench_order_service [--workers N] [--threads N] [--ops N] [--sqlite]
+"""
+
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from order_service import RemoteOrderStore
+
+SHARED_ORDERS = 4
+
+
+def wait_for_service(address: str, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            RemoteOrderStore(address).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+def thread_ops(store: RemoteOrderStore, shared: list[int], ops: int, seed: int) -> list[int]:
+    created = []
+    for index in range(ops // 4):
+        order_id = store.create_order([seed])
+        created.append(order_id)
+        store.add_items(order_id, [index, index + 1])
+        shared_id = shared[index % len(shared)]
+        store.add_items(shared_id, [seed, seed])
+        store.remove_item(shared_id, seed)
+    return created
+
+
+def worker(address: str, shared: list[int], threads: int, ops: int, worker_id: int) -> list[int]:
+    store = RemoteOrderStore(address)
+    try:
+        with ThreadPoolExecutor(threads) as executor:
+            results = executor.map(
+                lambda thread_id: thread_ops(store, shared, ops, worker_id * 1000 + thread_id),
+                range(threads),
+            )
+            return [order_id for created in results for order_id in created]
+    finally:
+        store.close()
+
+
+def run(address: str, workers: int, threads: int, ops: int) -> None:
+    store = RemoteOrderStore(address)
+    shared = [store.create_order() for _ in range(SHARED_ORDERS)]
+    before = {order_id: Counter(store.get_order_items(order_id)) for order_id in shared}
+
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        created = pool.starmap(
+            worker, [(address, shared, threads, ops, worker_id) for worker_id in range(workers)]
+        )
+    elapsed = time.perf_counter() - start
+
+    order_ids = [order_id for worker_created in created for order_id in worker_created]
+    if len(set(order_ids)) != len(order_ids):
+        raise AssertionError("duplicate order ids")
+    expected = Counter(
+        worker_id * 1000 + thread_id
+        for worker_id in range(workers)
+        for thread_id in range(threads)
+        for _ in range(ops // 4)
+    )
+    actual = sum(
+        (Counter(store.get_order_items(order_id)) - before[order_id] for order_id in shared),
+        Counter(),
+    )
+    if actual != expected:
+        raise AssertionError("shared orders lost updates")
+    store.close()
+
+    calls = workers * threads * (ops // 4) * 4
+    print(f"{workers:>8} {threads:>8} {calls:>8} {elapsed:>9.2f} {calls / elapsed:>10.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--ops", type=int, default=2_000, help="store calls per thread")
+    parser.add_argument("--sqlite", action="store_true")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    address = f"unix:{os.path.join(directory, 'orders.sock')}"
+    command = [sys.executable, "-m", "order_service", "--address", address]
+    if args.sqlite:
+        command += ["--store", os.path.join(directory, "orders.db")]
+    service = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    try:
+        wait_for_service(address)
+        print(f"backend: {'sqlite' if args.sqlite else 'memory'}")
+        print(f"{'workers':>8} {'threads':>8} {'calls':>8} {'seconds':>9} {'calls/s':>10}")
+        workers = 1
+        while workers <= args.workers:
+            run(address, workers, args.threads, args.ops)
+            workers *= 2
+    finally:
+        service.terminate()
+        service.wait()
+
+
+if __name__ == "__main__":
+    main()
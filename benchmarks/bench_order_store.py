@@ -0,0 +1,81 @@
+"""Per-operation latency of the order store as the number of orders grows.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_order_store [--sqlite PATH] [--max-orders N]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from typing import Callable
+
+from order_store import InMemoryOrderStore, OrderStore, SqliteOrderStore
+
+SAMPLES = 2_000
+
+
+def measure(operation: Callable[[], object], samples: int = SAMPLES) -> float:
+    start = time.perf_counter_ns()
+    for _ in range(samples):
+        operation()
+    return (time.perf_counter_ns() - start) / samples / 1000
+
+
+def fill(store: OrderStore, count: int) -> None:
+    for _ in range(count):
+        order_id = store.create_order()
+        store.add_item(order_id, order_id % 100)
+
+
+def run(store: OrderStore, max_orders: int) -> None:
+    print(f"{'orders':>10} {'create':>9} {'add':>9} {'remove':>9} {'items':>9}  (us/op)")
+    filled = 0
+    size = 1_000
+    while size <= max_orders:
+        fill(store, size - filled)
+        filled = size
+
+        def add() -> None:
+            store.add_item(random.randint(1, filled), random.randint(0, 99))
+
+        def remove() -> None:
+            order_id = random.randint(1, filled)
+            store.add_item(order_id, 7)
+            store.remove_item(order_id, 7)
+
+        def items() -> None:
+            store.get_order_items(random.randint(1, filled))
+
+        print(
+            f"{size:>10} {measure(store.create_order):>9.2f} {measure(add):>9.2f} "
+            f"{measure(remove) / 2:>9.2f} {measure(items):>9.2f}"
+        )
+        filled += SAMPLES
+        size *= 10
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sqlite", nargs="?", const="", default=None)
+    parser.add_argument("--max-orders", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    if args.sqlite is None:
+        print("backend: memory")
+        run(InMemoryOrderStore(), args.max_orders)
+        return
+
+    path = args.sqlite or os.path.join(tempfile.mkdtemp(), "orders.db")
+    print(f"backend: sqlite ({path})")
+    store = SqliteOrderStore(path)
+    try:
+        run(store, args.max_orders)
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
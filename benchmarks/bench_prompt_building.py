@@ -0,0 +1,123 @@
+"""Per-turn CPU time and allocations of prompt building in the domain bots.
+
+Only the work around the model call is measured: building the prompt
+messages for a turn and collecting the streamed answer chunks into the
+history. The model stream is a prebuilt list of chunks. "before" is the
+previous code of the bots: a deque copied every turn, the whole template
+rendered through `ChatPromptTemplate.invoke` and the answer built with
+`+=`. "after" uses `prompt_window`. For `simple_domain_bot_2` only the
+prompt rendering differs, so its answer is a fixed message. Run from the
+repository root:
+
+    python -m benchmarks.bench_prompt_building [--turns N] [--chunks N]
+"""
+
+import argparse
+import time
+import tracemalloc
+from collections import deque
+from typing import Callable
+
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+from prompt_window import PromptWindow, render_system_message
+
+SYSTEM_TEMPLATE = "You are expert in {domain}. Your task in answer the question as short as possible"
+DOMAIN = "astronomy"
+MAX_MESSAGES = 10
+QUESTION = "Why is the sky blue and why are sunsets red?"
+ANSWER = AIMessage(content="Rayleigh scattering of sunlight.")
+
+Turn = Callable[[list[AIMessageChunk]], None]
+
+
+def domain_bot_before() -> Turn:
+    prompt_template = ChatPromptTemplate(
+        [("system", SYSTEM_TEMPLATE), MessagesPlaceholder("history")]
+    )
+    history = deque(maxlen=MAX_MESSAGES)
+
+    def turn(chunks: list[AIMessageChunk]) -> None:
+        history.append(HumanMessage(content=QUESTION))
+        prompt_value = prompt_template.invoke({"domain": DOMAIN, "history": list(history)})
+        prompt_value.to_messages()
+        full_ai_content = ""
+        for chunk in chunks:
+            if isinstance(chunk.content, str):
+                full_ai_content += chunk.content
+        history.append(AIMessage(content=full_ai_content))
+
+    return turn
+
+
+def domain_bot_after() -> Turn:
+    window = PromptWindow(render_system_message(SYSTEM_TEMPLATE, DOMAIN), MAX_MESSAGES)
+
+    def turn(chunks: list[AIMessageChunk]) -> None:
+        window.append(HumanMessage(content=QUESTION))
+        window.messages
+        answer_chunks = [chunk.content for chunk in chunks if isinstance(chunk.content, str)]
+        window.append(AIMessage(content="".join(answer_chunks)))
+
+    return turn
+
+
+def domain_bot_2_prompt(pre_rendered: bool) -> Turn:
+    system = render_system_message(SYSTEM_TEMPLATE, DOMAIN) if pre_rendered else ("system", SYSTEM_TEMPLATE)
+    prompt = ChatPromptTemplate([system, MessagesPlaceholder("history"), ("human", "{question}")])
+    window = PromptWindow(render_system_message(SYSTEM_TEMPLATE, DOMAIN), MAX_MESSAGES)
+    variables = {} if pre_rendered else {"domain": DOMAIN}
+
+    def turn(chunks: list[AIMessageChunk]) -> None:
+        prompt.invoke({**variables, "history": window.history, "question": QUESTION})
+        window.append(HumanMessage(content=QUESTION))
+        window.append(ANSWER)
+
+    return turn
+
+
+def measure(turn: Turn, chunks: list[AIMessageChunk], turns: int) -> tuple[float, float]:
+    for _ in range(MAX_MESSAGES):
+        turn(chunks)
+
+    start = time.process_time()
+    for _ in range(turns):
+        turn(chunks)
+    cpu = (time.process_time() - start) / turns
+
+    tracemalloc.start()
+    peak_bytes = 0
+    alloc_turns = max(turns // 10, 1)
+    for _ in range(alloc_turns):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        turn(chunks)
+        peak_bytes += tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    return cpu, peak_bytes / alloc_turns
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=2_000)
+    parser.add_argument("--chunks", type=int, default=300, help="streamed chunks per answer")
+    args = parser.parse_args()
+
+    chunks = [AIMessageChunk(content=f" word{index}") for index in range(args.chunks)]
+    cases = [
+        ("simple_domain_bot", domain_bot_before(), domain_bot_after()),
+        ("simple_domain_bot_2", domain_bot_2_prompt(False), domain_bot_2_prompt(True)),
+    ]
+    print(f"{'bot':<20} {'us before':>10} {'us after':>9} {'KiB before':>11} {'KiB after':>10}  (per turn)")
+    for name, before, after in cases:
+        cpu_before, peak_before = measure(before, chunks, args.turns)
+        cpu_after, peak_after = measure(after, chunks, args.turns)
+        print(
+            f"{name:<20} {cpu_before * 1e6:>10.1f} {cpu_after * 1e6:>9.1f} "
+            f"{peak_before / 1024:>11.1f} {peak_after / 1024:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
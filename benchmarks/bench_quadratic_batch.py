@@ -0,0 +1,52 @@
+"""Per-row `pipeline.invoke` vs the vectorized quadratic solver.
+
+The per-row pipeline is timed on `--sample` rows and extrapolated to
+`--rows` unless `--full` is given. Run from the repository root:
+
+    python -m benchmarks.bench_quadratic_batch [--rows N] [--sample N] [--full]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from runnable import batch_pipeline, pipeline, solve_quadratic_batch
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--sample", type=int, default=20_000)
+    parser.add_argument("--full", action="store_true")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    a = rng.choice([-2.0, -1.0, 1.0, 2.0], size=args.rows)
+    b = rng.integers(-10, 10, size=args.rows).astype(np.float64)
+    c = rng.integers(-10, 10, size=args.rows).astype(np.float64)
+    rows = [{"a": a[i], "b": b[i], "c": c[i]} for i in range(args.rows)]
+
+    sample = args.rows if args.full else min(args.sample, args.rows)
+    start = time.perf_counter()
+    for row in rows[:sample]:
+        pipeline.invoke(dict(row))
+    per_row = (time.perf_counter() - start) / sample * args.rows
+
+    start = time.perf_counter()
+    solve_quadratic_batch(a, b, c)
+    arrays = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch_pipeline.batch(rows)
+    runnable_batch = time.perf_counter() - start
+
+    estimated = "" if sample == args.rows else f" (estimated from {sample} rows)"
+    print(f"rows: {args.rows}")
+    print(f"pipeline.invoke per row:      {per_row:9.3f}s{estimated}")
+    print(f"batch_pipeline.batch (dicts): {runnable_batch:9.3f}s  x{per_row / runnable_batch:.0f}")
+    print(f"solve_quadratic_batch:        {arrays:9.3f}s  x{per_row / arrays:.0f}")
+
+
+if __name__ == "__main__":
+    main()
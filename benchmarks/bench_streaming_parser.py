@@ -0,0 +1,108 @@
+"""Person extraction: parsing the full completion vs streaming with early abort.
+
+Every scenario is a scripted model answer streamed word by word with
+`--latency` seconds before the first token and `--token-latency` seconds
+between tokens. "full" reads the whole completion and runs
+`PydanticOutputParser`, "stream" feeds the chunks to
+`StreamingPydanticOutputParser`, which closes the stream once the object
+is complete or cannot be valid. Tokens are the chunks the model actually
+generated. Run from the repository root:
+
+    python -m benchmarks.bench_streaming_parser [--latency S] [--token-latency S]
+"""
+
+import argparse
+import os
+import time
+from typing import Any
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.exceptions import OutputParserException
+
+from llm_factory import set_model_factory
+from scripted_chat_model import ScriptedModelFactory, scripted_response
+
+for name in ("API_PROVIDER", "API_KEY", "TAVILY_API_KEY"):
+    os.environ.setdefault(name, "scripted")
+
+EXPLANATION = " ".join(["The text says he is eighteen years old and wants to move to the city."] * 4)
+PERSON_JSON = '{"firstname": "Генрих", "lastname": "Смит", "age": 18}'
+SCENARIOS = {
+    "valid": f"```json\n{PERSON_JSON}\n```\n{EXPLANATION}",
+    "wrong field type": '{"firstname": "Генрих", "lastname": "Смит", "age": {"years": 18, '
+    + f'"explanation": "{EXPLANATION}"}}}}',
+    "off schema": '{"firstname": "Генрих Смит", "lastname": null, "notes": "' + EXPLANATION + '"}',
+    "prose answer": f"Генрих Смит is a young man. {EXPLANATION} {EXPLANATION}",
+}
+QUERY = "Генрих Смит был восемнацдцателетним юношей, мечтающим уехать в город"
+
+
+class TokenCounter(BaseCallbackHandler):
+    def __init__(self) -> None:
+        self.tokens = 0
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        self.tokens += 1
+
+
+def run_full(chain: Any, output_parser: Any) -> tuple[str, float, int]:
+    counter = TokenCounter()
+    start = time.perf_counter()
+    chunks = [chunk.text for chunk in chain.stream({"user_query": QUERY}, {"callbacks": [counter]})]
+    try:
+        output_parser.parse("".join(chunks))
+        outcome = "ok"
+    except OutputParserException:
+        outcome = "error"
+    return outcome, time.perf_counter() - start, counter.tokens
+
+
+def run_stream(chain: Any, streaming_parser: Any) -> tuple[str, float | None, float, int]:
+    counter = TokenCounter()
+    start = time.perf_counter()
+    first_field = None
+    outcome = "ok"
+    try:
+        for _ in streaming_parser.parse_stream(
+            chain.stream({"user_query": QUERY}, {"callbacks": [counter]})
+        ):
+            if first_field is None:
+                first_field = time.perf_counter() - start
+    except OutputParserException:
+        outcome = "error"
+    return outcome, first_field, time.perf_counter() - start, counter.tokens
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--token-latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    factory = ScriptedModelFactory([], args.latency, args.token_latency)
+    set_model_factory(factory)
+    from parser import Person, get_streaming_extraction_chain, output_parser
+    from streaming_parser import StreamingPydanticOutputParser
+
+    streaming_extraction_chain = get_streaming_extraction_chain()
+    print(
+        f"{'scenario':<18} {'result':>7} {'full s':>7} {'tokens':>7} "
+        f"{'stream s':>9} {'first field s':>14} {'tokens':>7}"
+    )
+    for name, answer in SCENARIOS.items():
+        factory.model.responses = [scripted_response(answer)]
+        outcome, full_seconds, full_tokens = run_full(streaming_extraction_chain, output_parser)
+        stream_outcome, first_field, stream_seconds, stream_tokens = run_stream(
+            streaming_extraction_chain, StreamingPydanticOutputParser(Person)
+        )
+        if stream_outcome != outcome:
+            raise AssertionError(f"{name}: {outcome} with full parsing, {stream_outcome} streaming")
+        first_field_text = "-" if first_field is None else f"{first_field:.2f}"
+        print(
+            f"{name:<18} {outcome:>7} {full_seconds:>7.2f} {full_tokens:>7} "
+            f"{stream_seconds:>9.2f} {first_field_text:>14} {stream_tokens:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Wall time of sequential vs concurrent tool calls with slow stub tools.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_tool_runner
+"""
+
+import time
+
+from langchain_core.messages import ToolCall
+from langchain_core.tools import BaseTool, tool
+
+from tool_runner import run_tool_calls
+
+DELAYS = [0.2, 0.4, 0.3, 0.5, 0.1]
+
+
+def make_stub_tool(index: int, delay: float) -> BaseTool:
+    @tool(f"stub_{index}")
+    def stub(query: str) -> str:
+        """Slow stub lookup"""
+        time.sleep(delay)
+        return f"{query} after {delay}s"
+
+    return stub
+
+
+def main() -> None:
+    stub_tools = [make_stub_tool(index, delay) for index, delay in enumerate(DELAYS)]
+    tools_by_name = {stub_tool.name: stub_tool for stub_tool in stub_tools}
+    tool_calls = [
+        ToolCall(name=stub_tool.name, args={"query": "q"}, id=f"call_{index}")
+        for index, stub_tool in enumerate(stub_tools)
+    ]
+
+    start = time.perf_counter()
+    for tool_call in tool_calls:
+        tools_by_name[tool_call["name"]].invoke(tool_call["args"])
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    outputs = run_tool_calls(tool_calls, tools_by_name)
+    concurrent = time.perf_counter() - start
+    assert [output.tool_call_id for output in outputs] == [c["id"] for c in tool_calls]
+
+    start = time.perf_counter()
+    outputs = run_tool_calls(tool_calls, tools_by_name, timeouts={"stub_3": 0.25})
+    with_timeout = time.perf_counter() - start
+    timed_out = [output.name for output in outputs if output.status == "error"]
+
+    print(f"slowest call:        {max(DELAYS):.3f}s")
+    print(f"sequential:          {sequential:.3f}s")
+    print(f"concurrent:          {concurrent:.3f}s")
+    print(f"concurrent, timeout: {with_timeout:.3f}s (errors: {timed_out})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Framework overhead per turn of the chat entry points, without network.
+
+Every entry point runs against a `ScriptedChatModel` that answers a tool
+call first and text second. Overhead is the wall time minus the simulated
+model latency. Peak traced memory per turn is measured in a separate
+pass. Run from the repository root:
+
+    python -m benchmarks.bench_turn_overhead [--turns N] [--latency S] [--budget-ms MS]
+
+With `--budget-ms` the exit code is 1 if any entry point exceeds the
+per-turn overhead budget, so it can gate CI.
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable
+
+from llm_factory import set_model_factory
+from scripted_chat_model import ScriptedChatModel, ScriptedModelFactory, scripted_response
+
+for name in ("API_PROVIDER", "API_KEY", "TAVILY_API_KEY"):
+    os.environ.setdefault(name, "scripted")
+
+
+@dataclass
+class EntryPoint:
+    name: str
+    model: ScriptedChatModel
+    run_turn: Callable[[int], int]
+
+
+@dataclass
+class TurnStats:
+    name: str
+    turns: int
+    model_calls: int
+    steps: int
+    overhead: float
+    peak_bytes: float
+
+    def row(self) -> str:
+        per_turn = self.overhead / self.turns * 1000
+        per_step = self.overhead / self.steps * 1000
+        return (
+            f"{self.name:<18} {self.model_calls / self.turns:>7.1f} {self.steps / self.turns:>7.1f} "
+            f"{per_turn:>10.3f} {per_step:>10.3f} {self.peak_bytes / 1024:>10.1f}"
+        )
+
+
+def order_tool_entry_point(latency: float) -> EntryPoint:
+    factory = ScriptedModelFactory(
+        [
+            scripted_response(tool_calls=[("create_order", {})]),
+            scripted_response("Your order is created, what should I add?"),
+        ],
+        latency=latency,
+    )
+    set_model_factory(factory)
+    import order_tool
+
+    # Models are built on first use, bind this factory's before the next one is set
+    order_tool.get_chain()
+
+    def run_turn(turn: int) -> int:
+        for _ in order_tool.respond("Create an order", session_id=f"bench-{turn}"):
+            pass
+        return 2
+
+    return EntryPoint("order_tool", factory.model, run_turn)
+
+
+def order_tool_agent_entry_point(latency: float) -> EntryPoint:
+    factory = ScriptedModelFactory(
+        [
+            scripted_response(tool_calls=[("create_order", {})]),
+            scripted_response("Your order is created, what should I add?"),
+        ],
+        latency=latency,
+    )
+    set_model_factory(factory)
+    import order_tool_agent
+
+    order_tool_agent.get_agent_executor().verbose = False
+
+    def run_turn(turn: int) -> int:
+        order_tool_agent.get_session_history(order_tool_agent.DEFAULT_SESSION_ID).clear()
+        order_tool_agent.get_agent_with_history().invoke(
+            {"input": "Create an order"},
+            order_tool_agent.config,  # pyright: ignore[reportArgumentType]
+        )
+        return 2
+
+    return EntryPoint("order_tool_agent", factory.model, run_turn)
+
+
+def langgraph_agent_entry_point(latency: float) -> EntryPoint:
+    factory = ScriptedModelFactory(
+        [
+            scripted_response(tool_calls=[("get_this_year_tool", {})]),
+            scripted_response("It is the current year."),
+        ],
+        latency=latency,
+    )
+    set_model_factory(factory)
+    from langchain_core.messages import HumanMessage
+
+    import langgraph_agent
+
+    def run_turn(turn: int) -> int:
+        state = langgraph_agent.get_graph().invoke(
+            {"messages": [HumanMessage(content="What year is it?")], "number_of_steps": 0}
+        )
+        return state["number_of_steps"]
+
+    return EntryPoint("langgraph_agent", factory.model, run_turn)
+
+
+def measure(entry_point: EntryPoint, turns: int, alloc_turns: int, latency: float) -> TurnStats:
+    entry_point.run_turn(-1)
+    entry_point.model.reset()
+
+    steps = 0
+    start = time.perf_counter()
+    for turn in range(turns):
+        steps += entry_point.run_turn(turn)
+    elapsed = time.perf_counter() - start
+    model_calls = entry_point.model.calls
+
+    peak_bytes = 0
+    tracemalloc.start()
+    for turn in range(alloc_turns):
+        tracemalloc.reset_peak()
+        entry_point.run_turn(turns + turn)
+        peak_bytes += tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return TurnStats(
+        name=entry_point.name,
+        turns=turns,
+        model_calls=model_calls,
+        steps=steps,
+        overhead=elapsed - model_calls * latency,
+        peak_bytes=peak_bytes / max(alloc_turns, 1),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--alloc-turns", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    entry_points = [
+        order_tool_entry_point(args.latency),
+        order_tool_agent_entry_point(args.latency),
+        langgraph_agent_entry_point(args.latency),
+    ]
+
+    print(
+        f"{'entry point':<18} {'calls':>7} {'steps':>7} {'ms/turn':>10} {'ms/step':>10} "
+        f"{'peak KiB':>10}  (per turn, overhead excludes model latency)"
+    )
+    over_budget = False
+    for entry_point in entry_points:
+        stats = measure(entry_point, args.turns, args.alloc_turns, args.latency)
+        print(stats.row())
+        if args.budget_ms is not None and stats.overhead / stats.turns * 1000 > args.budget_ms:
+            over_budget = True
+
+    if over_budget:
+        print(f"overhead budget of {args.budget_ms} ms/turn exceeded", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""Load test of a chat bot by replaying recorded conversations.
+
+Every virtual user replays transcripts from a JSONL file, one line per
+conversation:
+
+    {"domain": "cooking", "turns": ["How long should I boil an egg?", "And for a soft yolk?"]}
+
+Each conversation gets a fresh session, its turns are sent one after the
+other with `--think-time` seconds between them. Users start conversations
+until `--duration` runs out. The report has turn latency, time to first
+answer token and throughput. `--stub` replaces the model with a local
+scripted model answering after `--latency` seconds and streaming a word
+every `--token-latency` seconds; otherwise the configured model is used.
+Run from the repository root:
+
+    python -m benchmarks.load_replay --bot {domain,order,order-agent} [--users N] [--duration S] [--stub]
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+
+from llm_factory import set_model_factory
+from scripted_chat_model import ScriptedChatModel, ScriptedModelFactory, scripted_response
+
+for name in ("API_PROVIDER", "API_KEY", "TAVILY_API_KEY"):
+    os.environ.setdefault(name, "scripted")
+
+DEFAULT_TRANSCRIPTS = os.path.join(os.path.dirname(__file__), "transcripts.jsonl")
+STUB_ANSWER = " ".join(["Here is a short answer of about twenty words"] * 2) + "."
+PERCENTILES = (50, 95, 99)
+
+
+@dataclass
+class Transcript:
+    turns: list[str]
+    domain: str = ""
+
+
+@dataclass
+class TurnResult:
+    latency: float
+    first_token: float | None
+    error: str | None = None
+
+
+Respond = Callable[[Transcript, str, str], Iterator[str]]
+
+
+class StubChatModel(ScriptedChatModel):
+    """Scripted model answering tool results with the last response and
+    anything else with the first one, so concurrent sessions do not take
+    each other's scripted turns."""
+
+    def _next_response(self, messages: list[BaseMessage]) -> AIMessage:
+        with self._lock:
+            self._position += 1
+        response = self.responses[-1 if isinstance(messages[-1], ToolMessage) else 0]
+        return response.model_copy(update={"id": None})
+
+
+def install_stub(bot: str, latency: float, token_latency: float) -> None:
+    responses = [scripted_response(STUB_ANSWER)]
+    if bot != "domain":
+        responses.insert(0, scripted_response(tool_calls=[("create_order", {})]))
+    factory = ScriptedModelFactory([])
+    factory.model = StubChatModel(responses=responses, latency=latency, token_latency=token_latency)
+    set_model_factory(factory)
+
+
+def load_bot(bot: str) -> Respond:
+    if bot == "domain":
+        import simple_domain_bot_2
+
+        return lambda transcript, session_id, question: simple_domain_bot_2.respond(
+            question, transcript.domain, session_id
+        )
+    if bot == "order":
+        import order_tool
+
+        return lambda transcript, session_id, question: order_tool.respond(question, session_id)
+
+    import order_tool_agent
+
+    order_tool_agent.get_agent_executor().verbose = False
+    return lambda transcript, session_id, question: order_tool_agent.respond(question, session_id)
+
+
+def load_transcripts(path: str) -> list[Transcript]:
+    with open(path, encoding="utf-8") as transcripts_file:
+        return [
+            Transcript(turns=line["turns"], domain=line.get("domain", ""))
+            for line in map(json.loads, filter(str.strip, transcripts_file))
+        ]
+
+
+def replay_turn(respond: Respond, transcript: Transcript, session_id: str, question: str) -> TurnResult:
+    start = time.perf_counter()
+    first_token = None
+    try:
+        for text in respond(transcript, session_id, question):
+            if first_token is None and text:
+                first_token = time.perf_counter() - start
+    except Exception as error:
+        return TurnResult(time.perf_counter() - start, first_token, repr(error))
+    return TurnResult(time.perf_counter() - start, first_token)
+
+
+def virtual_user(
+    user_id: int,
+    users: int,
+    respond: Respond,
+    transcripts: list[Transcript],
+    deadline: float,
+    think_time: float,
+    results: list[TurnResult],
+) -> None:
+    conversation = 0
+    while time.monotonic() < deadline:
+        transcript = transcripts[(user_id + conversation * users) % len(transcripts)]
+        session_id = f"load-{user_id}-{conversation}"
+        for question in transcript.turns:
+            if time.monotonic() >= deadline:
+                return
+            results.append(replay_turn(respond, transcript, session_id, question))
+            time.sleep(think_time)
+        conversation += 1
+
+
+def percentile(sorted_values: list[float], percent: float) -> float:
+    """Nearest-rank percentile
+
+    Args:
+        sorted_values (list[float]): values in ascending order
+        percent (float): percentile, 0 to 100
+
+    Returns:
+        float: percentile value, NaN if there are no values
+    """
+    if not sorted_values:
+        return float("nan")
+    rank = max(round(percent / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def report(results: list[TurnResult], elapsed: float) -> None:
+    errors = [result.error for result in results if result.error]
+    print(
+        f"turns {len(results)}  errors {len(errors)}  "
+        f"throughput {(len(results) - len(errors)) / elapsed:.2f} turns/s"
+    )
+    print(f"{'':<14}" + "".join(f"{f'p{p}':>9}" for p in PERCENTILES) + f"{'max':>9}  (ms)")
+    ok = [result for result in results if not result.error]
+    for label, values in (
+        ("turn latency", sorted(result.latency for result in ok)),
+        ("first token", sorted(result.first_token for result in ok if result.first_token is not None)),
+    ):
+        cells = [percentile(values, p) for p in PERCENTILES] + [values[-1] if values else float("nan")]
+        print(f"{label:<14}" + "".join(f"{value * 1000:>9.1f}" for value in cells))
+    for error in sorted(set(errors))[:5]:
+        print(f"error: {error}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bot", choices=("domain", "order", "order-agent"), default="order")
+    parser.add_argument("--transcripts", default=DEFAULT_TRANSCRIPTS)
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--think-time", type=float, default=0.0)
+    parser.add_argument("--stub", action="store_true")
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--token-latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    if args.stub:
+        install_stub(args.bot, args.latency, args.token_latency)
+    respond = load_bot(args.bot)
+    transcripts = load_transcripts(args.transcripts)
+
+    results: list[TurnResult] = []
+    start = time.monotonic()
+    deadline = start + args.duration
+    threads = [
+        threading.Thread(
+            target=virtual_user,
+            args=(user_id, args.users, respond, transcripts, deadline, args.think_time, results),
+        )
+        for user_id in range(args.users)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+
+    print(f"bot: {args.bot}  model: {'stub' if args.stub else 'live'}  users: {args.users}")
+    report(results, elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,21 +4,27 @@ from langchain_classic.agents import Tool
 from langchain_community.tools import TavilySearchResults, WikipediaQueryRun
 from langchain_community.utilities import WikipediaAPIWrapper
 
+from lookup_cache import get_lookup_cache
 from settings import settings
 
 if "TAVILY_API_KEY" not in os.environ:
     os.environ["TAVILY_API_KEY"] = settings.tavily_api_key
 
+lookup_cache = get_lookup_cache()
 
-tool = TavilySearchResults(
-    max_results=10,
-    search_depth="advanced",
-    include_answer=False,
-    include_raw_content=True,
-    include_images=False,
-)
+tavily_options = {
+    "max_results": 10,
+    "search_depth": "advanced",
+    "include_answer": False,
+    "include_raw_content": True,
+    "include_images": False,
+}
+tool = TavilySearchResults(**tavily_options)
 
-result = tool.invoke({"query": "The best course for development MVP AI service"})
+query = "The best course for development MVP AI service"
+result = lookup_cache.get_or_fetch(
+    "tavily", query, lambda: tool.invoke({"query": query}), **tavily_options
+)
 print(result)
 
 
@@ -26,7 +32,10 @@ wikipedia = WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper(lang="en"))  # pyr
 wikipedia_tool = Tool(
     name="wikipedia",
     description="Search in Wikipedia knowledge database.",
-    func=wikipedia.run,
+    func=lambda query: lookup_cache.get_or_fetch(
+        "wikipedia", query, lambda: wikipedia.run(query), lang="en"
+    ),
 )
 result = wikipedia_tool.invoke("Large Language Models")
 print(result)
+print(lookup_cache.stats)
@@ -0,0 +1,464 @@
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from functools import cache, partial
+from typing import TYPE_CHECKING, Iterator, Sequence
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import (
+    BaseMessage,
+    HumanMessage,
+    message_to_dict,
+    messages_from_dict,
+)
+
+from token_budget import (
+    DEFAULT_MAX_HISTORY_TOKENS,
+    TokenBudgetChatMessageHistory,
+    TokenCounter,
+    approximate_token_count,
+)
+
+if TYPE_CHECKING:
+    from summary_memory import FactExtractor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_FLUSH_INTERVAL = 0.5
+DEFAULT_MAX_OPEN_SESSIONS = 1_024
+DEFAULT_MAX_SESSION_IDLE = 3_600.0
+
+# First message of the tail window: messages from the end fitting the token
+# budget, extended back to the last human message if that one does not fit.
+TAIL_START_QUERY = """
+SELECT MIN(
+    COALESCE(
+        (SELECT MIN(seq) FROM (
+            SELECT seq, SUM(tokens) OVER (ORDER BY seq DESC) AS running_tokens
+            FROM messages WHERE session_id = :session_id
+        ) WHERE running_tokens <= :max_tokens),
+        :last_human_seq
+    ),
+    :last_human_seq
+)
+"""
+
+
+class SqliteChatHistoryStore:
+    """Append-only chat transcripts of all sessions in SQLite.
+
+    Appends are queued and written by a background thread in batches of
+    up to `batch_size` messages, at least every `flush_interval` seconds
+    and on exit. Every message keeps its token count, so a session can
+    load only the tail that fits its token budget. Appending only takes
+    the queue lock, never the connection, so it does not wait for a
+    flush. The next seq of a session is kept only while it has rows not
+    yet written.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+    ) -> None:
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Guards the connection; `_pending_changed` guards the queue and seqs
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "session_id TEXT NOT NULL, seq INTEGER NOT NULL, is_human INTEGER NOT NULL, "
+            "tokens INTEGER NOT NULL, message TEXT NOT NULL, PRIMARY KEY (session_id, seq))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            "session_id TEXT PRIMARY KEY, summary TEXT NOT NULL, facts TEXT NOT NULL)"
+        )
+        self._next_seq: dict[str, int] = {}
+        # Rows per session queued or being written, a session's next seq is dropped at 0
+        self._unwritten: Counter[str] = Counter()
+        # Bumped when next seqs are dropped, a seq read from the table before is stale
+        self._seq_generation = 0
+        self._pending: list[tuple[str, int, int, int, str]] = []
+        self._pending_changed = threading.Condition(threading.Lock())
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="chat-history", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _stored_next_seq(self, session_id: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(seq) FROM messages WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return 0 if row[0] is None else row[0] + 1
+
+    def append(self, session_id: str, messages: Sequence[BaseMessage], token_counts: Sequence[int]) -> None:
+        """Queue messages for writing
+
+        Args:
+            session_id (str): chat session
+            messages (Sequence[BaseMessage]): new messages
+            token_counts (Sequence[int]): token count of every message
+        """
+        values = [
+            (isinstance(message, HumanMessage), token_count, json.dumps(message_to_dict(message)))
+            for message, token_count in zip(messages, token_counts)
+        ]
+        stored_next_seq, generation = None, 0
+        while True:
+            with self._pending_changed:
+                seq = self._next_seq.get(session_id)
+                if seq is None and stored_next_seq is not None and generation == self._seq_generation:
+                    seq = stored_next_seq
+                if seq is not None:
+                    self._next_seq[session_id] = seq + len(values)
+                    self._unwritten[session_id] += len(values)
+                    self._pending.extend(
+                        (session_id, seq + index, *value) for index, value in enumerate(values)
+                    )
+                    if len(self._pending) >= self.batch_size:
+                        self._pending_changed.notify()
+                    return
+                generation = self._seq_generation
+            stored_next_seq = self._stored_next_seq(session_id)
+
+    def _write_loop(self) -> None:
+        while True:
+            with self._pending_changed:
+                if not self._closed and len(self._pending) < self.batch_size:
+                    self._pending_changed.wait(self.flush_interval)
+                if self._closed:
+                    return
+            self.flush()
+
+    def flush(self) -> None:
+        """Write all queued messages in one transaction"""
+        with self._pending_changed:
+            rows, self._pending = self._pending, []
+        if not rows:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT INTO messages VALUES (?, ?, ?, ?, ?)", rows)
+            self._conn.execute("COMMIT")
+        with self._pending_changed:
+            self._unwritten.subtract(row[0] for row in rows)
+            for session_id in {row[0] for row in rows}:
+                if not self._unwritten[session_id]:
+                    del self._unwritten[session_id]
+                    self._next_seq.pop(session_id, None)
+                    self._seq_generation += 1
+
+    def load_tail(self, session_id: str, max_tokens: int) -> list[BaseMessage]:
+        """Load the last messages of a session fitting a token budget
+
+        Args:
+            session_id (str): chat session
+            max_tokens (int): token budget of the tail
+
+        Returns:
+            list[BaseMessage]: tail messages, oldest first
+        """
+        self.flush()
+        with self._lock:
+            last_human_seq = self._conn.execute(
+                "SELECT MAX(seq) FROM messages WHERE session_id = ? AND is_human",
+                (session_id,),
+            ).fetchone()[0]
+            if last_human_seq is None:
+                return []
+            tail_start = self._conn.execute(
+                TAIL_START_QUERY,
+                {"session_id": session_id, "max_tokens": max_tokens, "last_human_seq": last_human_seq},
+            ).fetchone()[0]
+            rows = self._conn.execute(
+                "SELECT message FROM messages WHERE session_id = ? AND seq >= ? ORDER BY seq",
+                (session_id, tail_start),
+            ).fetchall()
+        return messages_from_dict([json.loads(row[0]) for row in rows])
+
+    def save_summary(self, session_id: str, summary: str, facts: list[str]) -> None:
+        """Replace the summary of the messages a session dropped from its window
+
+        Args:
+            session_id (str): chat session
+            summary (str): summary of the dropped messages
+            facts (list[str]): facts kept verbatim from the dropped messages
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?)",
+                (session_id, summary, json.dumps(facts)),
+            )
+
+    def load_summary(self, session_id: str) -> tuple[str, list[str]]:
+        """Load the summary of the messages a session dropped from its window
+
+        Args:
+            session_id (str): chat session
+
+        Returns:
+            tuple[str, list[str]]: summary and facts, empty if none was saved
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, facts FROM summaries WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return ("", []) if row is None else (row[0], json.loads(row[1]))
+
+    def delete_session(self, session_id: str) -> None:
+        self.flush()
+        with self._lock:
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM summaries WHERE session_id = ?", (session_id,))
+        with self._pending_changed:
+            self._next_seq.pop(session_id, None)
+            self._seq_generation += 1
+
+    def close(self) -> None:
+        with self._pending_changed:
+            if self._closed:
+                return
+            self._closed = True
+            self._pending_changed.notify()
+        self._writer.join()
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+
+class DurableChatMessageHistory(TokenBudgetChatMessageHistory):
+    """Token budget chat history that also appends every message to a store.
+
+    The window is loaded from the store on first use, reading only the
+    messages that fit the budget. The full transcript stays in the store.
+    """
+
+    def __init__(
+        self,
+        store: SqliteChatHistoryStore,
+        session_id: str,
+        max_tokens: int = DEFAULT_MAX_HISTORY_TOKENS,
+        token_counter: TokenCounter = approximate_token_count,
+    ) -> None:
+        super().__init__(max_tokens, token_counter)
+        self.store = store
+        self.session_id = session_id
+        self._loaded = False
+
+    def _load(self) -> None:
+        if not self._loaded:
+            self._loaded = True
+            # Stored messages trimmed from the window here left it in an
+            # earlier process, `on_evict` already got them there
+            on_evict, self.on_evict = self.on_evict, None
+            try:
+                super().add_messages(self.store.load_tail(self.session_id, self.max_tokens))
+            finally:
+                self.on_evict = on_evict
+
+    @property
+    def messages(self) -> list[BaseMessage]:  # pyright: ignore[reportIncompatibleVariableOverride]
+        self._load()
+        return super().messages
+
+    @property
+    def window_tokens(self) -> int:
+        self._load()
+        return super().window_tokens
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        self._load()
+        token_counts = [self.token_counter(message) for message in messages]
+        self._append(messages, token_counts)
+        self.store.append(self.session_id, messages, token_counts)
+
+    def clear(self) -> None:
+        super().clear()
+        self.store.delete_session(self.session_id)
+        self._loaded = True
+
+
+@cache
+def get_chat_history_store() -> SqliteChatHistoryStore | None:
+    from settings import settings
+
+    if not settings.chat_history_path:
+        return None
+    return SqliteChatHistoryStore(settings.chat_history_path)
+
+
+def open_session_history(
+    session_id: str,
+    max_tokens: int = DEFAULT_MAX_HISTORY_TOKENS,
+    extract_facts: "FactExtractor | None" = None,
+) -> BaseChatMessageHistory:
+    """Open chat history of a session
+
+    Args:
+        session_id (str): chat session
+        max_tokens (int): token budget of the history, summary included
+        extract_facts (FactExtractor | None): facts to keep from dropped messages
+            if HISTORY_SUMMARY is on
+
+    Returns:
+        BaseChatMessageHistory: durable history if CHAT_HISTORY_PATH is set,
+            in-memory otherwise, summarizing dropped messages in the
+            background if HISTORY_SUMMARY is on; a durable history keeps
+            its summary and facts in the store too
+    """
+    from settings import settings
+
+    store = get_chat_history_store()
+    if store is None:
+        history = TokenBudgetChatMessageHistory(max_tokens)
+    else:
+        history = DurableChatMessageHistory(store, session_id, max_tokens)
+    if not settings.history_summary:
+        return history
+
+    from summary_memory import SummarizingChatMessageHistory, get_summarizer
+
+    if store is None:
+        return SummarizingChatMessageHistory(history, get_summarizer(), extract_facts)
+    summary, facts = store.load_summary(session_id)
+    return SummarizingChatMessageHistory(
+        history,
+        get_summarizer(),
+        extract_facts,
+        summary=summary,
+        facts=facts,
+        save_summary=partial(store.save_summary, session_id),
+    )
+
+
+class _OpenSession:
+    def __init__(self, history: BaseChatMessageHistory) -> None:
+        self.history = history
+        self.turns = 0
+        self.used_at = time.monotonic()
+
+    @property
+    def durable(self) -> bool:
+        # A summarizing history wraps the token budget one
+        return isinstance(getattr(self.history, "history", self.history), DurableChatMessageHistory)
+
+
+class SessionHistories:
+    """Open chat histories by session id, least recently used first to close.
+
+    A session is never closed during a turn taken with `turn`. Sessions
+    idle for `max_idle` seconds are closed; past `max_sessions` open
+    sessions, the least recently used durable ones are closed too, as they
+    are loaded again from the store on their next turn. An in-memory
+    history would be lost, so it is only closed once idle.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = DEFAULT_MAX_HISTORY_TOKENS,
+        extract_facts: "FactExtractor | None" = None,
+        max_sessions: int = DEFAULT_MAX_OPEN_SESSIONS,
+        max_idle: float = DEFAULT_MAX_SESSION_IDLE,
+    ) -> None:
+        self.max_tokens = max_tokens
+        self.extract_facts = extract_facts
+        self.max_sessions = max_sessions
+        self.max_idle = max_idle
+        self._sessions: OrderedDict[str, _OpenSession] = OrderedDict()
+        self._lock = threading.Lock()
+        self._over_limit = False
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def __setitem__(self, session_id: str, history: BaseChatMessageHistory) -> None:
+        with self._lock:
+            self._sessions[session_id] = _OpenSession(history)
+            self._close_unused()
+
+    def _open(self, session_id: str) -> _OpenSession:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = _OpenSession(open_session_history(session_id, self.max_tokens, self.extract_facts))
+            self._sessions[session_id] = session
+            self._close_unused()
+        else:
+            self._sessions.move_to_end(session_id)
+            session.used_at = time.monotonic()
+        return session
+
+    def _close_unused(self) -> None:
+        idle_since = time.monotonic() - self.max_idle
+        for session_id, session in list(self._sessions.items()):
+            if session.used_at >= idle_since:
+                break
+            if not session.turns:
+                del self._sessions[session_id]
+        if len(self._sessions) > self.max_sessions:
+            for session_id, session in list(self._sessions.items()):
+                if len(self._sessions) <= self.max_sessions:
+                    break
+                if session.durable and not session.turns:
+                    del self._sessions[session_id]
+        over_limit = len(self._sessions) > self.max_sessions
+        if over_limit and not self._over_limit:
+            logger.warning(
+                "%d chat sessions open, over the limit of %d: in-memory histories are "
+                "kept until they are idle for %ss",
+                len(self._sessions),
+                self.max_sessions,
+                self.max_idle,
+            )
+        self._over_limit = over_limit
+
+    def get(self, session_id: str) -> BaseChatMessageHistory:
+        """Get history of a session, opening it if needed
+
+        Args:
+            session_id (str): chat session
+
+        Returns:
+            BaseChatMessageHistory: history of the session
+        """
+        with self._lock:
+            return self._open(session_id).history
+
+    @contextmanager
+    def turn(self, session_id: str) -> Iterator[BaseChatMessageHistory]:
+        """Keep the history of a session open during a turn
+
+        Args:
+            session_id (str): chat session
+
+        Yields:
+            BaseChatMessageHistory: history of the session
+        """
+        with self._lock:
+            session = self._open(session_id)
+            session.turns += 1
+        try:
+            yield session.history
+        finally:
+            with self._lock:
+                session.turns -= 1
+                session.used_at = time.monotonic()
+                if self._sessions.get(session_id) is session:
+                    self._sessions.move_to_end(session_id)
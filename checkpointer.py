@@ -0,0 +1,541 @@
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Iterator, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+DEFAULT_DELTA_CHANNELS = ("messages",)
+DEFAULT_COMPACT_INTERVAL = 300.0
+DEFAULT_IDLE_AFTER = 3600.0
+DEFAULT_MAX_HEADS = 1_024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    checkpoint_type TEXT NOT NULL,
+    checkpoint BLOB NOT NULL,
+    metadata_type TEXT NOT NULL,
+    metadata BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS channel_deltas (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    parent_version TEXT,
+    value_type TEXT NOT NULL,
+    value BLOB NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    value_type TEXT NOT NULL,
+    value BLOB NOT NULL,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+# Walks the delta chain of one channel version back to the nearest full
+# value (parent_version IS NULL), newest first.
+DELTA_CHAIN_QUERY = """
+WITH RECURSIVE chain(version, parent_version, value_type, value, depth) AS (
+    SELECT version, parent_version, value_type, value, 0 FROM channel_deltas
+    WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?
+    UNION ALL
+    SELECT d.version, d.parent_version, d.value_type, d.value, chain.depth + 1
+    FROM channel_deltas d JOIN chain ON d.version = chain.parent_version
+    WHERE d.thread_id = ? AND d.checkpoint_ns = ? AND d.channel = ?
+)
+SELECT value_type, value FROM chain ORDER BY depth DESC
+"""
+
+
+class SqliteDeltaSaver(BaseCheckpointSaver[str]):
+    """LangGraph checkpointer persisted in SQLite.
+
+    List channels from `delta_channels` (the agent messages) are stored as
+    deltas: every new version keeps only the items appended since the
+    parent version. A version that rewrites earlier items is stored in
+    full. Other channel values are small and stored inside the checkpoint
+    row.
+
+    A background thread compacts threads idle for `idle_after` seconds:
+    it keeps only their latest checkpoint and folds its delta chain into
+    one full value, so resuming an old thread reads a single delta row.
+
+    The last saved value of every delta channel is kept in memory to diff
+    the next version against, for at most `max_heads` channels and only
+    until the thread is idle; a thread without one writes its next
+    version in full.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        delta_channels: Sequence[str] = DEFAULT_DELTA_CHANNELS,
+        compact_interval: float | None = DEFAULT_COMPACT_INTERVAL,
+        idle_after: float = DEFAULT_IDLE_AFTER,
+        max_heads: int = DEFAULT_MAX_HEADS,
+    ) -> None:
+        super().__init__()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.delta_channels = frozenset(delta_channels)
+        self.idle_after = idle_after
+        self.max_heads = max_heads
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        # (thread_id, checkpoint_ns, channel) -> (checkpoint_id, version, value, saved_at)
+        # of the last saved checkpoint, least recently saved first
+        self._heads: OrderedDict[tuple[str, str, str], tuple[str, str, Sequence[Any], float]] = OrderedDict()
+        self._stop_compaction = threading.Event()
+        if compact_interval is not None:
+            threading.Thread(
+                target=self._compaction_loop,
+                args=(compact_interval,),
+                name="checkpoint-compaction",
+                daemon=True,
+            ).start()
+
+    def close(self) -> None:
+        self._stop_compaction.set()
+        with self._lock:
+            self._conn.close()
+
+    def get_next_version(self, current: str | None, channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    def _set_head(
+        self, key: tuple[str, str, str], checkpoint_id: str, version: str, value: Sequence[Any]
+    ) -> None:
+        self._heads[key] = (checkpoint_id, version, value, time.time())
+        self._heads.move_to_end(key)
+        while len(self._heads) > self.max_heads:
+            self._heads.popitem(last=False)
+
+    def _drop_heads(self, thread_id: str, checkpoint_ns: str | None = None) -> None:
+        for key in [
+            key
+            for key in self._heads
+            if key[0] == thread_id and (checkpoint_ns is None or key[1] == checkpoint_ns)
+        ]:
+            del self._heads[key]
+
+    def _load_channel(self, thread_id: str, checkpoint_ns: str, channel: str, version: str) -> list[Any]:
+        rows = self._conn.execute(
+            DELTA_CHAIN_QUERY,
+            (thread_id, checkpoint_ns, channel, version, thread_id, checkpoint_ns, channel),
+        ).fetchall()
+        value: list[Any] = []
+        for value_type, blob in rows:
+            value.extend(self.serde.loads_typed((value_type, blob)))
+        return value
+
+    def _checkpoint_tuple(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        row: tuple[str, str | None, str, bytes, str, bytes],
+        track_head: bool = False,
+    ) -> CheckpointTuple:
+        checkpoint_id, parent_checkpoint_id, checkpoint_type, checkpoint_blob, metadata_type, metadata_blob = row
+        checkpoint: Checkpoint = self.serde.loads_typed((checkpoint_type, checkpoint_blob))
+        for channel, version in checkpoint["channel_versions"].items():
+            if channel not in self.delta_channels:
+                continue
+            value = self._load_channel(thread_id, checkpoint_ns, channel, str(version))
+            checkpoint["channel_values"][channel] = value
+            if track_head:
+                self._set_head((thread_id, checkpoint_ns, channel), checkpoint_id, str(version), value)
+
+        writes = self._conn.execute(
+            "SELECT task_id, channel, value_type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? "
+            "ORDER BY task_path, task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=checkpoint,
+            metadata=self.serde.loads_typed((metadata_type, metadata_blob)),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((value_type, value)))
+                for task_id, channel, value_type, value in writes
+            ],
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        thread_id: str = config["configurable"]["thread_id"]
+        checkpoint_ns: str = config["configurable"].get("checkpoint_ns", "")
+        query = (
+            "SELECT checkpoint_id, parent_checkpoint_id, checkpoint_type, checkpoint, "
+            "metadata_type, metadata FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+        )
+        params: tuple[str, ...] = (thread_id, checkpoint_ns)
+        if checkpoint_id := get_checkpoint_id(config):
+            query += " AND checkpoint_id = ?"
+            params += (checkpoint_id,)
+        else:
+            query += " ORDER BY checkpoint_id DESC LIMIT 1"
+        with self._lock:
+            row = self._conn.execute(query, params).fetchone()
+            if row is None:
+                return None
+            return self._checkpoint_tuple(thread_id, checkpoint_ns, row, track_head=True)
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, checkpoint_type, "
+            "checkpoint, metadata_type, metadata FROM checkpoints WHERE 1 = 1"
+        )
+        params: list[str] = []
+        if config is not None:
+            query += " AND thread_id = ?"
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                query += " AND checkpoint_ns = ?"
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                query += " AND checkpoint_id = ?"
+                params.append(checkpoint_id)
+        if before is not None and (before_checkpoint_id := get_checkpoint_id(before)):
+            query += " AND checkpoint_id < ?"
+            params.append(before_checkpoint_id)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        for thread_id, checkpoint_ns, *row in rows:
+            if limit is not None and limit <= 0:
+                return
+            if filter:
+                metadata = self.serde.loads_typed((row[4], row[5]))
+                if not all(metadata.get(key) == value for key, value in filter.items()):
+                    continue
+            if limit is not None:
+                limit -= 1
+            with self._lock:
+                checkpoint_tuple = self._checkpoint_tuple(thread_id, checkpoint_ns, tuple(row))  # pyright: ignore[reportArgumentType]
+            yield checkpoint_tuple
+
+    def _put_channel(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        channel: str,
+        version: str,
+        parent_checkpoint_id: str | None,
+        value: Sequence[Any],
+    ) -> None:
+        head = self._heads.get((thread_id, checkpoint_ns, channel))
+        parent_version, delta = None, value
+        if (
+            head is not None
+            and head[0] == parent_checkpoint_id
+            and len(value) >= len(head[2])
+            and all(new is old for new, old in zip(value, head[2]))
+        ):
+            parent_version, delta = head[1], value[len(head[2]) :]
+        self._conn.execute(
+            "INSERT OR REPLACE INTO channel_deltas "
+            "(thread_id, checkpoint_ns, channel, version, parent_version, value_type, value) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (thread_id, checkpoint_ns, channel, version, parent_version, *self.serde.dumps_typed(delta)),
+        )
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        parent_checkpoint_id = config["configurable"].get("checkpoint_id")
+        values = checkpoint["channel_values"]
+        stored = {
+            **checkpoint,
+            "channel_values": {
+                channel: value
+                for channel, value in values.items()
+                if channel not in self.delta_channels
+            },
+        }
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for channel in self.delta_channels & values.keys():
+                    version = str(checkpoint["channel_versions"][channel])
+                    if channel in new_versions:
+                        self._put_channel(
+                            thread_id, checkpoint_ns, channel, version, parent_checkpoint_id, values[channel]
+                        )
+                    self._set_head((thread_id, checkpoint_ns, channel), checkpoint["id"], version, values[channel])
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        thread_id,
+                        checkpoint_ns,
+                        checkpoint["id"],
+                        parent_checkpoint_id,
+                        *self.serde.dumps_typed(stored),
+                        *self.serde.dumps_typed(get_checkpoint_metadata(config, metadata)),
+                        time.time(),
+                    ),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            rows.append(
+                (
+                    "INSERT OR REPLACE" if channel in WRITES_IDX_MAP else "INSERT OR IGNORE",
+                    (
+                        thread_id,
+                        checkpoint_ns,
+                        checkpoint_id,
+                        task_id,
+                        WRITES_IDX_MAP.get(channel, idx),
+                        channel,
+                        *self.serde.dumps_typed(value),
+                        task_path,
+                    ),
+                )
+            )
+        with self._lock:
+            for verb, params in rows:
+                self._conn.execute(f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", params)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            for table in ("checkpoints", "channel_deltas", "writes"):
+                self._conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+            self._drop_heads(thread_id)
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        checkpoints = await asyncio.to_thread(
+            lambda: [*self.list(config, filter=filter, before=before, limit=limit)]
+        )
+        for checkpoint in checkpoints:
+            yield checkpoint
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def compact_thread(self, thread_id: str, checkpoint_ns: str = "") -> None:
+        """Keep only the latest checkpoint of a thread with its channels stored in full
+
+        Args:
+            thread_id (str): thread to compact
+            checkpoint_ns (str): checkpoint namespace
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT checkpoint_id, checkpoint_type, checkpoint FROM checkpoints "
+                "WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1",
+                (thread_id, checkpoint_ns),
+            ).fetchone()
+            if row is None:
+                return
+            checkpoint_id, checkpoint_type, checkpoint_blob = row
+            checkpoint: Checkpoint = self.serde.loads_typed((checkpoint_type, checkpoint_blob))
+            versions = {
+                channel: str(version)
+                for channel, version in checkpoint["channel_versions"].items()
+                if channel in self.delta_channels
+            }
+            values = {
+                channel: self._load_channel(thread_id, checkpoint_ns, channel, version)
+                for channel, version in versions.items()
+            }
+
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "AND checkpoint_id != ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                )
+                self._conn.execute(
+                    "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "AND checkpoint_id != ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                )
+                self._conn.execute(
+                    "UPDATE checkpoints SET parent_checkpoint_id = NULL "
+                    "WHERE thread_id = ? AND checkpoint_ns = ?",
+                    (thread_id, checkpoint_ns),
+                )
+                self._conn.execute(
+                    "DELETE FROM channel_deltas WHERE thread_id = ? AND checkpoint_ns = ?",
+                    (thread_id, checkpoint_ns),
+                )
+                for channel, version in versions.items():
+                    self._conn.execute(
+                        "INSERT INTO channel_deltas VALUES (?, ?, ?, ?, NULL, ?, ?)",
+                        (
+                            thread_id,
+                            checkpoint_ns,
+                            channel,
+                            version,
+                            *self.serde.dumps_typed(values[channel]),
+                        ),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._drop_heads(thread_id, checkpoint_ns)
+
+    def compact_idle_threads(self, idle_after: float | None = None) -> int:
+        """Compact threads without new checkpoints for `idle_after` seconds
+
+        The in-memory heads of idle threads are dropped too.
+
+        Args:
+            idle_after (float | None): idle time in seconds, defaults to `self.idle_after`
+
+        Returns:
+            int: number of compacted threads
+        """
+        cutoff = time.time() - (self.idle_after if idle_after is None else idle_after)
+        with self._lock:
+            threads = self._conn.execute(
+                "SELECT thread_id, checkpoint_ns FROM checkpoints GROUP BY thread_id, checkpoint_ns "
+                "HAVING MAX(created_at) < ? AND COUNT(*) > 1",
+                (cutoff,),
+            ).fetchall()
+            while self._heads and next(iter(self._heads.values()))[3] < cutoff:
+                self._heads.popitem(last=False)
+        for thread_id, checkpoint_ns in threads:
+            self.compact_thread(thread_id, checkpoint_ns)
+        return len(threads)
+
+    def _compaction_loop(self, interval: float) -> None:
+        while not self._stop_compaction.wait(interval):
+            try:
+                self.compact_idle_threads()
+            except sqlite3.ProgrammingError:
+                return
+
+
+def open_checkpointer(path: str) -> SqliteDeltaSaver | None:
+    """Open agent state checkpointer
+
+    Args:
+        path (str): SQLite database path, empty to run without checkpoints
+
+    Returns:
+        SqliteDeltaSaver | None: checkpointer or None if disabled
+    """
+    if not path:
+        return None
+    return SqliteDeltaSaver(path)
@@ -0,0 +1,41 @@
+"""Run one of the bots:
+
+    python cli.py <command> [args...]
+
+Only the selected bot module is imported, so startup does not pay for the
+langchain, langgraph and wikipedia imports of the other bots.
+"""
+
+import argparse
+import runpy
+import sys
+
+COMMANDS = {
+    "agent": ("langgraph_agent", "LangGraph agent with Wikipedia search"),
+    "order": ("order_tool", "order bot on tool calling"),
+    "order-agent": ("order_tool_agent", "order bot on AgentExecutor"),
+    "order-server": ("order_server", "HTTP server for the order bot"),
+    "order-service": ("order_service", "order store shared by bot processes"),
+    "domain": ("simple_domain_bot_2", "domain expert chat"),
+    "parse": ("parser", "person extraction example"),
+    "parse-batch": ("parser_batch", "person extraction over a JSONL file"),
+    "search": ("call_thirdy_agent_example", "Tavily and Wikipedia search example"),
+}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    for command, (_, help) in COMMANDS.items():
+        commands.add_parser(command, help=help, add_help=False)
+    args, command_args = parser.parse_known_args(argv)
+
+    module = COMMANDS[args.command][0]
+    sys.argv = [f"{module}.py", *command_args]
+    runpy.run_module(module, run_name="__main__", alter_sys=True)
+
+
+if __name__ == "__main__":
+    main()
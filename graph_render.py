@@ -0,0 +1,48 @@
+import hashlib
+import json
+import os
+
+from langchain_core.runnables.graph import Graph
+
+
+def topology_hash(graph: Graph) -> str:
+    """Hash nodes and edges of a drawable graph
+
+    Args:
+        graph (Graph): graph from `get_graph()`
+
+    Returns:
+        str: sha256 hex digest, stable across runs
+    """
+    topology = {
+        "nodes": sorted(graph.nodes),
+        "edges": sorted(
+            [edge.source, edge.target, str(edge.data), edge.conditional] for edge in graph.edges
+        ),
+    }
+    return hashlib.sha256(json.dumps(topology, sort_keys=True).encode()).hexdigest()
+
+
+def render_graph_png(graph: Graph, path: str) -> bool:
+    """Draw the graph to PNG unless the image of the same topology exists
+
+    The topology hash is kept next to the image in `<path>.sha256`.
+
+    Args:
+        graph (Graph): graph from `get_graph()`
+        path (str): PNG file path
+
+    Returns:
+        bool: True if the image was rendered
+    """
+    hash_path = f"{path}.sha256"
+    digest = topology_hash(graph)
+    if os.path.exists(path) and os.path.exists(hash_path):
+        with open(hash_path, encoding="utf-8") as hash_file:
+            if hash_file.read().strip() == digest:
+                return False
+
+    graph.draw_png(path)
+    with open(hash_path, "w", encoding="utf-8") as hash_file:
+        hash_file.write(digest + "\n")
+    return True
@@ -1,19 +1,36 @@
-import os
 from datetime import datetime
-from typing import Annotated, Sequence, TypedDict
-
-from langchain_community.tools.wikipedia.tool import WikipediaQueryRun
-from langchain_community.utilities.wikipedia import WikipediaAPIWrapper
-from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from functools import cache, partial
+from typing import (
+    TYPE_CHECKING,
+    Annotated,
+    Any,
+    AsyncIterator,
+    Iterator,
+    NotRequired,
+    Sequence,
+    TypedDict,
+)
+
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
 from langchain_core.runnables.config import RunnableConfig
 from langchain_core.tools import tool
-from langchain_mistralai import ChatMistralAI
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.config import get_stream_writer
 from langgraph.constants import END, START
 from langgraph.graph.message import add_messages
-from langgraph.graph.state import StateGraph
+from langgraph.graph.state import CompiledStateGraph, StateGraph
 from pydantic import BaseModel, Field
 
-from settings import settings
+from agent_metrics import AgentMetrics
+from checkpointer import open_checkpointer
+from graph_render import render_graph_png
+from llm_factory import get_chat_model_with_tools, get_model_factory
+from lookup_cache import get_lookup_cache
+from passage_index import get_passage_index
+from tool_runner import run_tool_calls
+
+if TYPE_CHECKING:
+    from langchain_community.utilities.wikipedia import WikipediaAPIWrapper
 
 
 class AgentState(TypedDict):
@@ -21,6 +38,23 @@ class AgentState(TypedDict):
     number_of_steps: int
 
 
+class AgentEvent(TypedDict):
+    """Streamed agent event
+
+    `event` is "token" with `text`, "tool_start" with `tool` and `args` or
+    "tool_end" with `tool`, `seconds` and `error`. Every "tool_start" is
+    followed by one "tool_end", also for unknown and timed out tools;
+    `seconds` is None for a call that never ran.
+    """
+
+    event: str
+    text: NotRequired[str]
+    tool: NotRequired[str]
+    args: NotRequired[dict[str, Any]]
+    seconds: NotRequired[float | None]
+    error: NotRequired[bool]
+
+
 @tool(return_direct=True)
 def get_this_year_tool() -> int:
     """Return current year
@@ -35,7 +69,28 @@ class WikiInput(BaseModel):
     query: str = Field(description="Запрос для поиска в Википедия.")
 
 
-wikipedia = WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper(lang="ru"))  # pyright: ignore[reportCallIssue]
+WIKIPEDIA_LANG = "ru"
+WIKIPEDIA_PAGE_CHARS = 100_000
+WIKIPEDIA_TOP_K = 4
+# Share of query terms the best local passage must contain to answer
+# without fetching pages
+MIN_LOCAL_COVERAGE = 0.6
+
+
+@cache
+def get_wikipedia() -> "WikipediaAPIWrapper":
+    # langchain_community is the slowest import of the agent, so it is
+    # loaded on the first search instead of at startup
+    from langchain_community.utilities.wikipedia import WikipediaAPIWrapper
+
+    return WikipediaAPIWrapper(lang=WIKIPEDIA_LANG, doc_content_chars_max=WIKIPEDIA_PAGE_CHARS)  # pyright: ignore[reportCallIssue]
+
+
+def fetch_wikipedia_pages(query: str) -> list[dict[str, str]]:
+    return [
+        {"title": document.metadata["title"], "content": document.page_content}
+        for document in get_wikipedia().load(query)
+    ]
 
 
 @tool(return_direct=True, args_schema=WikiInput)
@@ -45,23 +100,33 @@ def search_using_wikipedia(query: str) -> str:
     Returns:
         str: search result
     """
-    return wikipedia.run({"query": query})
+    index = get_passage_index()
+    passages = index.search(query, WIKIPEDIA_LANG, WIKIPEDIA_TOP_K)
+    if not passages or passages[0].coverage < MIN_LOCAL_COVERAGE:
+        pages = get_lookup_cache().get_or_fetch(
+            "wikipedia_pages",
+            query,
+            lambda: fetch_wikipedia_pages(query),
+            lang=WIKIPEDIA_LANG,
+        )
+        for page in pages:
+            index.add_page(page["title"], page["content"], WIKIPEDIA_LANG)
+        passages = index.search(query, WIKIPEDIA_LANG, WIKIPEDIA_TOP_K)
+    if not passages:
+        return "No good Wikipedia Search Result was found"
+    return "\n\n".join(f"Page: {passage.title}\n{passage.text}" for passage in passages)
 
 
 tools = [search_using_wikipedia, get_this_year_tool]
 tools_by_name = {tool.name: tool for tool in tools}
+tool_timeouts = {search_using_wikipedia.name: 15.0, get_this_year_tool.name: 1.0}
 
 
 def call_model(state: AgentState, config: RunnableConfig) -> AgentState:
-    if "MISTRAL_API_KEY" not in os.environ:
-        os.environ["MISTRAL_API_KEY"] = settings.api_key
-
-    model = ChatMistralAI(
-        model="mistral-large-latest",  # pyright: ignore[reportCallIssue]
-        temperature=0,
-    )
-    model = model.bind_tools(tools)
+    model = get_chat_model_with_tools("mistral-large-latest", tools)
     response = model.invoke(state["messages"], config)
+    if agent_metrics is not None:
+        agent_metrics.observe_tokens(response.usage_metadata)
     return {"messages": [response], "number_of_steps": state["number_of_steps"] + 1}
 
 
@@ -69,16 +134,23 @@ def call_tool(state: AgentState) -> AgentState:
     if not isinstance(state["messages"][-1], AIMessage):
         return state
 
-    outputs = []
-    for tool_call in state["messages"][-1].tool_calls:
-        tool_result = tools_by_name[tool_call["name"]].invoke(tool_call["args"])
-        outputs.append(
-            ToolMessage(
-                content=tool_result,
-                name=tool_call["name"],
-                tool_call_id=tool_call["id"],
-            )
-        )
+    # The writer is a no-op unless the graph streams in "custom" mode and is
+    # safe to call from the tool worker threads.
+    write_event = get_stream_writer()
+
+    def observe_tool(tool: str, seconds: float | None, error: bool) -> None:
+        # A call that never ran has no latency to record
+        if agent_metrics is not None and seconds is not None:
+            agent_metrics.observe_tool(tool, seconds)
+        write_event(AgentEvent(event="tool_end", tool=tool, seconds=seconds, error=error))
+
+    tool_calls = state["messages"][-1].tool_calls
+    for tool_call in tool_calls:
+        write_event(AgentEvent(event="tool_start", tool=tool_call["name"], args=tool_call["args"]))
+    wrap_call = None if agent_metrics is None else partial(agent_metrics.profile_call, "tools")
+    outputs = run_tool_calls(
+        tool_calls, tools_by_name, tool_timeouts, observe_tool=observe_tool, wrap_call=wrap_call
+    )
     return {"messages": outputs, "number_of_steps": state["number_of_steps"] + 1}
 
 
@@ -89,28 +161,149 @@ def should_continue(state: AgentState) -> str:
     return "continue"
 
 
-builder = StateGraph(AgentState)
+def build_graph(
+    metrics: AgentMetrics | None = None, checkpointer: BaseCheckpointSaver | None = None
+) -> CompiledStateGraph:
+    llm_node, tools_node = call_model, call_tool
+    if metrics is not None:
+        llm_node = metrics.timed_node("llm", call_model)
+        # Tool calls run on workers and are profiled there, see call_tool
+        tools_node = metrics.timed_node("tools", call_tool, profile=False)
+
+    builder = StateGraph(AgentState)
+
+    builder.add_node("llm", llm_node)
+    builder.add_node("tools", tools_node)
+
+    builder.add_edge(START, "llm")
+    builder.add_conditional_edges("llm", should_continue, {"continue": "tools", "end": END})
+    builder.add_edge("tools", "llm")
+
+    return builder.compile(checkpointer=checkpointer)
+
 
-builder.add_node("llm", call_model)
-builder.add_node("tools", call_tool)
+def enable_metrics(profile_nodes: tuple[str, ...] = ()) -> AgentMetrics:
+    """Record node, tool, token and cache metrics of the agent graph
 
-builder.add_edge(START, "llm")
-builder.add_conditional_edges("llm", should_continue, {"continue": "tools", "end": END})
-builder.add_edge("tools", "llm")
+    Args:
+        profile_nodes (tuple[str, ...]): nodes to run under cProfile
 
+    Returns:
+        AgentMetrics: metrics collected from now on
+    """
+    global agent_metrics, _graph
+    cache_stats = {"lookup": get_lookup_cache().stats}
+    llm_cache = getattr(get_model_factory(), "cache", None)
+    if llm_cache is not None:
+        cache_stats["llm"] = llm_cache.stats
+    agent_metrics = AgentMetrics(profile_nodes, cache_stats)
+    _graph = build_graph(agent_metrics, get_checkpointer())
+    return agent_metrics
+
+
+def _stream_event(mode: str, chunk: Any) -> AgentEvent | None:
+    if mode == "custom":
+        return chunk
+    message, metadata = chunk
+    if metadata.get("langgraph_node") == "llm" and isinstance(message, AIMessageChunk) and message.text:
+        return AgentEvent(event="token", text=message.text)
+    return None
+
+
+def _question_inputs(question: str) -> AgentState:
+    return {"messages": [HumanMessage(content=question)], "number_of_steps": 0}
+
+
+def stream_answer(question: str, config: RunnableConfig | None = None) -> Iterator[AgentEvent]:
+    """Answer the question streaming model tokens and tool events as they happen
+
+    Args:
+        question (str): user question
+        config (RunnableConfig | None): run config, with thread_id when checkpointing
+
+    Yields:
+        AgentEvent: model token or tool start/end event
+    """
+    for mode, chunk in get_graph().stream(
+        _question_inputs(question), config, stream_mode=["messages", "custom"]
+    ):
+        if event := _stream_event(mode, chunk):  # pyright: ignore[reportArgumentType]
+            yield event
 
-graph = builder.compile()
-graph.get_graph().draw_png("graph.png")
 
+async def astream_answer(
+    question: str, config: RunnableConfig | None = None
+) -> AsyncIterator[AgentEvent]:
+    """Async version of `stream_answer`
 
-inputs: AgentState = {
-    "messages": [
-        HumanMessage(content="Сколько лет у власти последний президент Венесуэлы?"),
-    ],
-    "number_of_steps": 0,
-}
-state = graph.invoke(inputs)
+    Args:
+        question (str): user question
+        config (RunnableConfig | None): run config, with thread_id when checkpointing
 
-for message in state["messages"]:
-    message.pretty_print()
-    print("=" * 80 + "\n\n")
+    Yields:
+        AgentEvent: model token or tool start/end event
+    """
+    async for mode, chunk in get_graph().astream(
+        _question_inputs(question), config, stream_mode=["messages", "custom"]
+    ):
+        if event := _stream_event(mode, chunk):  # pyright: ignore[reportArgumentType]
+            yield event
+
+
+agent_metrics: AgentMetrics | None = None
+_graph: CompiledStateGraph | None = None
+
+
+@cache
+def get_checkpointer() -> BaseCheckpointSaver | None:
+    from settings import settings
+
+    return open_checkpointer(settings.checkpoint_path)
+
+
+def get_graph() -> CompiledStateGraph:
+    """Get the agent graph, built with the configured checkpointer on first use
+
+    Returns:
+        CompiledStateGraph: agent graph, with metrics if `enable_metrics` was called
+    """
+    global _graph
+    if _graph is None:
+        _graph = build_graph(agent_metrics, get_checkpointer())
+    return _graph
+
+
+def main() -> None:
+    from settings import settings
+
+    if settings.agent_metrics_format:
+        enable_metrics(("llm", "tools") if settings.agent_profile_dir else ())
+
+    render_graph_png(get_graph().get_graph(), "graph.png")
+
+    # With a checkpointer the thread resumes from its last saved state and
+    # only the new question is sent.
+    config: RunnableConfig = {"configurable": {"thread_id": settings.agent_thread_id}}
+    for event in stream_answer("Сколько лет у власти последний президент Венесуэлы?", config):
+        if event["event"] == "token":
+            print(event["text"], end="", flush=True)
+        elif event["event"] == "tool_start":
+            print(f"\n[{event['tool']}({event['args']})]", flush=True)
+        else:
+            outcome = "failed" if event["error"] else "done"
+            seconds = event["seconds"]
+            ran = "" if seconds is None else f" in {seconds:.2f}s"
+            print(f"[{event['tool']} {outcome}{ran}]", flush=True)
+    print()
+
+    if agent_metrics is not None:
+        if settings.agent_metrics_format == "prometheus":
+            print(agent_metrics.to_prometheus())
+        else:
+            print(agent_metrics.to_json_lines())
+        if settings.agent_profile_dir:
+            agent_metrics.dump_profiles(settings.agent_profile_dir)
+
+
+if __name__ == "__main__":
+    main()
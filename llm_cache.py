@@ -0,0 +1,294 @@
+import contextvars
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Iterator, Sequence
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.load import dumps
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    message_chunk_to_message,
+    message_to_dict,
+    messages_from_dict,
+)
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_mistralai import ChatMistralAI
+
+DEFAULT_MAX_ENTRIES = 1_000
+
+# Set while `_generate_with_cache` runs, which already looks up and updates the cache
+_generating: contextvars.ContextVar[bool] = contextvars.ContextVar("generating", default=False)
+
+
+@dataclass
+class ChatCacheStats:
+    hits: int = 0
+    misses: int = 0
+
+    def record(self, generations: RETURN_VAL_TYPE | None) -> RETURN_VAL_TYPE | None:
+        if generations is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return generations
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    return hashlib.sha256(f"{llm_string}\x00{prompt}".encode()).hexdigest()
+
+
+class InMemoryLRUChatCache(BaseCache):
+    """LRU cache of model generations bounded by number of entries."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self.stats = ChatCacheStats()
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, RETURN_VAL_TYPE] = OrderedDict()
+
+    def lookup(self, prompt: str, llm_string: str) -> RETURN_VAL_TYPE | None:
+        key = cache_key(prompt, llm_string)
+        with self._lock:
+            generations = self._entries.get(key)
+            if generations is not None:
+                self._entries.move_to_end(key)
+            return self.stats.record(generations)
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = cache_key(prompt, llm_string)
+        with self._lock:
+            self._entries[key] = return_val
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SqliteChatCache(BaseCache):
+    """Chat generations persisted in SQLite."""
+
+    def __init__(self, path: str) -> None:
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.stats = ChatCacheStats()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS generations (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+
+    def lookup(self, prompt: str, llm_string: str) -> RETURN_VAL_TYPE | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM generations WHERE key = ?",
+                (cache_key(prompt, llm_string),),
+            ).fetchone()
+        if row is None:
+            return self.stats.record(None)
+        return self.stats.record(
+            [
+                ChatGeneration(
+                    message=messages_from_dict([generation["message"]])[0],
+                    generation_info=generation["generation_info"],
+                )
+                for generation in json.loads(row[0])
+            ]
+        )
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        value = json.dumps(
+            [
+                {
+                    "message": message_to_dict(generation.message),  # pyright: ignore[reportAttributeAccessIssue]
+                    "generation_info": generation.generation_info,
+                }
+                for generation in return_val
+            ]
+        )
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO generations (key, value) VALUES (?, ?)",
+                (cache_key(prompt, llm_string), value),
+            )
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM generations")
+
+
+def _replay_chunk(generation: ChatGeneration) -> ChatGenerationChunk:
+    message = generation.message
+    tool_call_chunks = []
+    if isinstance(message, AIMessage):
+        tool_call_chunks = [
+            {
+                "name": tool_call["name"],
+                "args": json.dumps(tool_call["args"]),
+                "id": tool_call["id"],
+                "index": index,
+            }
+            for index, tool_call in enumerate(message.tool_calls)
+        ]
+    # A cache hit of `invoke` leaves only {"total_cost": 0} on a message without usage
+    usage_metadata = getattr(message, "usage_metadata", None)
+    if usage_metadata is not None and "total_tokens" not in usage_metadata:
+        usage_metadata = None
+    return ChatGenerationChunk(
+        message=AIMessageChunk(
+            content=message.content,
+            id=message.id,
+            response_metadata=message.response_metadata,
+            usage_metadata=usage_metadata,
+            tool_call_chunks=tool_call_chunks,  # pyright: ignore[reportArgumentType]
+        ),
+        generation_info=generation.generation_info,
+    )
+
+
+def _cached_generation(chunk: ChatGenerationChunk) -> ChatGeneration:
+    return ChatGeneration(
+        message=message_chunk_to_message(chunk.message),
+        generation_info=chunk.generation_info,
+    )
+
+
+class CachedChatMistralAI(ChatMistralAI):
+    """ChatMistralAI that also answers `stream` and `astream` from its cache.
+
+    `invoke` already goes through `cache`; streaming bypasses it in
+    langchain, so cached generations are replayed here as a single chunk
+    and streamed answers are stored once the stream is complete. When
+    `invoke` streams for a streaming callback, its own cache lookup and
+    update are the only ones, so every call is counted once.
+    """
+
+    def _generate_with_cache(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        token = _generating.set(True)
+        try:
+            return super()._generate_with_cache(messages, stop, run_manager, **kwargs)
+        finally:
+            _generating.reset(token)
+
+    async def _agenerate_with_cache(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        token = _generating.set(True)
+        try:
+            return await super()._agenerate_with_cache(messages, stop, run_manager, **kwargs)
+        finally:
+            _generating.reset(token)
+
+    def _cache_lookup(
+        self, messages: Sequence[BaseMessage], stop: list[str] | None, **kwargs: Any
+    ) -> tuple[BaseCache, str, str, RETURN_VAL_TYPE | None] | None:
+        if not isinstance(self.cache, BaseCache) or _generating.get():
+            return None
+        prompt = dumps(
+            [
+                message.model_copy(update={"id": None}) if message.id is not None else message
+                for message in messages
+            ]
+        )
+        llm_string = self._get_llm_string(stop=stop, **kwargs)
+        return self.cache, prompt, llm_string, self.cache.lookup(prompt, llm_string)
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        cached = self._cache_lookup(messages, stop, **kwargs)
+        if cached is None:
+            yield from super()._stream(messages, stop, run_manager, **kwargs)
+            return
+
+        cache, prompt, llm_string, generations = cached
+        if generations:
+            for generation in generations:
+                chunk = _replay_chunk(generation)  # pyright: ignore[reportArgumentType]
+                if run_manager:
+                    run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+            return
+
+        generation = None
+        for chunk in super()._stream(messages, stop, run_manager, **kwargs):
+            generation = chunk if generation is None else generation + chunk
+            yield chunk
+        if generation is not None:
+            cache.update(prompt, llm_string, [_cached_generation(generation)])
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        cached = self._cache_lookup(messages, stop, **kwargs)
+        if cached is None:
+            async for chunk in super()._astream(messages, stop, run_manager, **kwargs):
+                yield chunk
+            return
+
+        cache, prompt, llm_string, generations = cached
+        if generations:
+            for generation in generations:
+                chunk = _replay_chunk(generation)  # pyright: ignore[reportArgumentType]
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+            return
+
+        generation = None
+        async for chunk in super()._astream(messages, stop, run_manager, **kwargs):
+            generation = chunk if generation is None else generation + chunk
+            yield chunk
+        if generation is not None:
+            await cache.aupdate(prompt, llm_string, [_cached_generation(generation)])
+
+
+def open_llm_cache(backend: str, path: str = "") -> BaseCache | None:
+    """Open model response cache
+
+    Args:
+        backend (str): "memory", "sqlite" or "none"
+        path (str): SQLite database path for the sqlite backend
+
+    Returns:
+        BaseCache | None: cache or None if caching is disabled
+    """
+    if backend == "memory":
+        return InMemoryLRUChatCache()
+    if backend == "sqlite":
+        return SqliteChatCache(path)
+    if backend == "none":
+        return None
+    raise ValueError(f"unknown llm cache backend {backend!r}")
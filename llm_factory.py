@@ -0,0 +1,216 @@
+import asyncio
+import contextlib
+import threading
+from typing import TYPE_CHECKING, Protocol, Sequence
+
+import httpx
+from langchain_core.caches import BaseCache
+from langchain_core.language_models import BaseChatModel, LanguageModelInput
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import Runnable
+from langchain_core.tools import BaseTool
+from pydantic import SecretStr
+
+if TYPE_CHECKING:
+    from langchain_mistralai import ChatMistralAI
+
+DEFAULT_TIMEOUT = 120
+POOL_LIMITS = httpx.Limits(
+    max_connections=100,
+    max_keepalive_connections=20,
+    keepalive_expiry=60,
+)
+
+
+class ModelFactory(Protocol):
+    def chat_model(self, model: str, temperature: float = 0) -> BaseChatModel: ...
+
+    def chat_model_with_tools(
+        self, model: str, tools: Sequence[BaseTool], temperature: float = 0
+    ) -> Runnable[LanguageModelInput, AIMessage]: ...
+
+
+class ChatModelFactory:
+    """Chat models sharing one keep-alive connection pool.
+
+    Models are cached by (model, temperature) and tool bound models by
+    (model, temperature, tool names), so the tool schemas are converted
+    only once per process. Deterministic (temperature=0) models answer
+    repeated prompts from `cache` if it is given. The HTTP clients and the
+    langchain_mistralai import are deferred to the first model.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str,
+        timeout: int = DEFAULT_TIMEOUT,
+        cache: BaseCache | None = None,
+    ) -> None:
+        self._api_key = api_key
+        self.cache = cache
+        self._base_url = base_url
+        self._timeout = timeout
+        self._client: httpx.Client | None = None
+        self._async_client: httpx.AsyncClient | None = None
+        self._lock = threading.Lock()
+        self._models: dict[tuple[str, float], ChatMistralAI] = {}
+        self._models_with_tools: dict[
+            tuple[str, float, tuple[str, ...]],
+            Runnable[LanguageModelInput, AIMessage],
+        ] = {}
+
+    def _open_clients(self) -> tuple[httpx.Client, httpx.AsyncClient]:
+        if self._client is None or self._async_client is None:
+            headers = {
+                "Content-Type": "application/json",
+                "Accept": "application/json",
+                "Authorization": f"Bearer {self._api_key}",
+            }
+            self._client = httpx.Client(
+                base_url=self._base_url, headers=headers, timeout=self._timeout, limits=POOL_LIMITS
+            )
+            self._async_client = httpx.AsyncClient(
+                base_url=self._base_url, headers=headers, timeout=self._timeout, limits=POOL_LIMITS
+            )
+        return self._client, self._async_client
+
+    def chat_model(self, model: str, temperature: float = 0) -> "ChatMistralAI":
+        from langchain_mistralai import ChatMistralAI
+
+        from llm_cache import CachedChatMistralAI
+
+        key = (model, temperature)
+        with self._lock:
+            if key not in self._models:
+                client, async_client = self._open_clients()
+                llm_cache = self.cache if temperature == 0 else None
+                model_class = ChatMistralAI if llm_cache is None else CachedChatMistralAI
+                self._models[key] = model_class(
+                    model=model,  # pyright: ignore[reportCallIssue]
+                    temperature=temperature,
+                    cache=llm_cache,
+                    api_key=SecretStr(self._api_key),
+                    base_url=self._base_url,
+                    timeout=self._timeout,
+                    client=client,
+                    async_client=async_client,
+                )
+            return self._models[key]
+
+    def chat_model_with_tools(
+        self, model: str, tools: Sequence[BaseTool], temperature: float = 0
+    ) -> Runnable[LanguageModelInput, AIMessage]:
+        key = (model, temperature, tuple(tool.name for tool in tools))
+        with self._lock:
+            bound_model = self._models_with_tools.get(key)
+        if bound_model is not None:
+            return bound_model
+
+        bound_model = self.chat_model(model, temperature).bind_tools(tools)
+        with self._lock:
+            return self._models_with_tools.setdefault(key, bound_model)
+
+    def close(self) -> None:
+        """Close the shared clients
+
+        Without a running event loop the async client is closed on a new
+        one; inside a loop use `aclose` instead. Connections opened on an
+        event loop that is already closed cannot be shut down cleanly and
+        are left to the garbage collector.
+        """
+        if self._async_client is not None:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                pass
+            else:
+                raise RuntimeError("close() called inside an event loop, use aclose()")
+        client, async_client = self._client, self._async_client
+        self._client = self._async_client = None
+        if client is not None:
+            client.close()
+        if async_client is not None:
+            with contextlib.suppress(RuntimeError):
+                asyncio.run(async_client.aclose())
+
+    async def aclose(self) -> None:
+        """Close the shared clients from a running event loop"""
+        client, async_client = self._client, self._async_client
+        self._client = self._async_client = None
+        if client is not None:
+            client.close()
+        if async_client is not None:
+            await async_client.aclose()
+
+
+_model_factory: ModelFactory | None = None
+_model_factory_lock = threading.Lock()
+
+
+def _create_model_factory() -> ModelFactory:
+    from llm_cache import open_llm_cache
+    from settings import settings
+
+    if settings.scripted_llm_path:
+        from scripted_chat_model import ScriptedModelFactory, load_script
+
+        return ScriptedModelFactory(
+            load_script(settings.scripted_llm_path), settings.scripted_llm_latency
+        )
+
+    return ChatModelFactory(
+        settings.api_key,
+        settings.provider_base_url,
+        cache=open_llm_cache(settings.llm_cache_backend, settings.llm_cache_path),
+    )
+
+
+def get_model_factory() -> ModelFactory:
+    global _model_factory
+    with _model_factory_lock:
+        if _model_factory is None:
+            _model_factory = _create_model_factory()
+        return _model_factory
+
+
+def set_model_factory(factory: ModelFactory | None) -> None:
+    """Replace the process model factory
+
+    Models already built by the previous factory are kept by their users.
+
+    Args:
+        factory (ModelFactory | None): new factory, None to create it from settings on next use
+    """
+    global _model_factory
+    with _model_factory_lock:
+        _model_factory = factory
+
+
+def get_chat_model(model: str, temperature: float = 0) -> BaseChatModel:
+    """Get shared chat model
+
+    Args:
+        model (str): model name
+        temperature (float): sampling temperature
+
+    Returns:
+        BaseChatModel: chat model using the process connection pool
+    """
+    return get_model_factory().chat_model(model, temperature)
+
+
+def get_chat_model_with_tools(
+    model: str, tools: Sequence[BaseTool], temperature: float = 0
+) -> Runnable[LanguageModelInput, AIMessage]:
+    """Get shared chat model with bound tools
+
+    Args:
+        model (str): model name
+        tools (Sequence[BaseTool]): tools to bind
+        temperature (float): sampling temperature
+
+    Returns:
+        Runnable[LanguageModelInput, AIMessage]: chat model with bound tools
+    """
+    return get_model_factory().chat_model_with_tools(model, tools, temperature)
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from functools import cache
+from typing import Any, Callable
+
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 10_000
+# Access times are refreshed at most once per this share of the TTL, so
+# most hits only read; eviction order is exact to that resolution
+ACCESS_REFRESH_FRACTION = 0.1
+
+
+@dataclass
+class LookupCacheStats:
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    evictions: int = 0
+
+
+class LookupCache:
+    """On-disk TTL and LRU cache for search lookups.
+
+    Entries are keyed by (provider, query, options). Concurrent misses on
+    the same key share one in-flight fetch. Empty results, such as a
+    search without pages, are not stored, so the next lookup asks again.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float = DEFAULT_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stats = LookupCacheStats()
+        self._lock = threading.Lock()
+        self._in_flight: dict[str, Future[Any]] = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS lookups (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS lookups_accessed_at ON lookups (accessed_at)"
+        )
+        self._size = self._conn.execute("SELECT COUNT(*) FROM lookups").fetchone()[0]
+
+    @staticmethod
+    def make_key(provider: str, query: str, options: dict[str, Any]) -> str:
+        raw = json.dumps([provider, query, options], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _get(self, key: str) -> tuple[bool, Any]:
+        now = time.time()
+        row = self._conn.execute(
+            "SELECT value, created_at, accessed_at FROM lookups WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return False, None
+        if now - row[1] > self.ttl:
+            self._conn.execute("DELETE FROM lookups WHERE key = ?", (key,))
+            self._size -= 1
+            return False, None
+        if now - row[2] > self.ttl * ACCESS_REFRESH_FRACTION:
+            self._conn.execute("UPDATE lookups SET accessed_at = ? WHERE key = ?", (now, key))
+        return True, json.loads(row[0])
+
+    def _put(self, key: str, value: Any) -> None:
+        now = time.time()
+        row = (json.dumps(value, ensure_ascii=False), now, now, key)
+        # Only a new key grows the cache, replacing one must not trigger eviction
+        cursor = self._conn.execute(
+            "INSERT OR IGNORE INTO lookups (value, created_at, accessed_at, key) "
+            "VALUES (?, ?, ?, ?)",
+            row,
+        )
+        if cursor.rowcount:
+            self._size += 1
+        else:
+            self._conn.execute(
+                "UPDATE lookups SET value = ?, created_at = ?, accessed_at = ? WHERE key = ?", row
+            )
+        if self._size > self.max_entries:
+            evicted = self._size - self.max_entries
+            self._conn.execute(
+                "DELETE FROM lookups WHERE key IN "
+                "(SELECT key FROM lookups ORDER BY accessed_at LIMIT ?)",
+                (evicted,),
+            )
+            self._size -= evicted
+            self.stats.evictions += evicted
+
+    def get_or_fetch(self, provider: str, query: str, fetch: Callable[[], Any], **options: Any) -> Any:
+        """Get cached lookup result or fetch it
+
+        Args:
+            provider (str): lookup provider name, e.g. "wikipedia"
+            query (str): search query
+            fetch (Callable[[], Any]): fetches the result on a miss, must return JSON serializable value
+            **options: provider options that change the result, e.g. lang
+
+        Returns:
+            Any: lookup result
+        """
+        key = self.make_key(provider, query, options)
+        with self._lock:
+            found, value = self._get(key)
+            if found:
+                self.stats.hits += 1
+                return value
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                self.stats.misses += 1
+                future = self._in_flight[key] = Future()
+            else:
+                self.stats.coalesced += 1
+        if not owner:
+            return future.result()
+
+        try:
+            value = fetch()
+        except BaseException as error:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(error)
+            raise
+
+        with self._lock:
+            if value not in (None, "", [], {}):
+                self._put(key, value)
+            del self._in_flight[key]
+        future.set_result(value)
+        return value
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+@cache
+def get_lookup_cache() -> LookupCache:
+    from settings import settings
+
+    return LookupCache(settings.lookup_cache_path, settings.lookup_cache_ttl)
@@ -0,0 +1,335 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Iterator, Literal, Sequence
+
+from langchain_core.language_models import LanguageModelInput
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    HumanMessage,
+    convert_to_messages,
+    message_chunk_to_message,
+)
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.prompt_values import PromptValue
+from langchain_core.runnables import Runnable
+from langchain_core.runnables.config import RunnableConfig
+from langchain_core.tools import BaseTool
+from pydantic import ValidationError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SMALL_PROMPT_TOKENS = 3_000
+DEFAULT_MAX_SMALL_TOOLS = 8
+
+Route = Literal["small", "large"]
+Classifier = Callable[[list[BaseMessage]], Route | None]
+AnswerCheck = Callable[[AIMessage], bool]
+
+# Response metadata key of the chunk a restartable `ModelRouter` streams
+# before the large model's answer when small model text was already shown
+RESTART_KEY = "router_restart"
+
+
+def is_restart(chunk: BaseMessage) -> bool:
+    """Whether the chunk starts the answer over, dropping what came before it"""
+    return bool(chunk.response_metadata.get(RESTART_KEY))
+
+
+@dataclass
+class RoutingPolicy:
+    """Cheap local signals choosing the model of a request.
+
+    `classifier` is asked first and may return None to leave the choice
+    to the prompt size and tool count limits.
+    """
+
+    max_small_prompt_tokens: int = DEFAULT_MAX_SMALL_PROMPT_TOKENS
+    max_small_tools: int = DEFAULT_MAX_SMALL_TOOLS
+    classifier: Classifier | None = None
+
+    def route(self, messages: list[BaseMessage], tool_count: int) -> tuple[Route, str]:
+        if self.classifier is not None:
+            route = self.classifier(messages)
+            if route is not None:
+                return route, "classifier"
+        if count_tokens_approximately(messages) > self.max_small_prompt_tokens:
+            return "large", "long prompt"
+        if tool_count > self.max_small_tools:
+            return "large", "many tools"
+        return "small", "default"
+
+
+@dataclass
+class RouterStats:
+    small: int = 0
+    large: int = 0
+    escalated: int = 0
+    small_seconds: float = 0.0
+    large_seconds: float = 0.0
+    saved_seconds: float = 0.0
+
+    def mean_large_seconds(self) -> float | None:
+        return self.large_seconds / self.large if self.large else None
+
+
+def check_tool_calls(tools: Sequence[BaseTool]) -> AnswerCheck:
+    """Build an answer check passing only well-formed calls of the given tools
+
+    Args:
+        tools (Sequence[BaseTool]): tools bound to the model
+
+    Returns:
+        AnswerCheck: True if every tool call names a known tool with valid arguments
+    """
+    tools_by_name = {tool.name: tool for tool in tools}
+
+    def check(message: AIMessage) -> bool:
+        if message.invalid_tool_calls:
+            return False
+        for tool_call in message.tool_calls:
+            tool = tools_by_name.get(tool_call["name"])
+            if tool is None:
+                return False
+            schema = tool.tool_call_schema
+            if isinstance(schema, type):
+                try:
+                    schema.model_validate(tool_call["args"])
+                except ValidationError:
+                    return False
+        return True
+
+    return check
+
+
+def _to_messages(model_input: LanguageModelInput) -> list[BaseMessage]:
+    if isinstance(model_input, PromptValue):
+        return model_input.to_messages()
+    if isinstance(model_input, str):
+        return [HumanMessage(content=model_input)]
+    return convert_to_messages(model_input)
+
+
+class ModelRouter(Runnable[LanguageModelInput, AIMessage]):
+    """Chat model sending each request to a small or a large model.
+
+    The route comes from `policy`. Answers of the small model are checked
+    with the tool call check if tools are bound and with `check` if given;
+    a failed check escalates the request to the large model. When
+    streaming, the small model answer is held until it is checked, so an
+    escalated answer is never half shown. A `restartable` router is for
+    callers honouring `is_restart`: with only the tool call check, its
+    text chunks are passed through as they arrive and only tool calls are
+    held; if they fail, a restart chunk comes before the large model's
+    answer, so the caller keeps only that one. Every decision is logged
+    with the latency saved against the mean large model latency.
+    """
+
+    def __init__(
+        self,
+        small: Runnable[LanguageModelInput, AIMessage],
+        large: Runnable[LanguageModelInput, AIMessage],
+        tools: Sequence[BaseTool] = (),
+        check: AnswerCheck | None = None,
+        policy: RoutingPolicy | None = None,
+        restartable: bool = False,
+    ) -> None:
+        self.small = small
+        self.large = large
+        self.tools = tools
+        self.check = check
+        self.policy = policy or RoutingPolicy()
+        self.restartable = restartable
+        self.checks = ([check_tool_calls(tools)] if tools else []) + ([check] if check else [])
+        self.stats = RouterStats()
+        self._stats_lock = threading.Lock()
+
+    def bind_tools(self, tools: Sequence[BaseTool], **kwargs: Any) -> "ModelRouter":
+        """Bind tools to both models, answers then also get the tool call check"""
+        return ModelRouter(
+            self.small.bind_tools(tools, **kwargs),  # pyright: ignore[reportAttributeAccessIssue]
+            self.large.bind_tools(tools, **kwargs),  # pyright: ignore[reportAttributeAccessIssue]
+            tools,
+            self.check,
+            self.policy,
+            self.restartable,
+        )
+
+    def _model(self, route: Route) -> Runnable[LanguageModelInput, AIMessage]:
+        return self.small if route == "small" else self.large
+
+    def _route(self, model_input: LanguageModelInput) -> tuple[list[BaseMessage], Route, str]:
+        messages = _to_messages(model_input)
+        route, reason = self.policy.route(messages, len(self.tools))
+        return messages, route, reason
+
+    def _passes(self, message: AIMessage) -> bool:
+        return all(check(message) for check in self.checks)
+
+    def _can_show(self, chunk: AIMessageChunk) -> bool:
+        # Only the tool call check applies: text can be shown before the
+        # answer is checked, tool calls cannot. `check` may need the whole text.
+        return self.restartable and self.check is None and not chunk.tool_call_chunks
+
+    def _stream_passes(self, chunks: list[AIMessageChunk]) -> bool:
+        return bool(chunks) and self._passes(message_chunk_to_message(sum(chunks[1:], chunks[0])))  # pyright: ignore[reportArgumentType]
+
+    def _record(self, route: Route, reason: str, started_at: float, wasted: float = 0.0) -> None:
+        """Count a served request
+
+        `wasted` is the time of a small model answer that failed its check,
+        it counts against the savings.
+        """
+        seconds = time.perf_counter() - started_at
+        saved = -wasted if wasted else 0.0
+        with self._stats_lock:
+            if route == "small":
+                self.stats.small += 1
+                self.stats.small_seconds += seconds
+                mean_large = self.stats.mean_large_seconds()
+                if mean_large is not None:
+                    saved = mean_large - seconds
+            else:
+                self.stats.large += 1
+                self.stats.large_seconds += seconds
+                self.stats.escalated += wasted > 0
+            self.stats.saved_seconds += saved
+        logger.info(
+            "model route=%s reason=%s seconds=%.3f saved=%.3f",
+            route,
+            reason,
+            seconds + wasted,
+            saved,
+        )
+
+    def invoke(
+        self, input: LanguageModelInput, config: RunnableConfig | None = None, **kwargs: Any
+    ) -> AIMessage:
+        messages, route, reason = self._route(input)
+        started_at = time.perf_counter()
+        if route == "large":
+            answer = self.large.invoke(messages, config, **kwargs)
+            self._record("large", reason, started_at)
+            return answer
+
+        answer = self.small.invoke(messages, config, **kwargs)
+        if self._passes(answer):
+            self._record("small", reason, started_at)
+            return answer
+        escalated_at = time.perf_counter()
+        answer = self.large.invoke(messages, config, **kwargs)
+        self._record("large", "failed check", escalated_at, escalated_at - started_at)
+        return answer
+
+    async def ainvoke(
+        self, input: LanguageModelInput, config: RunnableConfig | None = None, **kwargs: Any
+    ) -> AIMessage:
+        messages, route, reason = self._route(input)
+        started_at = time.perf_counter()
+        if route == "large":
+            answer = await self.large.ainvoke(messages, config, **kwargs)
+            self._record("large", reason, started_at)
+            return answer
+
+        answer = await self.small.ainvoke(messages, config, **kwargs)
+        if self._passes(answer):
+            self._record("small", reason, started_at)
+            return answer
+        escalated_at = time.perf_counter()
+        answer = await self.large.ainvoke(messages, config, **kwargs)
+        self._record("large", "failed check", escalated_at, escalated_at - started_at)
+        return answer
+
+    def stream(
+        self, input: LanguageModelInput, config: RunnableConfig | None = None, **kwargs: Any
+    ) -> Iterator[AIMessageChunk]:  # pyright: ignore[reportIncompatibleMethodOverride]
+        messages, route, reason = self._route(input)
+        started_at = time.perf_counter()
+        if route == "large" or not self.checks:
+            yield from self._model(route).stream(messages, config, **kwargs)  # pyright: ignore[reportReturnType]
+            self._record(route, reason, started_at)
+            return
+
+        shown: list[AIMessageChunk] = []
+        held: list[AIMessageChunk] = []
+        for chunk in self.small.stream(messages, config, **kwargs):
+            if held or not self._can_show(chunk):  # pyright: ignore[reportArgumentType]
+                held.append(chunk)  # pyright: ignore[reportArgumentType]
+            else:
+                shown.append(chunk)  # pyright: ignore[reportArgumentType]
+                yield chunk  # pyright: ignore[reportReturnType]
+        if self._stream_passes(shown + held):
+            self._record("small", reason, started_at)
+            yield from held
+            return
+        escalated_at = time.perf_counter()
+        if shown:
+            yield AIMessageChunk(content="", response_metadata={RESTART_KEY: True})
+        yield from self.large.stream(messages, config, **kwargs)  # pyright: ignore[reportReturnType]
+        self._record("large", "failed check", escalated_at, escalated_at - started_at)
+
+    async def astream(
+        self, input: LanguageModelInput, config: RunnableConfig | None = None, **kwargs: Any
+    ) -> AsyncIterator[AIMessageChunk]:  # pyright: ignore[reportIncompatibleMethodOverride]
+        messages, route, reason = self._route(input)
+        started_at = time.perf_counter()
+        if route == "large" or not self.checks:
+            async for chunk in self._model(route).astream(messages, config, **kwargs):
+                yield chunk  # pyright: ignore[reportReturnType]
+            self._record(route, reason, started_at)
+            return
+
+        shown: list[AIMessageChunk] = []
+        held: list[AIMessageChunk] = []
+        async for chunk in self.small.astream(messages, config, **kwargs):
+            if held or not self._can_show(chunk):  # pyright: ignore[reportArgumentType]
+                held.append(chunk)  # pyright: ignore[reportArgumentType]
+            else:
+                shown.append(chunk)  # pyright: ignore[reportArgumentType]
+                yield chunk  # pyright: ignore[reportReturnType]
+        if self._stream_passes(shown + held):
+            self._record("small", reason, started_at)
+            for chunk in held:
+                yield chunk
+            return
+        escalated_at = time.perf_counter()
+        if shown:
+            yield AIMessageChunk(content="", response_metadata={RESTART_KEY: True})
+        async for chunk in self.large.astream(messages, config, **kwargs):
+            yield chunk  # pyright: ignore[reportReturnType]
+        self._record("large", "failed check", escalated_at, escalated_at - started_at)
+
+
+def get_routed_chat_model(
+    tools: Sequence[BaseTool] = (),
+    check: AnswerCheck | None = None,
+    policy: RoutingPolicy | None = None,
+    restartable: bool = False,
+) -> Runnable[LanguageModelInput, AIMessage]:
+    """Get chat model routing between the small and the large model
+
+    Args:
+        tools (Sequence[BaseTool]): tools to bind to both models
+        check (AnswerCheck | None): extra check of small model answers
+        policy (RoutingPolicy | None): routing policy, default limits if None
+        restartable (bool): the caller honours `is_restart`, so small model
+            text is streamed before the answer is checked
+
+    Returns:
+        Runnable[LanguageModelInput, AIMessage]: router, or the large model
+            alone if MODEL_ROUTING is off
+    """
+    from llm_factory import get_chat_model, get_chat_model_with_tools
+    from settings import settings
+
+    def model(name: str) -> Runnable[LanguageModelInput, AIMessage]:
+        return get_chat_model_with_tools(name, tools) if tools else get_chat_model(name)
+
+    if not settings.model_routing:
+        return model(settings.large_model)
+    return ModelRouter(
+        model(settings.small_model), model(settings.large_model), tools, check, policy, restartable
+    )
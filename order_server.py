@@ -0,0 +1,139 @@
+"""Asyncio HTTP server for the order assistant.
+
+Each request is one chat turn:
+
+    curl -N -X POST localhost:8000/chat -d '{"session_id": "alice", "question": "Create order"}'
+
+The answer is streamed back with chunked transfer encoding. Turns of one
+session are serialized, turns of different sessions run concurrently up to
+`--max-sessions` at a time.
+"""
+
+import argparse
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from order_tool import arespond
+
+MAX_REQUEST_BODY_SIZE = 64 * 1024
+
+
+class HttpError(Exception):
+    def __init__(self, status: str) -> None:
+        super().__init__(status)
+        self.status = status
+
+
+class OrderChatServer:
+    def __init__(self, max_sessions: int) -> None:
+        self._active_sessions = asyncio.Semaphore(max_sessions)
+        # Lock and number of waiting turns per session, dropped when the session is idle
+        self._session_locks: dict[str, tuple[asyncio.Lock, list[int]]] = {}
+
+    @asynccontextmanager
+    async def _session_turn(self, session_id: str) -> AsyncIterator[None]:
+        lock, waiting = self._session_locks.setdefault(session_id, (asyncio.Lock(), [0]))
+        waiting[0] += 1
+        try:
+            async with lock:
+                yield
+        finally:
+            waiting[0] -= 1
+            if not waiting[0]:
+                del self._session_locks[session_id]
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            session_id, question = await self._read_request(reader)
+        except HttpError as error:
+            await self._write_error(writer, error.status)
+            return
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            await self._write_error(writer, "400 Bad Request")
+            return
+
+        async with self._session_turn(session_id), self._active_sessions:
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: text/plain; charset=utf-8\r\n"
+                b"Transfer-Encoding: chunked\r\n"
+                b"Connection: close\r\n\r\n"
+            )
+            try:
+                async for answer_text in arespond(question, session_id):
+                    if answer_text:
+                        await self._write_chunk(writer, answer_text.encode())
+                await self._write_chunk(writer, b"")
+            except ConnectionError:
+                pass
+            finally:
+                writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> tuple[str, str]:
+        request_line = (await reader.readline()).decode("latin-1").split()
+        if len(request_line) != 3:
+            raise HttpError("400 Bad Request")
+        method, path, _ = request_line
+
+        content_length = 0
+        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                content_length = int(value)
+
+        if path != "/chat":
+            raise HttpError("404 Not Found")
+        if method != "POST":
+            raise HttpError("405 Method Not Allowed")
+        if content_length > MAX_REQUEST_BODY_SIZE:
+            raise HttpError("413 Content Too Large")
+
+        body = json.loads(await reader.readexactly(content_length))
+        session_id, question = body.get("session_id"), body.get("question")
+        if not isinstance(session_id, str) or not isinstance(question, str):
+            raise HttpError("400 Bad Request")
+        return session_id, question
+
+    async def _write_chunk(self, writer: asyncio.StreamWriter, data: bytes) -> None:
+        writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+        await writer.drain()
+
+    async def _write_error(self, writer: asyncio.StreamWriter, status: str) -> None:
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Length: 0\r\nConnection: close\r\n\r\n".encode()
+        )
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+
+async def serve(host: str, port: int, unix_socket: str | None, max_sessions: int) -> None:
+    chat_server = OrderChatServer(max_sessions)
+    if unix_socket:
+        server = await asyncio.start_unix_server(chat_server.handle, path=unix_socket)
+    else:
+        server = await asyncio.start_server(chat_server.handle, host, port)
+
+    for socket in server.sockets:
+        print(f"Serving on {socket.getsockname()}")
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Order assistant chat server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--unix-socket", default=None)
+    parser.add_argument("--max-sessions", type=int, default=256)
+    args = parser.parse_args()
+
+    asyncio.run(serve(args.host, args.port, args.unix_socket, args.max_sessions))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""Order store shared by several bot processes.
+
+    python order_service.py [--address unix:PATH | HOST:PORT] [--store PATH]
+
+Bots use it when ORDER_SERVICE_ADDRESS is set to the same address, so any
+number of bot workers on one box see the same orders. The wire protocol is
+one JSON object per line:
+
+    {"id": 7, "op": "add_items", "args": [3, [1, 2]]}
+    {"id": 7, "result": null}
+    {"id": 8, "error": "NoItemInOrderError", "args": [5]}
+
+Requests are pipelined, responses carry the request id and may come back
+out of order. A request line longer than MAX_REQUEST_SIZE gets an error
+response with a null id, then the connection is closed. Calls on one order
+are applied in arrival order, calls on different orders run concurrently on
+a thread pool.
+"""
+
+import argparse
+import asyncio
+import functools
+import itertools
+import json
+import os
+import socket
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Sequence
+
+from order_store import NoItemInOrderError, NoOrderError, OrderStore, open_order_store
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_MAX_WORKERS = 8
+# Longest request line, asyncio streams stop at 64 KiB by default
+MAX_REQUEST_SIZE = 16 * 1024 * 1024
+
+ORDER_OPERATIONS = ("add_item", "add_items", "remove_item", "remove_items", "get_order_items")
+STORE_OPERATIONS = ("create_order", "get_orders")
+ERRORS: dict[str, type[Exception]] = {
+    "NoOrderError": NoOrderError,
+    "NoItemInOrderError": NoItemInOrderError,
+}
+
+
+class OrderServiceError(RuntimeError):
+    pass
+
+
+def parse_address(address: str) -> tuple[socket.AddressFamily, Any]:
+    """Parse order service address
+
+    Args:
+        address (str): "unix:PATH" or "HOST:PORT"
+
+    Returns:
+        tuple[socket.AddressFamily, Any]: socket family and its address
+    """
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address.removeprefix("unix:")
+    host, _, port = address.rpartition(":")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+class OrderService:
+    def __init__(self, store: OrderStore, max_workers: int = DEFAULT_MAX_WORKERS) -> None:
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="order-service")
+        # Lock and number of queued calls per order, dropped when the order is idle
+        self._order_locks: dict[int, tuple[asyncio.Lock, list[int]]] = {}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        loop = asyncio.get_running_loop()
+        responses: list[bytes] = []
+        running: set[asyncio.Task] = set()
+
+        def flush() -> None:
+            if not writer.is_closing():
+                writer.write(b"".join(responses))
+            responses.clear()
+
+        def send(response: dict[str, Any]) -> None:
+            # Responses finished in the same loop iteration go out in one write
+            if not responses:
+                loop.call_soon(flush)
+            responses.append(json.dumps(response).encode() + b"\n")
+
+        try:
+            while line := await reader.readline():
+                task = asyncio.create_task(self._respond(line, send))
+                running.add(task)
+                task.add_done_callback(running.discard)
+                # Stop reading while a client that does not read its responses
+                # has a full write buffer
+                await writer.drain()
+        except ValueError:
+            # The line overran the stream limit, the rest of it cannot be framed
+            send({"id": None, "error": "OrderServiceError", "args": ["request line too long"]})
+        except ConnectionError:
+            pass
+        finally:
+            if running:
+                await asyncio.wait(running)
+            await asyncio.sleep(0)
+            writer.close()
+
+    async def _respond(self, line: bytes, send: Callable[[dict[str, Any]], None]) -> None:
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request["id"]
+            result = await self._call(request["op"], request.get("args", []))
+        except (NoOrderError, NoItemInOrderError) as error:
+            send({"id": request_id, "error": type(error).__name__, "args": list(error.args)})
+        except Exception as error:
+            send({"id": request_id, "error": "OrderServiceError", "args": [repr(error)]})
+        else:
+            send({"id": request_id, "result": result})
+
+    async def _call(self, op: str, args: Sequence[Any]) -> Any:
+        loop = asyncio.get_running_loop()
+        if op in STORE_OPERATIONS:
+            return await loop.run_in_executor(
+                self._executor, functools.partial(getattr(self.store, op), *args)
+            )
+        if op not in ORDER_OPERATIONS:
+            raise ValueError(f"unknown operation {op!r}")
+
+        order_id = args[0]
+        lock, queued = self._order_locks.setdefault(order_id, (asyncio.Lock(), [0]))
+        queued[0] += 1
+        try:
+            async with lock:
+                return await loop.run_in_executor(
+                    self._executor, functools.partial(getattr(self.store, op), *args)
+                )
+        finally:
+            queued[0] -= 1
+            if not queued[0]:
+                del self._order_locks[order_id]
+
+    def close(self) -> None:
+        self._executor.shutdown()
+
+
+class RemoteOrderStore:
+    """Order store client of the order service.
+
+    All threads of a process share one connection. Requests are pipelined:
+    a caller only waits for its own response, and requests queued while
+    another thread is sending go out together in the next send.
+    """
+
+    def __init__(self, address: str, timeout: float = DEFAULT_TIMEOUT) -> None:
+        self.address = address
+        self.timeout = timeout
+        family, socket_address = parse_address(address)
+        self._sock = socket.socket(family, socket.SOCK_STREAM)
+        self._sock.connect(socket_address)
+        if family == socket.AF_INET:
+            self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._ids = itertools.count(1)
+        self._responses: dict[int, Future[Any]] = {}
+        self._outbox: list[bytes] = []
+        self._outbox_lock = threading.Lock()
+        self._sending = False
+        self._closed = False
+        self._reader = threading.Thread(target=self._read_loop, name="order-service-client", daemon=True)
+        self._reader.start()
+
+    def _call(self, op: str, *args: Any) -> Any:
+        request_id = next(self._ids)
+        response: Future[Any] = Future()
+        self._responses[request_id] = response
+        try:
+            if self._closed:
+                raise OrderServiceError(f"connection to {self.address} is closed")
+            line = json.dumps({"id": request_id, "op": op, "args": args}).encode() + b"\n"
+            if len(line) > MAX_REQUEST_SIZE:
+                raise OrderServiceError(f"{op} request of {len(line)} bytes is too long")
+            self._send(line)
+            return response.result(self.timeout)
+        finally:
+            self._responses.pop(request_id, None)
+
+    def _send(self, line: bytes) -> None:
+        with self._outbox_lock:
+            self._outbox.append(line)
+            if self._sending:
+                return
+            self._sending = True
+        try:
+            while True:
+                with self._outbox_lock:
+                    if not self._outbox:
+                        self._sending = False
+                        return
+                    data = b"".join(self._outbox)
+                    self._outbox.clear()
+                self._sock.sendall(data)
+        except OSError as error:
+            with self._outbox_lock:
+                self._sending = False
+                self._outbox.clear()
+            raise OrderServiceError(f"cannot send to {self.address}") from error
+
+    def _read_loop(self) -> None:
+        closed_error = f"connection to {self.address} is closed"
+        try:
+            for line in self._sock.makefile("rb"):
+                response = json.loads(line)
+                if response["id"] is None:
+                    # Error of the connection, the service closes it next
+                    closed_error = f"{closed_error}: {response['args'][0]}"
+                    continue
+                future = self._responses.pop(response["id"], None)
+                if future is None:
+                    continue
+                if "error" in response:
+                    error_type = ERRORS.get(response["error"], OrderServiceError)
+                    future.set_exception(error_type(*response["args"]))
+                else:
+                    future.set_result(response["result"])
+        except (OSError, ValueError):
+            pass
+        self._closed = True
+        for request_id in list(self._responses):
+            future = self._responses.pop(request_id, None)
+            if future is not None:
+                future.set_exception(OrderServiceError(closed_error))
+
+    def create_order(self, item_ids: Sequence[int] = ()) -> int:
+        return self._call("create_order", list(item_ids))
+
+    def add_item(self, order_id: int, item_id: int) -> None:
+        self._call("add_item", order_id, item_id)
+
+    def add_items(self, order_id: int, item_ids: Sequence[int]) -> None:
+        self._call("add_items", order_id, list(item_ids))
+
+    def remove_item(self, order_id: int, item_id: int) -> None:
+        self._call("remove_item", order_id, item_id)
+
+    def remove_items(self, order_id: int, item_ids: Sequence[int]) -> None:
+        self._call("remove_items", order_id, list(item_ids))
+
+    def get_order_items(self, order_id: int) -> list[int]:
+        return self._call("get_order_items", order_id)
+
+    def get_orders(self) -> list[int]:
+        return self._call("get_orders")
+
+    def close(self) -> None:
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._reader.join()
+        self._sock.close()
+
+
+async def serve(address: str, store_path: str, max_workers: int) -> None:
+    store = open_order_store(store_path)
+    service = OrderService(store, max_workers)
+    family, socket_address = parse_address(address)
+    if family == socket.AF_UNIX:
+        os.makedirs(os.path.dirname(os.path.abspath(socket_address)), exist_ok=True)
+        server = await asyncio.start_unix_server(
+            service.handle, path=socket_address, limit=MAX_REQUEST_SIZE
+        )
+    else:
+        server = await asyncio.start_server(
+            service.handle, *socket_address, limit=MAX_REQUEST_SIZE
+        )
+
+    for server_socket in server.sockets:
+        print(f"Serving orders on {server_socket.getsockname()}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Order store service")
+    parser.add_argument("--address", default=DEFAULT_ADDRESS)
+    parser.add_argument("--store", default="", help="SQLite database path, orders are in memory if empty")
+    parser.add_argument("--max-workers", type=int, default=DEFAULT_MAX_WORKERS)
+    args = parser.parse_args()
+
+    asyncio.run(serve(args.address, args.store, args.max_workers))
+
+
+if __name__ == "__main__":
+    main()
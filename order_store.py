@@ -0,0 +1,277 @@
+import itertools
+import sqlite3
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator, Protocol, Sequence
+
+
+class NoOrderError(LookupError):
+    pass
+
+
+class NoItemInOrderError(LookupError):
+    """Raised with the ids of the items missing in the order"""
+
+
+class OrderStore(Protocol):
+    def create_order(self, item_ids: Sequence[int] = ()) -> int: ...
+
+    def add_item(self, order_id: int, item_id: int) -> None: ...
+
+    def add_items(self, order_id: int, item_ids: Sequence[int]) -> None: ...
+
+    def remove_item(self, order_id: int, item_id: int) -> None: ...
+
+    def remove_items(self, order_id: int, item_ids: Sequence[int]) -> None: ...
+
+    def get_order_items(self, order_id: int) -> list[int]: ...
+
+    def get_orders(self) -> list[int]: ...
+
+
+class InMemoryOrderStore:
+    """Orders indexed by id, each order is a multiset of item ids.
+
+    Ids come from a counter and every order has its own lock, so calls on
+    different orders never wait for each other.
+    """
+
+    def __init__(self) -> None:
+        self._ids = itertools.count(1)
+        self._orders: dict[int, tuple[threading.Lock, Counter[int]]] = {}
+
+    def _order(self, order_id: int) -> tuple[threading.Lock, Counter[int]]:
+        order = self._orders.get(order_id)
+        if order is None:
+            raise NoOrderError(order_id)
+        return order
+
+    def create_order(self, item_ids: Sequence[int] = ()) -> int:
+        # next() on a count and a dict assignment are atomic, no lock needed
+        order_id = next(self._ids)
+        self._orders[order_id] = (threading.Lock(), Counter(item_ids))
+        return order_id
+
+    def add_item(self, order_id: int, item_id: int) -> None:
+        lock, order = self._order(order_id)
+        with lock:
+            order[item_id] += 1
+
+    def add_items(self, order_id: int, item_ids: Sequence[int]) -> None:
+        lock, order = self._order(order_id)
+        with lock:
+            order.update(item_ids)
+
+    def remove_item(self, order_id: int, item_id: int) -> None:
+        lock, order = self._order(order_id)
+        with lock:
+            count = order.get(item_id, 0)
+            if count == 0:
+                raise NoItemInOrderError(item_id)
+            if count == 1:
+                del order[item_id]
+            else:
+                order[item_id] = count - 1
+
+    def remove_items(self, order_id: int, item_ids: Sequence[int]) -> None:
+        lock, order = self._order(order_id)
+        removed = Counter(item_ids)
+        with lock:
+            missing = [item_id for item_id, count in removed.items() if order[item_id] < count]
+            if missing:
+                raise NoItemInOrderError(*missing)
+            order.subtract(removed)
+            for item_id in removed:
+                if order[item_id] == 0:
+                    del order[item_id]
+
+    def get_order_items(self, order_id: int) -> list[int]:
+        lock, order = self._order(order_id)
+        with lock:
+            return list(order.elements())
+
+    def get_orders(self) -> list[int]:
+        return sorted(self._orders)
+
+
+class SqliteOrderStore:
+    """Orders persisted in a SQLite database in WAL mode."""
+
+    def __init__(self, path: str) -> None:
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS orders (
+                id INTEGER PRIMARY KEY AUTOINCREMENT
+            );
+            CREATE TABLE IF NOT EXISTS order_items (
+                order_id INTEGER NOT NULL REFERENCES orders(id),
+                item_id INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (order_id, item_id)
+            ) WITHOUT ROWID;
+            """
+        )
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        self._conn.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def _check_order(self, order_id: int) -> None:
+        row = self._conn.execute(
+            "SELECT 1 FROM orders WHERE id = ?", (order_id,)
+        ).fetchone()
+        if row is None:
+            raise NoOrderError(order_id)
+
+    def _add_counts(self, order_id: int, counts: Counter[int]) -> None:
+        self._conn.executemany(
+            """
+            INSERT INTO order_items (order_id, item_id, count) VALUES (?, ?, ?)
+            ON CONFLICT (order_id, item_id) DO UPDATE SET count = count + excluded.count
+            """,
+            [(order_id, item_id, count) for item_id, count in counts.items()],
+        )
+
+    def create_order(self, item_ids: Sequence[int] = ()) -> int:
+        with self._lock, self._transaction():
+            order_id: int = self._conn.execute("INSERT INTO orders DEFAULT VALUES").lastrowid  # pyright: ignore[reportAssignmentType]
+            self._add_counts(order_id, Counter(item_ids))
+            return order_id
+
+    def add_item(self, order_id: int, item_id: int) -> None:
+        with self._lock:
+            self._check_order(order_id)
+            self._conn.execute(
+                """
+                INSERT INTO order_items (order_id, item_id, count) VALUES (?, ?, 1)
+                ON CONFLICT (order_id, item_id) DO UPDATE SET count = count + 1
+                """,
+                (order_id, item_id),
+            )
+
+    def add_items(self, order_id: int, item_ids: Sequence[int]) -> None:
+        with self._lock, self._transaction():
+            self._check_order(order_id)
+            self._add_counts(order_id, Counter(item_ids))
+
+    def remove_item(self, order_id: int, item_id: int) -> None:
+        with self._lock:
+            self._check_order(order_id)
+            row = self._conn.execute(
+                "SELECT count FROM order_items WHERE order_id = ? AND item_id = ?",
+                (order_id, item_id),
+            ).fetchone()
+            if row is None:
+                raise NoItemInOrderError(item_id)
+            if row[0] == 1:
+                self._conn.execute(
+                    "DELETE FROM order_items WHERE order_id = ? AND item_id = ?",
+                    (order_id, item_id),
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE order_items SET count = count - 1 WHERE order_id = ? AND item_id = ?",
+                    (order_id, item_id),
+                )
+
+    def remove_items(self, order_id: int, item_ids: Sequence[int]) -> None:
+        removed = Counter(item_ids)
+        with self._lock, self._transaction():
+            self._check_order(order_id)
+            if not removed:
+                return
+            counts = dict(
+                self._conn.execute(
+                    "SELECT item_id, count FROM order_items WHERE order_id = ? AND item_id IN "
+                    f"({', '.join('?' * len(removed))})",
+                    (order_id, *removed),
+                ).fetchall()
+            )
+            missing = [item_id for item_id, count in removed.items() if counts.get(item_id, 0) < count]
+            if missing:
+                raise NoItemInOrderError(*missing)
+            self._conn.executemany(
+                "UPDATE order_items SET count = count - ? WHERE order_id = ? AND item_id = ?",
+                [(count, order_id, item_id) for item_id, count in removed.items()],
+            )
+            self._conn.execute(
+                "DELETE FROM order_items WHERE order_id = ? AND count = 0", (order_id,)
+            )
+
+    def get_order_items(self, order_id: int) -> list[int]:
+        with self._lock:
+            self._check_order(order_id)
+            rows = self._conn.execute(
+                "SELECT item_id, count FROM order_items WHERE order_id = ?",
+                (order_id,),
+            ).fetchall()
+        return [item_id for item_id, count in rows for _ in range(count)]
+
+    def get_orders(self) -> list[int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT id FROM orders ORDER BY id").fetchall()
+        return [order_id for (order_id,) in rows]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def open_order_store(path: str = "", service_address: str = "") -> OrderStore:
+    """Open order store
+
+    Args:
+        path (str): SQLite database path, empty string keeps orders in memory
+        service_address (str): order service address, "unix:PATH" or "HOST:PORT";
+            when set, `path` is ignored and orders are kept by the service
+
+    Returns:
+        OrderStore: order store
+    """
+    if service_address:
+        from order_service import RemoteOrderStore
+
+        return RemoteOrderStore(service_address)
+    if not path:
+        return InMemoryOrderStore()
+    return SqliteOrderStore(path)
+
+
+_order_store: OrderStore | None = None
+_order_store_lock = threading.Lock()
+
+
+def get_order_store() -> OrderStore:
+    """Get the process order store, opened from settings on first use
+
+    Returns:
+        OrderStore: order store shared by the order bots
+    """
+    global _order_store
+    with _order_store_lock:
+        if _order_store is None:
+            from settings import settings
+
+            _order_store = open_order_store(settings.order_store_path, settings.order_service_address)
+        return _order_store
+
+
+def set_order_store(store: OrderStore | None) -> None:
+    """Replace the process order store
+
+    Args:
+        store (OrderStore | None): new store, None to open it from settings on next use
+    """
+    global _order_store
+    with _order_store_lock:
+        _order_store = store
@@ -1,126 +1,60 @@
+import asyncio
 import json
-import os
-
-from langchain_core.chat_history import InMemoryChatMessageHistory
-from langchain_core.messages import HumanMessage, trim_messages
-from langchain_core.messages.tool import ToolMessage
+from functools import cache
+from typing import AsyncIterator, Iterator
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.language_models import LanguageModelInput
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    HumanMessage,
+    message_chunk_to_message,
+)
+from langchain_core.messages.tool import ToolCall, ToolMessage
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.runnables.history import RunnableWithMessageHistory
-from langchain_core.tools import tool
-from langchain_mistralai import ChatMistralAI
-from pydantic import Field
-
-from settings import settings
-
-SUCCESS_ADD_ITEM_MESSAGE = "success add item message"
-ERROR_NO_ORDER_MESSAGE = "error no order message"
-SUCCESS_REMOVE_ITEM_MESSAGE = "success remove item message"
-ERROR_NO_ITEM_IN_ORDER_MESSAGE = "error no item in order message"
+from langchain_core.runnables import Runnable
 
-if "MISTRAL_API_KEY" not in os.environ:
-    os.environ["MISTRAL_API_KEY"] = settings.api_key
+from chat_history_store import SessionHistories
+from model_router import get_routed_chat_model, is_restart
+from order_tools import create_order, create_order_with_items, tools
 
 DEFAULT_SESSION_ID = "default"
-chat_history = InMemoryChatMessageHistory()
-orders_id = 0
-orders: list[list[int]] = list()
+MAX_HISTORY_TOKENS = 4_000
+MAX_TOOL_ROUNDS = 3
 
 
-@tool
-def create_order() -> int:
-    """Create new order.
-
-    Returns:
-        int: Order id
-    """
-    global orders_id
-    orders_id += 1
-    orders.append(list())
+def get_session_history(session_id: str) -> BaseChatMessageHistory:
+    return session_histories.get(session_id)
 
-    return orders_id
 
-
-@tool
-def add_item_to_order(
-    order_id: int = Field(description="order id"),
-    item_id: int = Field(description="item id"),
-) -> str:
-    """Add an item to an existing order.
+def order_facts(messages: list[BaseMessage]) -> list[str]:
+    """Orders created in the messages, kept when they leave the history window
 
     Args:
-        order_id (int): excist order id
-        item_id (int): id of the item being added to add id
+        messages (list[BaseMessage]): messages dropped from the history
 
     Returns:
-        str: "success add item message" if successfull operation else "error no order message"
+        list[str]: one fact per created order
     """
-    if (order_id - 1) > len(orders):
-        return ERROR_NO_ORDER_MESSAGE
-
-    orders[order_id - 1].append(item_id)
-    return SUCCESS_ADD_ITEM_MESSAGE
-
-
-@tool
-def remove_item_from_order(
-    order_id: int = Field(description="order id"),
-    item_id: int = Field(description="item id"),
-) -> str:
-    """Remove item in order.
-
-    Args:
-        order_id (int): excist order id
-        item_id (int): remove item id
-
-    Returns:
-        str: "success remove item message" if successfull operation else if order no exists "error no order message" else "error no item in order message"
-    """
-    if (order_id - 1) > len(orders):
-        return ERROR_NO_ORDER_MESSAGE
-    order = orders[order_id - 1]
-    if item_id not in order:
-        return ERROR_NO_ITEM_IN_ORDER_MESSAGE
-
-    order.remove(item_id)
-    return SUCCESS_REMOVE_ITEM_MESSAGE
-
-
-@tool
-def get_order_items(order_id: int = Field(description="order id")) -> list[int]:
-    """Get order items.
-
-    Args:
-        order_id (int): order_id
-
-    Returns:
-        list[int]: order items id
-    """
-    if (order_id - 1) > len(orders):
-        return []
-
-    return orders[order_id - 1]
-
-
-@tool
-def get_orders() -> list[int]:
-    """Get all orders
+    creating_calls = {
+        tool_call["id"]
+        for message in messages
+        if isinstance(message, AIMessage)
+        for tool_call in message.tool_calls
+        if tool_call["name"] in (create_order.name, create_order_with_items.name)
+    }
+    return [
+        f"order {message.content} was created"
+        for message in messages
+        if isinstance(message, ToolMessage) and message.tool_call_id in creating_calls
+    ]
 
-    Returns:
-        list[int]: all exists orders id
-    """
-    if len(orders) == 0:
-        return []
-    return list(range(1, orders_id))
 
+session_histories = SessionHistories(MAX_HISTORY_TOKENS, order_facts)
 
-tools = {
-    create_order.name: create_order,
-    add_item_to_order.name: add_item_to_order,
-    remove_item_from_order.name: remove_item_from_order,
-    get_order_items.name: get_order_items,
-    get_orders.name: get_orders,
-}
 
 messages = [
     (
@@ -132,70 +66,116 @@ messages = [
 ]
 prompt = ChatPromptTemplate(messages)
 
-trimmer = trim_messages(
-    strategy="last",
-    token_counter=len,
-    max_tokens=10,
-    start_on="human",
-    end_on="human",
-    include_system=True,
-    allow_partial=False,
-)
 
+@cache
+def get_llm_with_tools() -> Runnable[LanguageModelInput, AIMessage]:
+    # Built on the first turn, so importing the bot creates no model client
+    return get_routed_chat_model(list(tools.values()), restartable=True)
 
-llm = ChatMistralAI(
-    model="mistral-large-latest",  # pyright: ignore[reportCallIssue]
-    temperature=0,
-)
-llm_with_tools = llm.bind_tools(
-    [
-        create_order,
-        add_item_to_order,
-        remove_item_from_order,
-        get_order_items,
-        get_orders,
+
+@cache
+def get_chain() -> Runnable[dict, AIMessage]:
+    return prompt | get_llm_with_tools()
+
+
+def _tool_message(tool_call: ToolCall) -> ToolMessage:
+    tool_result = tools[tool_call["name"]].invoke(tool_call["args"])
+    return ToolMessage(content=json.dumps(tool_result), tool_call_id=tool_call["id"])
+
+
+def _tool_messages(ai_msg: AIMessageChunk) -> list[ToolMessage]:
+    return [
+        _tool_message(tool_call)
+        for tool_call in ai_msg.tool_calls
+        if tool_call["name"] in tools
     ]
-)
 
-chain = prompt | trimmer | llm_with_tools
 
-chain_with_history = RunnableWithMessageHistory(
-    chain,
-    lambda session_id: chat_history,
-    input_messages_key="question",
-    history_messages_key="history",
-)
+def respond(question: str, session_id: str = DEFAULT_SESSION_ID) -> Iterator[str]:
+    """Answer the question in the session
+
+    The model is streamed once per round: text is yielded as soon as it
+    arrives and tools are run only if the streamed message has tool calls.
+    When the router restarts an answer on the large model, only the
+    restarted answer is kept in the history.
+
+    Args:
+        question (str): user question
+        session_id (str): chat session id
+
+    Yields:
+        str: answer text chunks
+    """
+    with session_histories.turn(session_id) as chat_history:
+        stream = get_chain().stream({"question": question, "history": chat_history.messages})
+        for round_number in range(MAX_TOOL_ROUNDS + 1):
+            ai_msg = None
+            for answer_chunk in stream:
+                if is_restart(answer_chunk):
+                    ai_msg = None
+                    continue
+                ai_msg = answer_chunk if ai_msg is None else ai_msg + answer_chunk
+                if answer_chunk.text:
+                    yield answer_chunk.text
+
+            if ai_msg is None:
+                return
+            turn_messages = [HumanMessage(content=question)] if round_number == 0 else []
+            chat_history.add_messages([*turn_messages, message_chunk_to_message(ai_msg)])
+            if not ai_msg.tool_calls or round_number == MAX_TOOL_ROUNDS:
+                return
+
+            chat_history.add_messages(_tool_messages(ai_msg))
+            stream = get_llm_with_tools().stream(chat_history.messages)
+
+
+async def arespond(question: str, session_id: str = DEFAULT_SESSION_ID) -> AsyncIterator[str]:
+    """Async version of `respond`
+
+    Tools run on a worker thread, so a slow order store does not hold up
+    the other sessions on the event loop.
+
+    Args:
+        question (str): user question
+        session_id (str): chat session id
+
+    Yields:
+        str: answer text chunks
+    """
+    with session_histories.turn(session_id) as chat_history:
+        stream = get_chain().astream(
+            {"question": question, "history": await chat_history.aget_messages()}
+        )
+        for round_number in range(MAX_TOOL_ROUNDS + 1):
+            ai_msg = None
+            async for answer_chunk in stream:
+                if is_restart(answer_chunk):
+                    ai_msg = None
+                    continue
+                ai_msg = answer_chunk if ai_msg is None else ai_msg + answer_chunk
+                if answer_chunk.text:
+                    yield answer_chunk.text
+
+            if ai_msg is None:
+                return
+            turn_messages = [HumanMessage(content=question)] if round_number == 0 else []
+            await chat_history.aadd_messages([*turn_messages, message_chunk_to_message(ai_msg)])
+            if not ai_msg.tool_calls or round_number == MAX_TOOL_ROUNDS:
+                return
+
+            # The order store may block on disk or on the order service, keep it off the event loop
+            await chat_history.aadd_messages(await asyncio.to_thread(_tool_messages, ai_msg))
+            stream = get_llm_with_tools().astream(await chat_history.aget_messages())
+
+
+if __name__ == "__main__":
+    while True:
+        print()
+        user_question = input("You: ")
+        if user_question.startswith("/bye"):
+            break
 
-while True:
-    print()
-    user_question = input("You: ")
-    if user_question.startswith("/bye"):
-        break
-
-    print("Bot: ", end="")
-    ai_msg = chain_with_history.invoke(
-        {"question": user_question},
-        config={"configurable": {"session_id": DEFAULT_SESSION_ID}},
-    )
-    call_tool = False
-    for tool_call in ai_msg.tool_calls:
-        call_tool = True
-        if tool_call["name"] in tools:
-            tool_result = tools[tool_call["name"]].invoke(tool_call["args"])
-            tool_message = ToolMessage(
-                content=json.dumps(tool_result), tool_call_id=tool_call["id"]
-            )
-            chat_history.add_message(tool_message)
-
-    if call_tool:
-        msg = llm_with_tools.invoke(chat_history.messages)
-        print(msg.content, end="")
+        print("Bot: ", end="")
+        for answer_text in respond(user_question):
+            print(answer_text, end="")
         print()
-        continue
-
-    for answer_chunk in chain_with_history.stream(
-        {"question": user_question},
-        config={"configurable": {"session_id": DEFAULT_SESSION_ID}},
-    ):
-        print(answer_chunk.content, end="")
-    print()
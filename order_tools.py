@@ -0,0 +1,166 @@
+from langchain_core.tools import tool
+from pydantic import Field
+
+from order_store import NoItemInOrderError, NoOrderError, get_order_store
+
+SUCCESS_ADD_ITEM_MESSAGE = "success add item message"
+ERROR_NO_ORDER_MESSAGE = "error no order message"
+SUCCESS_REMOVE_ITEM_MESSAGE = "success remove item message"
+ERROR_NO_ITEM_IN_ORDER_MESSAGE = "error no item in order message"
+ERROR_NOTHING_REMOVED_MESSAGE = "error nothing removed message"
+
+
+@tool
+def create_order() -> int:
+    """Create new order.
+
+    Returns:
+        int: Order id
+    """
+    return get_order_store().create_order()
+
+
+@tool
+def add_item_to_order(
+    order_id: int = Field(description="order id"),
+    item_id: int = Field(description="item id"),
+) -> str:
+    """Add an item to an existing order.
+
+    Args:
+        order_id (int): excist order id
+        item_id (int): id of the item being added to add id
+
+    Returns:
+        str: "success add item message" if successfull operation else "error no order message"
+    """
+    try:
+        get_order_store().add_item(order_id, item_id)
+    except NoOrderError:
+        return ERROR_NO_ORDER_MESSAGE
+    return SUCCESS_ADD_ITEM_MESSAGE
+
+
+@tool
+def remove_item_from_order(
+    order_id: int = Field(description="order id"),
+    item_id: int = Field(description="item id"),
+) -> str:
+    """Remove item in order.
+
+    Args:
+        order_id (int): excist order id
+        item_id (int): remove item id
+
+    Returns:
+        str: "success remove item message" if successfull operation else if order no exists "error no order message" else "error no item in order message"
+    """
+    try:
+        get_order_store().remove_item(order_id, item_id)
+    except NoOrderError:
+        return ERROR_NO_ORDER_MESSAGE
+    except NoItemInOrderError:
+        return ERROR_NO_ITEM_IN_ORDER_MESSAGE
+    return SUCCESS_REMOVE_ITEM_MESSAGE
+
+
+@tool
+def create_order_with_items(
+    item_ids: list[int] = Field(description="ids of the items, repeat an id to add several pieces"),
+) -> int:
+    """Create new order with its items in one call.
+
+    Args:
+        item_ids (list[int]): ids of the items being added
+
+    Returns:
+        int: Order id
+    """
+    return get_order_store().create_order(item_ids)
+
+
+@tool
+def add_items_to_order(
+    order_id: int = Field(description="order id"),
+    item_ids: list[int] = Field(description="ids of the items, repeat an id to add several pieces"),
+) -> dict[int, str]:
+    """Add several items to an existing order in one call. Either all items are added or none.
+
+    Args:
+        order_id (int): excist order id
+        item_ids (list[int]): ids of the items being added
+
+    Returns:
+        dict[int, str]: result per item id, "success add item message" or "error no order message"
+    """
+    try:
+        get_order_store().add_items(order_id, item_ids)
+    except NoOrderError:
+        return dict.fromkeys(item_ids, ERROR_NO_ORDER_MESSAGE)
+    return dict.fromkeys(item_ids, SUCCESS_ADD_ITEM_MESSAGE)
+
+
+@tool
+def remove_items_from_order(
+    order_id: int = Field(description="order id"),
+    item_ids: list[int] = Field(description="ids of the items, repeat an id to remove several pieces"),
+) -> dict[int, str]:
+    """Remove several items from an order in one call. Either all items are removed or none.
+
+    Args:
+        order_id (int): excist order id
+        item_ids (list[int]): ids of the items being removed
+
+    Returns:
+        dict[int, str]: result per item id, "success remove item message" if all items are removed, else "error no order message", "error no item in order message" for missing items and "error nothing removed message" for the others
+    """
+    try:
+        get_order_store().remove_items(order_id, item_ids)
+    except NoOrderError:
+        return dict.fromkeys(item_ids, ERROR_NO_ORDER_MESSAGE)
+    except NoItemInOrderError as error:
+        return {
+            item_id: ERROR_NO_ITEM_IN_ORDER_MESSAGE
+            if item_id in error.args
+            else ERROR_NOTHING_REMOVED_MESSAGE
+            for item_id in item_ids
+        }
+    return dict.fromkeys(item_ids, SUCCESS_REMOVE_ITEM_MESSAGE)
+
+
+@tool
+def get_order_items(order_id: int = Field(description="order id")) -> list[int]:
+    """Get order items.
+
+    Args:
+        order_id (int): order_id
+
+    Returns:
+        list[int]: order items id
+    """
+    try:
+        return get_order_store().get_order_items(order_id)
+    except NoOrderError:
+        return []
+
+
+@tool
+def get_orders() -> list[int]:
+    """Get all orders
+
+    Returns:
+        list[int]: all exists orders id
+    """
+    return get_order_store().get_orders()
+
+
+tools = {
+    create_order.name: create_order,
+    add_item_to_order.name: add_item_to_order,
+    remove_item_from_order.name: remove_item_from_order,
+    create_order_with_items.name: create_order_with_items,
+    add_items_to_order.name: add_items_to_order,
+    remove_items_from_order.name: remove_items_from_order,
+    get_order_items.name: get_order_items,
+    get_orders.name: get_orders,
+}
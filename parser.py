@@ -1,14 +1,16 @@
-import os
+from functools import cache
+from typing import Any, Iterator
 
+from langchain_core.exceptions import OutputParserException
+from langchain_core.messages import AIMessage
 from langchain_core.output_parsers import PydanticOutputParser
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_mistralai import ChatMistralAI
+from langchain_core.runnables import Runnable
 from pydantic import BaseModel, Field
 
-from settings import settings
-
-if "MISTRAL_API_KEY" not in os.environ:
-    os.environ["MISTRAL_API_KEY"] = settings.api_key
+from llm_factory import get_chat_model
+from model_router import get_routed_chat_model
+from streaming_parser import StreamingPydanticOutputParser
 
 
 class Person(BaseModel):
@@ -17,24 +19,62 @@ class Person(BaseModel):
     age: int = Field(description="age of hero")
 
 
-llm = ChatMistralAI(
-    model="mistral-small-2506",  # pyright: ignore[reportCallIssue]
-    temperature=0,
-)
-
 messages = [
     ("system", "Handle the user query.\n{format_instructions}"),
     ("human", "{user_query}"),
 ]
 prompt_template = ChatPromptTemplate(messages)
 output_parser = PydanticOutputParser(pydantic_object=Person)
-
-prompt_value = prompt_template.invoke(
-    {
-        "format_instructions": output_parser.get_format_instructions(),
-        "user_query": "Генрих Смит был восемнацдцателетним юношей, мечтающим уехать в город",
-    }
+extraction_prompt = prompt_template.partial(
+    format_instructions=output_parser.get_format_instructions()
 )
 
-answer = llm.invoke(prompt_value.to_messages())
-print(output_parser.invoke(answer))
+
+def is_person(answer: AIMessage) -> bool:
+    try:
+        output_parser.parse(answer.text)
+    except OutputParserException:
+        return False
+    return True
+
+
+@cache
+def get_extraction_chain() -> Runnable[dict[str, Any], AIMessage]:
+    # Answers of the small model that do not parse are retried on the large one
+    return extraction_prompt | get_routed_chat_model(check=is_person)
+
+
+@cache
+def get_streaming_extraction_chain() -> Runnable[dict[str, Any], AIMessage]:
+    from settings import settings
+
+    # Streaming stays on the small model, an invalid answer aborts early instead
+    return extraction_prompt | get_chat_model(settings.small_model)
+
+
+def stream_person(user_query: str) -> Iterator[dict[str, Any] | Person]:
+    """Extract a person while the answer streams
+
+    The generation is cancelled as soon as the answer cannot be a `Person`.
+
+    Args:
+        user_query (str): text about the person
+
+    Raises:
+        OutputParserException: the answer is not a valid `Person`
+
+    Yields:
+        dict[str, Any] | Person: fields extracted so far after every field,
+            then the person
+    """
+    streaming_parser = StreamingPydanticOutputParser(Person)
+    yield from streaming_parser.parse_stream(
+        get_streaming_extraction_chain().stream({"user_query": user_query})
+    )
+
+
+if __name__ == "__main__":
+    for extracted in stream_person(
+        "Генрих Смит был восемнацдцателетним юношей, мечтающим уехать в город"
+    ):
+        print(extracted)
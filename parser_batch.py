@@ -0,0 +1,169 @@
+"""Extract `Person` objects from a JSONL corpus.
+
+Every input line is a JSON object with the text in `--text-field`:
+
+    python parser_batch.py corpus.jsonl persons.jsonl --dead-letter failed.jsonl
+
+Results are written as they complete, so output order may differ from
+input order; every output line carries the input line number. Lines that
+cannot be read, requests that fail after all retries and answers that do
+not parse as `Person` go to the dead-letter file.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Iterator, TextIO
+
+from langchain_core.exceptions import OutputParserException
+from langchain_core.messages import AIMessage
+from langchain_core.runnables.config import RunnableConfig
+
+from parser import get_extraction_chain, output_parser
+
+CHUNK_SIZE_PER_WORKER = 8
+
+
+@dataclass
+class BatchStats:
+    documents: int = 0
+    extracted: int = 0
+    failed: int = 0
+    tokens: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+
+    def report(self) -> str:
+        elapsed = max(time.perf_counter() - self.started_at, 1e-9)
+        return (
+            f"{self.documents} docs ({self.extracted} extracted, {self.failed} failed) "
+            f"in {elapsed:.1f}s: {self.documents / elapsed:.2f} docs/s, "
+            f"{self.tokens / elapsed:.1f} tokens/s"
+        )
+
+
+def read_records(
+    input_file: TextIO, text_field: str
+) -> Iterator[tuple[int, dict[str, Any] | str, str | None]]:
+    for line_number, line in enumerate(input_file, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as error:
+            yield line_number, line.rstrip("\n"), f"invalid json: {error}"
+            continue
+        if not isinstance(record, dict) or not isinstance(record.get(text_field), str):
+            yield line_number, record, f"no text field {text_field!r}"
+            continue
+        yield line_number, record, None
+
+
+def write_json_line(file: TextIO, value: dict[str, Any]) -> None:
+    file.write(json.dumps(value, ensure_ascii=False) + "\n")
+
+
+async def extract_persons(
+    input_file: TextIO,
+    output_file: TextIO,
+    dead_letter_file: TextIO,
+    text_field: str = "text",
+    concurrency: int = 8,
+    max_attempts: int = 3,
+) -> BatchStats:
+    """Extract persons from JSONL records
+
+    Args:
+        input_file (TextIO): JSONL corpus
+        output_file (TextIO): JSONL extraction results
+        dead_letter_file (TextIO): JSONL records that failed
+        text_field (str): record field with the text
+        concurrency (int): max model requests in flight
+        max_attempts (int): attempts per request, with exponential backoff between them
+
+    Returns:
+        BatchStats: batch statistics
+    """
+    chain = get_extraction_chain().with_retry(
+        stop_after_attempt=max_attempts, wait_exponential_jitter=True
+    )
+    config: RunnableConfig = {"max_concurrency": concurrency}
+    stats = BatchStats()
+
+    def dead_letter(line_number: int, record: Any, error: str, output: str | None = None) -> None:
+        stats.failed += 1
+        write_json_line(
+            dead_letter_file,
+            {"line": line_number, "record": record, "error": error, "output": output},
+        )
+
+    records = read_records(input_file, text_field)
+    while chunk := list(islice(records, concurrency * CHUNK_SIZE_PER_WORKER)):
+        pending = []
+        for line_number, record, error in chunk:
+            stats.documents += 1
+            if error is not None:
+                dead_letter(line_number, record, error)
+            else:
+                pending.append((line_number, record))
+
+        inputs = [{"user_query": record[text_field]} for _, record in pending]  # pyright: ignore[reportIndexIssue]
+        async for index, answer in chain.abatch_as_completed(
+            inputs, config, return_exceptions=True
+        ):
+            line_number, record = pending[index]
+            if isinstance(answer, Exception):
+                dead_letter(line_number, record, repr(answer))
+                continue
+
+            if isinstance(answer, AIMessage) and answer.usage_metadata:
+                stats.tokens += answer.usage_metadata["total_tokens"]
+            try:
+                person = output_parser.invoke(answer)
+            except OutputParserException as error:
+                dead_letter(line_number, record, str(error), answer.text)
+                continue
+
+            stats.extracted += 1
+            write_json_line(
+                output_file,
+                {"line": line_number, "id": record.get("id"), "person": person.model_dump()},  # pyright: ignore[reportAttributeAccessIssue]
+            )
+
+        print(stats.report(), file=sys.stderr)
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Batch Person extraction")
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--dead-letter", default="dead_letter.jsonl")
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-attempts", type=int, default=3)
+    args = parser.parse_args()
+
+    with (
+        open(args.input, encoding="utf-8") as input_file,
+        open(args.output, "w", encoding="utf-8") as output_file,
+        open(args.dead_letter, "w", encoding="utf-8") as dead_letter_file,
+    ):
+        stats = asyncio.run(
+            extract_persons(
+                input_file,
+                output_file,
+                dead_letter_file,
+                args.text_field,
+                args.concurrency,
+                args.max_attempts,
+            )
+        )
+    print(stats.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from functools import cache
+
+DEFAULT_PASSAGE_CHARS = 800
+DEFAULT_TOP_K = 4
+# Terms are cut to this prefix and matched as FTS5 prefix queries, a light
+# stemmer that also works for Russian word forms
+STEM_CHARS = 6
+MIN_TERM_CHARS = 3
+TITLE_WEIGHT = 2.0
+# Question and filler words, they say nothing about which page answers
+STOP_WORDS = frozenset(
+    {
+        "сколько", "какой", "какая", "какое", "какие", "каких", "который", "которая", "которые",
+        "когда", "где", "кто", "что", "чем", "почему", "зачем", "как", "это", "этот", "эта",
+        "был", "была", "было", "были", "есть", "для", "при", "про", "или", "его", "еще", "ещё",
+        "лет", "год", "года", "году", "последний", "последняя", "последнее", "сейчас", "сегодня",
+        "how", "many", "much", "what", "which", "who", "whom", "when", "where", "why", "the",
+        "and", "for", "are", "was", "were", "did", "does", "year", "years", "last", "latest",
+        "current", "now", "today",
+    }
+)
+
+WORD_PATTERN = re.compile(r"\w+")
+SECTION_PATTERN = re.compile(r"\n(?==+ )")
+HEADING_PATTERN = re.compile(r"=+ *(.*?) *=+")
+PARAGRAPH_PATTERN = re.compile(r"\n\s*\n")
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+")
+
+
+@dataclass
+class Passage:
+    title: str
+    text: str
+    score: float
+    coverage: float
+
+
+def query_terms(text: str) -> list[str]:
+    """Split text into distinct stemmed search terms, leaving out `STOP_WORDS`
+
+    Args:
+        text (str): query
+
+    Returns:
+        list[str]: lowercase term prefixes in query order
+    """
+    terms = []
+    for word in WORD_PATTERN.findall(text.lower()):
+        if word in STOP_WORDS:
+            continue
+        term = word[:STEM_CHARS]
+        if len(term) >= MIN_TERM_CHARS and term not in terms:
+            terms.append(term)
+    return terms
+
+
+def split_passages(text: str, max_chars: int = DEFAULT_PASSAGE_CHARS) -> list[str]:
+    """Split page text into passages of whole paragraphs
+
+    Passages do not cross "== Section ==" headings and start with the
+    section title. Short paragraphs are merged up to `max_chars`, longer
+    ones are split on sentence boundaries.
+
+    Args:
+        text (str): page text
+        max_chars (int): passage size limit
+
+    Returns:
+        list[str]: passages in page order
+    """
+    passages = []
+    for section in SECTION_PATTERN.split(text):
+        heading_match = HEADING_PATTERN.match(section.strip())
+        heading = heading_match.group(1) if heading_match else ""
+        body = section.strip()[heading_match.end() :] if heading_match else section
+
+        pieces = []
+        for paragraph in PARAGRAPH_PATTERN.split(body):
+            paragraph = paragraph.strip()
+            if len(paragraph) <= max_chars:
+                pieces.append(paragraph)
+            else:
+                pieces.extend(SENTENCE_PATTERN.split(paragraph))
+
+        current = ""
+        for piece in filter(None, pieces):
+            if current and len(current) + len(piece) + 1 > max_chars:
+                passages.append(f"{heading}\n{current}" if heading else current)
+                current = ""
+            current = f"{current}\n{piece}" if current else piece
+        if current:
+            passages.append(f"{heading}\n{current}" if heading else current)
+    return passages
+
+
+class PassageIndex:
+    """Local BM25 index of page passages in SQLite FTS5.
+
+    Pages are split into passages once when added. A search returns the
+    top passages with their BM25 score and their coverage: the share of
+    the query terms found anywhere in the index that the passage contains.
+    Callers use it to decide whether the local pages answer the query.
+    """
+
+    def __init__(self, path: str, passage_chars: int = DEFAULT_PASSAGE_CHARS) -> None:
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.passage_chars = passage_chars
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "lang TEXT NOT NULL, title TEXT NOT NULL, fetched_at REAL NOT NULL, "
+            "PRIMARY KEY (lang, title))"
+        )
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS passages USING fts5("
+            "title, text, lang UNINDEXED, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+    def add_page(self, title: str, content: str, lang: str) -> int:
+        """Index page passages unless the page is indexed already
+
+        Args:
+            title (str): page title
+            content (str): page text
+            lang (str): page language
+
+        Returns:
+            int: number of added passages
+        """
+        passages = split_passages(content, self.passage_chars)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO pages (lang, title, fetched_at) VALUES (?, ?, ?)",
+                    (lang, title, time.time()),
+                )
+                if not cursor.rowcount:
+                    self._conn.execute("ROLLBACK")
+                    return 0
+                self._conn.executemany(
+                    "INSERT INTO passages (title, text, lang) VALUES (?, ?, ?)",
+                    [(title, passage, lang) for passage in passages],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(passages)
+
+    def search(self, query: str, lang: str, k: int = DEFAULT_TOP_K) -> list[Passage]:
+        """Find the passages most relevant to the query
+
+        Args:
+            query (str): search query
+            lang (str): page language
+            k (int): number of passages
+
+        Returns:
+            list[Passage]: best passages first
+        """
+        terms = query_terms(query)
+        if not terms:
+            return []
+        match = " OR ".join(f'"{term}"*' for term in terms)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT title, text, bm25(passages, ?, 1.0) AS score FROM passages "
+                "WHERE passages MATCH ? AND lang = ? ORDER BY score LIMIT ?",
+                (TITLE_WEIGHT, match, lang, k),
+            ).fetchall()
+            # A term no page has cannot tell the local pages apart
+            terms = [
+                term
+                for term in terms
+                if self._conn.execute(
+                    "SELECT 1 FROM passages WHERE passages MATCH ? AND lang = ? LIMIT 1",
+                    (f'"{term}"*', lang),
+                ).fetchone()
+            ]
+        passages = []
+        for title, text, score in rows:
+            stems = {word[:STEM_CHARS] for word in WORD_PATTERN.findall(f"{title} {text}".lower())}
+            matched = sum(any(stem.startswith(term) for stem in stems) for term in terms)
+            # FTS5 bm25 is negative, lower is better
+            passages.append(Passage(title, text, -score, matched / len(terms)))
+        return passages
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+@cache
+def get_passage_index() -> PassageIndex:
+    from settings import settings
+
+    return PassageIndex(settings.passage_index_path)
@@ -0,0 +1,47 @@
+from functools import lru_cache
+
+from langchain_core.messages import BaseMessage, SystemMessage
+from langchain_core.prompts import SystemMessagePromptTemplate
+
+DEFAULT_MAX_MESSAGES = 10
+
+
+@lru_cache(maxsize=256)
+def render_system_message(template: str, domain: str) -> SystemMessage:
+    """Render system prompt template for a domain, once per (template, domain)
+
+    Args:
+        template (str): f-string template with a {domain} variable
+        domain (str): expertise domain
+
+    Returns:
+        SystemMessage: rendered system message, shared between callers
+    """
+    return SystemMessagePromptTemplate.from_template(template).format(domain=domain)
+
+
+class PromptWindow:
+    """Prompt messages: a fixed system message and the last chat messages.
+
+    The prompt is kept as one list that is updated in place, so a turn
+    neither copies the history nor renders a template. Only the oldest
+    message is dropped when the window is full.
+    """
+
+    def __init__(self, system_message: SystemMessage, max_messages: int = DEFAULT_MAX_MESSAGES) -> None:
+        self.max_messages = max_messages
+        self._messages: list[BaseMessage] = [system_message]
+
+    @property
+    def messages(self) -> list[BaseMessage]:
+        """System message followed by the window, the live list, do not modify"""
+        return self._messages
+
+    @property
+    def history(self) -> list[BaseMessage]:
+        return self._messages[1:]
+
+    def append(self, message: BaseMessage) -> None:
+        self._messages.append(message)
+        if len(self._messages) - 1 > self.max_messages:
+            del self._messages[1]
@@ -1,7 +1,20 @@
 import cmath
 import math
+from typing import Any, Sequence
 
-from langchain_core.runnables import RunnableBranch, RunnableLambda
+import numpy as np
+from langchain_core.runnables import Runnable, RunnableBranch, RunnableLambda
+from langchain_core.runnables.config import RunnableConfig
+
+from runnable_compiler import compile_runnable
+
+TWO_ROOTS = 2
+ONE_ROOT = 1
+COMPLEX_ROOTS = 0
+
+ROOTS_DTYPE = np.dtype(
+    [("D", np.float64), ("roots", np.int8), ("x1", np.complex128), ("x2", np.complex128)]
+)
 
 
 def calc_discriminant(coef: dict[str, float]) -> dict[str, float]:
@@ -17,7 +30,7 @@ def calc_two_root(coef: dict[str, float]) -> dict[str, float]:
 
 
 def calc_one_root(coef: dict[str, float]) -> dict[str, float]:
-    return {"x": -coef["b"] / 2 * coef["a"]}
+    return {"x": -coef["b"] / (2 * coef["a"])}
 
 
 def calc_complex_roots(coef: dict[str, float]) -> dict[str, complex]:
@@ -41,6 +54,109 @@ branch = RunnableBranch(
 )
 
 pipeline = RunnableLambda(calc_discriminant) | branch
+# Same results as `pipeline` without the per-call Runnable machinery
+compiled_pipeline = compile_runnable(pipeline)
+
+
+def solve_quadratic_batch(a: np.ndarray, b: np.ndarray, c: np.ndarray) -> np.ndarray:
+    """Solve a * x^2 + b * x + c = 0 for arrays of coefficients
+
+    Args:
+        a (np.ndarray): a coefficients
+        b (np.ndarray): b coefficients
+        c (np.ndarray): c coefficients
+
+    Returns:
+        np.ndarray: structured array with fields D, roots (TWO_ROOTS, ONE_ROOT
+        or COMPLEX_ROOTS), x1 and x2. For ONE_ROOT x1 == x2. Rows with
+        a == 0 are not quadratic, their x1 and x2 are NaN.
+    """
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    c = np.asarray(c, dtype=np.float64)
+
+    result = np.empty(np.broadcast_shapes(a.shape, b.shape, c.shape), dtype=ROOTS_DTYPE)
+    d = b * b - 4 * a * c
+    result["D"] = d
+
+    real = d >= 0
+    result["roots"] = np.where(d > 0, TWO_ROOTS, np.where(real, ONE_ROOT, COMPLEX_ROOTS))
+
+    two_a = np.where(a == 0, np.nan, 2 * a)
+    sqrt_d = np.sqrt(np.abs(d))
+    x1 = result["x1"]
+    x2 = result["x2"]
+    x1.real = np.where(real, (-b + sqrt_d) / two_a, -b / two_a)
+    x2.real = np.where(real, (-b - sqrt_d) / two_a, -b / two_a)
+    x1.imag = np.where(real, 0.0, sqrt_d / two_a)
+    x2.imag = -x1.imag
+    return result
+
+
+def _roots_to_dicts(roots: np.ndarray) -> list[dict[str, Any]]:
+    results = []
+    for kind, x1, x2 in zip(
+        roots["roots"].tolist(), roots["x1"].tolist(), roots["x2"].tolist()
+    ):
+        if kind == TWO_ROOTS:
+            results.append({"x1": x1.real, "x2": x2.real})
+        elif kind == ONE_ROOT:
+            results.append({"x": x1.real})
+        else:
+            results.append({"x1": x1, "x2": x2})
+    return results
+
+
+class QuadraticBatchSolver(Runnable[dict[str, float], dict[str, Any]]):
+    """Drop-in for `pipeline` whose `batch` solves all inputs at once with NumPy.
+
+    Like `pipeline`, an input with a == 0 raises ZeroDivisionError, or gets
+    it as its result with `return_exceptions`.
+    """
+
+    def invoke(
+        self, input: dict[str, float], config: RunnableConfig | None = None, **kwargs: Any
+    ) -> dict[str, Any]:
+        return self.batch([input], config)[0]
+
+    def batch(
+        self,
+        inputs: list[dict[str, float]],
+        config: RunnableConfig | list[RunnableConfig] | None = None,
+        *,
+        return_exceptions: bool = False,
+        **kwargs: Any,
+    ) -> list[dict[str, Any]]:
+        a = np.asarray([coef["a"] for coef in inputs], dtype=np.float64)
+        roots = self.solve(a, [coef["b"] for coef in inputs], [coef["c"] for coef in inputs])
+        results = _roots_to_dicts(roots)
+        for index in np.flatnonzero(a == 0).tolist():
+            error = ZeroDivisionError("float division by zero")
+            if not return_exceptions:
+                raise error
+            results[index] = error  # pyright: ignore[reportCallIssue, reportArgumentType]
+        return results
+
+    async def abatch(
+        self,
+        inputs: list[dict[str, float]],
+        config: RunnableConfig | list[RunnableConfig] | None = None,
+        *,
+        return_exceptions: bool = False,
+        **kwargs: Any,
+    ) -> list[dict[str, Any]]:
+        return self.batch(inputs, config, return_exceptions=return_exceptions)
+
+    @staticmethod
+    def solve(a: Sequence[float], b: Sequence[float], c: Sequence[float]) -> np.ndarray:
+        return solve_quadratic_batch(np.asarray(a), np.asarray(b), np.asarray(c))
+
+
+batch_pipeline = QuadraticBatchSolver()
+
 
-print(pipeline.invoke({"a": 1, "b": 6, "c": -4}))
-print(pipeline.get_graph().print_ascii())
+if __name__ == "__main__":
+    print(pipeline.invoke({"a": 1, "b": 6, "c": -4}))
+    print(compiled_pipeline.invoke({"a": 1, "b": 6, "c": -4}))
+    print(pipeline.get_graph().print_ascii())
+    print(batch_pipeline.batch([{"a": 1, "b": 6, "c": -4}, {"a": 1, "b": 2, "c": 5}]))
@@ -0,0 +1,183 @@
+import inspect
+from typing import Any, Callable, Generic, TypeVar
+
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.runnables import (
+    Runnable,
+    RunnableBranch,
+    RunnableLambda,
+    RunnableParallel,
+    RunnablePassthrough,
+    RunnableSequence,
+)
+from langchain_core.runnables.config import RunnableConfig
+from langchain_core.runnables.passthrough import RunnableAssign, RunnablePick
+from langchain_core.runnables.utils import AddableDict, accepts_config, accepts_run_manager
+
+Input = TypeVar("Input")
+Output = TypeVar("Output")
+
+Step = Callable[[Any], Any]
+
+
+class NotCompilableError(TypeError):
+    pass
+
+
+def _compile_lambda(runnable: RunnableLambda) -> Step:
+    func = getattr(runnable, "func", None)
+    if func is None:
+        raise NotCompilableError(f"{runnable} has no sync function")
+    if inspect.isgeneratorfunction(func) or accepts_config(func) or accepts_run_manager(func):
+        raise NotCompilableError(f"{runnable} streams or needs the runnable config")
+
+    def call(value: Any) -> Any:
+        output = func(value)
+        # Same as RunnableLambda: a returned runnable is invoked with the input
+        return output.invoke(value) if isinstance(output, Runnable) else output
+
+    return call
+
+
+def _compile_sequence(runnable: RunnableSequence) -> Step:
+    steps = [_compile(step) for step in runnable.steps]
+    if len(steps) == 2:
+        first, second = steps
+        return lambda value: second(first(value))
+
+    def call(value: Any) -> Any:
+        for step in steps:
+            value = step(value)
+        return value
+
+    return call
+
+
+def _compile_branch(runnable: RunnableBranch) -> Step:
+    branches = [(_compile(condition), _compile(branch)) for condition, branch in runnable.branches]
+    default = _compile(runnable.default)
+
+    def call(value: Any) -> Any:
+        for condition, branch in branches:
+            if condition(value):
+                return branch(value)
+        return default(value)
+
+    return call
+
+
+def _compile_parallel(runnable: RunnableParallel) -> Step:
+    steps = [(key, _compile(step)) for key, step in runnable.steps__.items()]
+    return lambda value: {key: step(value) for key, step in steps}
+
+
+def _compile_assign(runnable: RunnableAssign) -> Step:
+    mapper = _compile_parallel(runnable.mapper)
+    return lambda value: {**value, **mapper(value)}
+
+
+def _compile_pick(runnable: RunnablePick) -> Step:
+    keys = runnable.keys
+    if isinstance(keys, str):
+        return lambda value: value.get(keys)
+
+    def call(value: Any) -> Any:
+        picked = {key: value[key] for key in keys if key in value}
+        return AddableDict(picked) if picked else None
+
+    return call
+
+
+def _compile_passthrough(runnable: RunnablePassthrough) -> Step:
+    func = runnable.func
+    if func is None:
+        return lambda value: value
+    if accepts_config(func) or inspect.iscoroutinefunction(func):
+        raise NotCompilableError(f"{runnable} needs the runnable config")
+
+    def call(value: Any) -> Any:
+        func(value)
+        return value
+
+    return call
+
+
+def _compile(runnable: Runnable) -> Step:
+    if isinstance(runnable, BaseLanguageModel):
+        raise NotCompilableError(f"{runnable.get_name()} is a model, only pure-CPU pipelines compile")
+    if isinstance(runnable, CompiledRunnable):
+        return runnable.func
+    # Subclasses first: RunnableAssign and RunnablePick are not passthroughs
+    for runnable_type, compile_step in (
+        (RunnableLambda, _compile_lambda),
+        (RunnableSequence, _compile_sequence),
+        (RunnableBranch, _compile_branch),
+        (RunnableParallel, _compile_parallel),
+        (RunnableAssign, _compile_assign),
+        (RunnablePick, _compile_pick),
+        (RunnablePassthrough, _compile_passthrough),
+    ):
+        if type(runnable) is runnable_type:
+            return compile_step(runnable)  # pyright: ignore[reportArgumentType]
+    raise NotCompilableError(f"cannot compile {type(runnable).__name__}")
+
+
+class CompiledRunnable(Runnable[Input, Output], Generic[Input, Output]):
+    """Runnable pipeline flattened into one plain Python callable.
+
+    Calling it, or `invoke` without tracing, runs the steps as nested
+    function calls without config merging, callback managers or per-step
+    runs. With `trace=True`, `invoke` reports the whole pipeline as one
+    run to the callbacks of the config; steps are not traced one by one.
+    """
+
+    def __init__(self, func: Callable[[Input], Output], source: Runnable, trace: bool = False) -> None:
+        self.func = func
+        self.source = source
+        self.trace = trace
+        self.name = source.get_name()
+
+    def __call__(self, input: Input) -> Output:
+        return self.func(input)
+
+    def invoke(self, input: Input, config: RunnableConfig | None = None, **kwargs: Any) -> Output:
+        if self.trace:
+            return self._call_with_config(self.func, input, config)
+        return self.func(input)
+
+    def batch(
+        self,
+        inputs: list[Input],
+        config: RunnableConfig | list[RunnableConfig] | None = None,
+        *,
+        return_exceptions: bool = False,
+        **kwargs: Any,
+    ) -> list[Output]:
+        if self.trace:
+            return super().batch(inputs, config, return_exceptions=return_exceptions, **kwargs)
+        if not return_exceptions:
+            return [self.func(input) for input in inputs]
+        outputs: list[Any] = []
+        for input in inputs:
+            try:
+                outputs.append(self.func(input))
+            except Exception as error:
+                outputs.append(error)
+        return outputs
+
+
+def compile_runnable(runnable: Runnable[Input, Output], trace: bool = False) -> CompiledRunnable[Input, Output]:
+    """Compile a pipeline of lambdas, sequences, branches, parallel maps,
+    assigns, picks and passthroughs into one callable
+
+    Args:
+        runnable (Runnable[Input, Output]): pipeline without model or async-only steps
+        trace (bool): report every `invoke` as one run to the config callbacks
+
+    Raises:
+        NotCompilableError: the pipeline has a step that cannot be compiled
+
+    Returns:
+        CompiledRunnable[Input, Output]: runnable with the same results
+    """
+    return CompiledRunnable(_compile(runnable), runnable, trace)
@@ -0,0 +1,226 @@
+import asyncio
+import json
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Iterator, Sequence
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel, LanguageModelInput
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable
+from langchain_core.tools import BaseTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import PrivateAttr
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model replaying scripted responses in a loop, without network.
+
+    `latency` is slept before the first token and `token_latency` between
+    streamed chunks, to simulate a remote model.
+    """
+
+    responses: list[AIMessage]
+    latency: float = 0.0
+    token_latency: float = 0.0
+    _position: int = PrivateAttr(default=0)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(
+        self, tools: Sequence[dict[str, Any] | type | BaseTool], **kwargs: Any
+    ) -> Runnable[LanguageModelInput, AIMessage]:
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    @property
+    def calls(self) -> int:
+        return self._position
+
+    def reset(self) -> None:
+        with self._lock:
+            self._position = 0
+
+    def _next_response(self, messages: list[BaseMessage]) -> AIMessage:
+        with self._lock:
+            response = self.responses[self._position % len(self.responses)]
+            self._position += 1
+        output_tokens = len(_split_words(response.text)) + len(response.tool_calls)
+        input_tokens = count_tokens_approximately(messages)
+        return response.model_copy(
+            update={
+                "id": None,
+                "usage_metadata": {
+                    "input_tokens": input_tokens,
+                    "output_tokens": output_tokens,
+                    "total_tokens": input_tokens + output_tokens,
+                },
+            }
+        )
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        response = self._next_response(messages)
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=response)])
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        response = self._next_response(messages)
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=response)])
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        response = self._next_response(messages)
+        time.sleep(self.latency)
+        for index, chunk in enumerate(_response_chunks(response)):
+            if index and self.token_latency:
+                time.sleep(self.token_latency)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        response = self._next_response(messages)
+        await asyncio.sleep(self.latency)
+        for index, chunk in enumerate(_response_chunks(response)):
+            if index and self.token_latency:
+                await asyncio.sleep(self.token_latency)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+def _split_words(text: str) -> list[str]:
+    return re.findall(r"\s*\S+", text)
+
+
+def _response_chunks(response: AIMessage) -> list[ChatGenerationChunk]:
+    chunks = [
+        ChatGenerationChunk(message=AIMessageChunk(content=word))
+        for word in _split_words(response.text)
+    ]
+    chunks.append(
+        ChatGenerationChunk(
+            message=AIMessageChunk(
+                content="",
+                usage_metadata=response.usage_metadata,
+                tool_call_chunks=[
+                    {
+                        "name": tool_call["name"],
+                        "args": json.dumps(tool_call["args"]),
+                        "id": tool_call["id"],
+                        "index": index,
+                    }
+                    for index, tool_call in enumerate(response.tool_calls)
+                ],
+            )
+        )
+    )
+    return chunks
+
+
+def scripted_response(
+    content: str = "", tool_calls: Sequence[tuple[str, dict[str, Any]]] = ()
+) -> AIMessage:
+    """Build scripted model response
+
+    Args:
+        content (str): answer text
+        tool_calls (Sequence[tuple[str, dict[str, Any]]]): (tool name, args) pairs
+
+    Returns:
+        AIMessage: scripted response
+    """
+    return AIMessage(
+        content=content,
+        tool_calls=[
+            {"name": name, "args": args, "id": f"call{index:05d}"}
+            for index, (name, args) in enumerate(tool_calls)
+        ],
+    )
+
+
+def load_script(path: str) -> list[AIMessage]:
+    """Load scripted responses from JSONL
+
+    Every line is {"content": str, "tool_calls": [{"name": str, "args": dict}]}.
+
+    Args:
+        path (str): JSONL file path
+
+    Returns:
+        list[AIMessage]: scripted responses
+    """
+    responses = []
+    with open(path, encoding="utf-8") as script_file:
+        for line in script_file:
+            if not line.strip():
+                continue
+            response = json.loads(line)
+            responses.append(
+                scripted_response(
+                    response.get("content", ""),
+                    [
+                        (tool_call["name"], tool_call.get("args", {}))
+                        for tool_call in response.get("tool_calls", [])
+                    ],
+                )
+            )
+    return responses
+
+
+class ScriptedModelFactory:
+    """Model factory handing out one shared `ScriptedChatModel`."""
+
+    def __init__(
+        self,
+        responses: list[AIMessage],
+        latency: float = 0.0,
+        token_latency: float = 0.0,
+    ) -> None:
+        self.model = ScriptedChatModel(
+            responses=responses, latency=latency, token_latency=token_latency
+        )
+        self._models_with_tools: dict[tuple[str, ...], Runnable[LanguageModelInput, AIMessage]] = {}
+
+    def chat_model(self, model: str, temperature: float = 0) -> BaseChatModel:
+        return self.model
+
+    def chat_model_with_tools(
+        self, model: str, tools: Sequence[BaseTool], temperature: float = 0
+    ) -> Runnable[LanguageModelInput, AIMessage]:
+        key = tuple(tool.name for tool in tools)
+        if key not in self._models_with_tools:
+            self._models_with_tools[key] = self.model.bind_tools(tools)
+        return self._models_with_tools[key]
@@ -1,3 +1,5 @@
+from functools import cache
+
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -6,6 +8,24 @@ class Settings(BaseSettings):
     api_provider: str = Field()
     api_key: str = Field()
     tavily_api_key: str = Field()
+    order_store_path: str = Field(default="")
+    order_service_address: str = Field(default="")
+    lookup_cache_path: str = Field(default=".cache/lookups.db")
+    lookup_cache_ttl: float = Field(default=24 * 60 * 60)
+    passage_index_path: str = Field(default=".cache/passages.db")
+    llm_cache_backend: str = Field(default="none")
+    llm_cache_path: str = Field(default=".cache/llm.db")
+    scripted_llm_path: str = Field(default="")
+    scripted_llm_latency: float = Field(default=0.0)
+    agent_metrics_format: str = Field(default="")
+    agent_profile_dir: str = Field(default="")
+    checkpoint_path: str = Field(default="")
+    agent_thread_id: str = Field(default="default")
+    chat_history_path: str = Field(default="")
+    history_summary: bool = Field(default=False)
+    model_routing: bool = Field(default=True)
+    small_model: str = Field(default="mistral-small-2506")
+    large_model: str = Field(default="mistral-large-latest")
     model_config = SettingsConfigDict(
         env_file=".env", env_file_encoding="utf-8", extra="ignore"
     )
@@ -15,4 +35,17 @@ class Settings(BaseSettings):
         return f"https://{self.api_provider}/v1"
 
 
-settings = Settings()  # pyright: ignore[reportCallIssue]
+@cache
+def get_settings() -> Settings:
+    return Settings()  # pyright: ignore[reportCallIssue]
+
+
+def __getattr__(name: str) -> Settings:
+    # `from settings import settings` reads the environment on first use,
+    # so importing a module does not require its configuration
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+settings: Settings
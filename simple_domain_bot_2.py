@@ -1,69 +1,90 @@
-import os
+from functools import cache, lru_cache
+from typing import Any, Iterator
 
-from langchain_core.chat_history import InMemoryChatMessageHistory
-from langchain_core.messages import trim_messages
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.language_models import LanguageModelInput
+from langchain_core.messages import AIMessage
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import Runnable
 from langchain_core.runnables.history import RunnableWithMessageHistory
-from langchain_mistralai import ChatMistralAI
 
-from settings import settings
+from chat_history_store import SessionHistories
+from model_router import get_routed_chat_model
+from prompt_window import render_system_message
 
-if "MISTRAL_API_KEY" not in os.environ:
-    os.environ["MISTRAL_API_KEY"] = settings.api_key
+DEFAULT_SESSION_ID = "default"
+MAX_HISTORY_TOKENS = 4_000
+session_histories = SessionHistories(MAX_HISTORY_TOKENS)
 
 
-DEFAULT_SESSION_ID = "default"
-chat_history = InMemoryChatMessageHistory()
-
-
-messages = [
-    (
-        "system",
-        "You are an expert in {domain}. Your task is answer the question as short as possible",
-    ),
-    MessagesPlaceholder("history"),
-    ("human", "{question}"),
-]
-prompt = ChatPromptTemplate(messages)
-
-trimmer = trim_messages(
-    strategy="last",
-    token_counter=len,
-    max_tokens=10,
-    start_on="human",
-    end_on="human",
-    include_system=True,
-    allow_partial=False,
-)
-
-llm = ChatMistralAI(
-    model="mistral-large-latest",  # pyright: ignore[reportCallIssue]
-    temperature=0,
-)
-
-
-chain = prompt | trimmer | llm
-chain_with_history = RunnableWithMessageHistory(
-    chain,
-    lambda session_id: chat_history,
-    input_messages_key="question",
-    history_messages_key="history",
-)
-final_chain = chain_with_history | StrOutputParser()
-
-
-domain = input("Choice domain area: ")
-while True:
-    print()
-    user_question = input("You: ")
-    if user_question.startswith("/bye"):
-        break
-
-    print("Bot: ", end="")
-    for answer_chunk in final_chain.stream(
-        {"domain": domain, "question": user_question},
-        config={"configurable": {"session_id": DEFAULT_SESSION_ID}},
-    ):
-        print(answer_chunk, end="")
-    print()
+def get_session_history(session_id: str) -> BaseChatMessageHistory:
+    return session_histories.get(session_id)
+
+
+SYSTEM_TEMPLATE = "You are an expert in {domain}. Your task is answer the question as short as possible"
+
+@cache
+def get_llm() -> Runnable[LanguageModelInput, AIMessage]:
+    # Built on the first turn, so importing the bot creates no model client
+    return get_routed_chat_model()
+
+
+@lru_cache(maxsize=64)
+def domain_chain(domain: str) -> Runnable[dict[str, Any], str]:
+    """Build chat chain of a domain, once per domain
+
+    The system message is rendered here, so a turn only renders the question.
+
+    Args:
+        domain (str): expertise domain
+
+    Returns:
+        Runnable[dict[str, Any], str]: chain from {"question": str} to answer text
+    """
+    prompt = ChatPromptTemplate(
+        [
+            render_system_message(SYSTEM_TEMPLATE, domain),
+            MessagesPlaceholder("history"),
+            ("human", "{question}"),
+        ]
+    )
+    chain_with_history = RunnableWithMessageHistory(
+        prompt | get_llm(),
+        get_session_history,
+        input_messages_key="question",
+        history_messages_key="history",
+    )
+    return chain_with_history | StrOutputParser()
+
+
+def respond(question: str, domain: str, session_id: str = DEFAULT_SESSION_ID) -> Iterator[str]:
+    """Answer the question in the session
+
+    Args:
+        question (str): user question
+        domain (str): expertise domain
+        session_id (str): chat session id
+
+    Yields:
+        str: answer text chunks
+    """
+    with session_histories.turn(session_id):
+        yield from domain_chain(domain).stream(
+            {"question": question},
+            config={"configurable": {"session_id": session_id}},
+        )
+
+
+if __name__ == "__main__":
+    domain = input("Choice domain area: ")
+    while True:
+        print()
+        user_question = input("You: ")
+        if user_question.startswith("/bye"):
+            break
+
+        print("Bot: ", end="")
+        for answer_chunk in respond(user_question, domain):
+            print(answer_chunk, end="")
+        print()
@@ -0,0 +1,288 @@
+import json
+from functools import cache
+from typing import Annotated, Any, AsyncIterator, Generic, Iterator, TypeVar
+
+from langchain_core.exceptions import OutputParserException
+from langchain_core.messages import BaseMessageChunk
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+TBaseModel = TypeVar("TBaseModel", bound=BaseModel)
+
+# Text allowed before the opening brace, e.g. "```json" or a short preface
+DEFAULT_MAX_PREAMBLE_CHARS = 200
+SCALAR_TYPES = ("string", "integer", "number", "boolean")
+WHITESPACE = " \t\r\n"
+VALUE_START_CHARS = '"{[-0123456789tfn'
+
+PREAMBLE = 0
+KEY_OR_END = 1
+KEY_START = 2
+KEY = 3
+COLON = 4
+VALUE_START = 5
+VALUE = 6
+AFTER_VALUE = 7
+DONE = 8
+
+
+class _FieldSchema:
+    def __init__(self, pydantic_object: type[BaseModel]) -> None:
+        self.names: dict[str, str] = {}
+        self.adapters: dict[str, TypeAdapter[Any]] = {}
+        for name, field_info in pydantic_object.model_fields.items():
+            key = field_info.alias or name
+            self.names[key] = name
+            self.adapters[key] = TypeAdapter(Annotated[field_info.annotation, field_info])
+        properties = pydantic_object.model_json_schema()["properties"]
+        self.json_types = {key: properties.get(key, {}).get("type") for key in self.names}
+        self.forbid_extra = pydantic_object.model_config.get("extra") == "forbid"
+
+
+@cache
+def _field_schema(pydantic_object: type[BaseModel]) -> _FieldSchema:
+    return _FieldSchema(pydantic_object)
+
+
+class StreamingPydanticOutputParser(Generic[TBaseModel]):
+    """Incremental parser of a JSON object into a pydantic model.
+
+    Text is fed chunk by chunk as the model streams it. Every field is
+    validated as soon as its value is complete, and parsing fails as soon
+    as the text can no longer become a valid object: broken JSON, a value
+    of the wrong JSON type or failing the field validation, an unknown key
+    if the model forbids extra fields, or a missing field at the closing
+    brace. Each character is scanned once.
+
+    A parser reads one stream at a time. Creating one per stream is cheap,
+    the field validators are built once per model.
+    """
+
+    def __init__(
+        self,
+        pydantic_object: type[TBaseModel],
+        max_preamble_chars: int = DEFAULT_MAX_PREAMBLE_CHARS,
+    ) -> None:
+        self.pydantic_object = pydantic_object
+        self.max_preamble_chars = max_preamble_chars
+        self._schema = _field_schema(pydantic_object)
+        self.reset()
+
+    def reset(self) -> None:
+        self.fields: dict[str, Any] = {}
+        self.result: TBaseModel | None = None
+        self._raw_values: dict[str, Any] = {}
+        self._chunks: list[str] = []
+        self._state = PREAMBLE
+        self._preamble_chars = 0
+        self._buffer: list[str] = []
+        self._key = ""
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._value_done = False
+
+    def _error(self, message: str) -> OutputParserException:
+        return OutputParserException(
+            f"Failed to parse {self.pydantic_object.__name__}: {message}",
+            llm_output="".join(self._chunks),
+        )
+
+    def feed(self, text: str) -> list[dict[str, Any] | TBaseModel]:
+        """Parse the next chunk of text
+
+        Args:
+            text (str): text chunk
+
+        Raises:
+            OutputParserException: the text cannot be a valid object
+
+        Returns:
+            list[dict[str, Any] | TBaseModel]: validated fields so far after every
+                field finished in this chunk, then the object if it is complete
+        """
+        self._chunks.append(text)
+        outputs: list[dict[str, Any] | TBaseModel] = []
+        for char in text:
+            if self._state == DONE:
+                break
+            if self._state == VALUE:
+                consumed = self._scan_value(char)
+                if not consumed or self._value_done:
+                    if self._finish_value():
+                        outputs.append(dict(self.fields))
+                if consumed:
+                    continue
+            if char in WHITESPACE and self._state not in (PREAMBLE, KEY):
+                continue
+
+            if self._state == PREAMBLE:
+                if char == "{":
+                    self._state = KEY_OR_END
+                else:
+                    self._preamble_chars += 1
+                    if self._preamble_chars > self.max_preamble_chars:
+                        raise self._error("no JSON object at the start of the output")
+            elif self._state in (KEY_OR_END, KEY_START):
+                if char == '"':
+                    self._state = KEY
+                elif char == "}" and self._state == KEY_OR_END:
+                    outputs.append(self._finish_object())
+                else:
+                    raise self._error(f"expected a key, got {char!r}")
+            elif self._state == KEY:
+                if char == '"' and not self._escaped:
+                    self._finish_key()
+                    self._state = COLON
+                else:
+                    self._escaped = char == "\\" and not self._escaped
+                    self._buffer.append(char)
+            elif self._state == COLON:
+                if char != ":":
+                    raise self._error(f"expected ':' after {self._key!r}, got {char!r}")
+                self._state = VALUE_START
+            elif self._state == VALUE_START:
+                self._start_value(char)
+            elif self._state == AFTER_VALUE:
+                if char == ",":
+                    self._state = KEY_START
+                elif char == "}":
+                    outputs.append(self._finish_object())
+                else:
+                    raise self._error(f"expected ',' or '}}' after {self._key!r}, got {char!r}")
+        return outputs
+
+    def _finish_key(self) -> None:
+        try:
+            self._key = json.loads(f'"{"".join(self._buffer)}"')
+        except json.JSONDecodeError as error:
+            raise self._error(f"invalid key: {error}") from error
+        self._buffer = []
+        self._escaped = False
+        if self._schema.forbid_extra and self._key not in self._schema.names:
+            raise self._error(f"unexpected field {self._key!r}")
+
+    def _start_value(self, char: str) -> None:
+        if char not in VALUE_START_CHARS:
+            raise self._error(f"invalid value of {self._key!r} starting with {char!r}")
+        json_type = self._schema.json_types.get(self._key)
+        if json_type in SCALAR_TYPES and char in "{[":
+            raise self._error(f"{self._key!r} must be a {json_type}")
+        if json_type == "string" and char != '"':
+            raise self._error(f"{self._key!r} must be a string")
+        self._buffer = [char]
+        self._depth = 1 if char in "{[" else 0
+        self._in_string = char == '"'
+        self._escaped = False
+        self._value_done = False
+        self._state = VALUE
+
+    def _scan_value(self, char: str) -> bool:
+        """Consume a value character, False if the value ended before it"""
+        if self._in_string:
+            self._buffer.append(char)
+            if self._escaped:
+                self._escaped = False
+            elif char == "\\":
+                self._escaped = True
+            elif char == '"':
+                self._in_string = False
+                self._value_done = self._depth == 0
+            return True
+        if self._depth == 0:
+            if char in WHITESPACE or char in ",}":
+                return False
+            self._buffer.append(char)
+            return True
+        self._buffer.append(char)
+        if char == '"':
+            self._in_string = True
+        elif char in "{[":
+            self._depth += 1
+        elif char in "}]":
+            self._depth -= 1
+            self._value_done = self._depth == 0
+        return True
+
+    def _finish_value(self) -> bool:
+        """Store the finished value, True if it is a field of the model"""
+        try:
+            value = json.loads("".join(self._buffer))
+        except json.JSONDecodeError as error:
+            raise self._error(f"invalid value of {self._key!r}: {error}") from error
+        self._buffer = []
+        self._state = AFTER_VALUE
+        self._raw_values[self._key] = value
+        adapter = self._schema.adapters.get(self._key)
+        if adapter is None:
+            return False
+        try:
+            self.fields[self._schema.names[self._key]] = adapter.validate_python(value)
+        except ValidationError as error:
+            raise self._error(f"invalid value of {self._key!r}: {error}") from error
+        return True
+
+    def _finish_object(self) -> TBaseModel:
+        self._state = DONE
+        try:
+            self.result = self.pydantic_object.model_validate(self._raw_values)
+        except ValidationError as error:
+            raise self._error(str(error)) from error
+        return self.result
+
+    def parse_stream(
+        self, chunks: Iterator[BaseMessageChunk | str]
+    ) -> Iterator[dict[str, Any] | TBaseModel]:
+        """Parse a streamed model answer, stopping the stream as soon as possible
+
+        The stream is closed once the object is complete or cannot be
+        valid any more, which cancels the rest of the generation.
+
+        Args:
+            chunks (Iterator[BaseMessageChunk | str]): model stream
+
+        Raises:
+            OutputParserException: the answer cannot be a valid object
+
+        Yields:
+            dict[str, Any] | TBaseModel: validated fields so far after every
+                finished field, then the complete object
+        """
+        self.reset()
+        try:
+            for chunk in chunks:
+                yield from self.feed(chunk if isinstance(chunk, str) else chunk.text)
+                if self.result is not None:
+                    return
+            raise self._error("the output ended before the object was complete")
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+
+    async def aparse_stream(
+        self, chunks: AsyncIterator[BaseMessageChunk | str]
+    ) -> AsyncIterator[dict[str, Any] | TBaseModel]:
+        """Async version of `parse_stream`
+
+        Args:
+            chunks (AsyncIterator[BaseMessageChunk | str]): model stream
+
+        Raises:
+            OutputParserException: the answer cannot be a valid object
+
+        Yields:
+            dict[str, Any] | TBaseModel: validated fields so far after every
+                finished field, then the complete object
+        """
+        self.reset()
+        try:
+            async for chunk in chunks:
+                for output in self.feed(chunk if isinstance(chunk, str) else chunk.text):
+                    yield output
+                if self.result is not None:
+                    return
+            raise self._error("the output ended before the object was complete")
+        finally:
+            aclose = getattr(chunks, "aclose", None)
+            if aclose is not None:
+                await aclose()
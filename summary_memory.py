@@ -0,0 +1,208 @@
+import logging
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import cache
+from typing import Callable, Iterable, Sequence
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage, SystemMessage, get_buffer_string
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+from token_budget import TokenBudgetChatMessageHistory
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SUMMARY_TOKENS = 400
+MAX_FACTS = 20
+MAX_SUMMARY_WORKERS = 4
+
+Summarizer = Callable[[str, list[BaseMessage]], str]
+FactExtractor = Callable[[list[BaseMessage]], Iterable[str]]
+# Summary and facts, called after every summarized batch
+SummarySaver = Callable[[str, list[str]], None]
+
+summary_executor = ThreadPoolExecutor(max_workers=MAX_SUMMARY_WORKERS, thread_name_prefix="summary")
+
+SUMMARY_PROMPT = ChatPromptTemplate(
+    [
+        (
+            "system",
+            "You keep a running summary of a conversation between a consumer and an assistant. "
+            "Merge the new messages into the summary. Keep every order id, item id, name and "
+            "number exactly as written, drop greetings and small talk. Answer with the summary "
+            "only, at most {max_words} words.",
+        ),
+        ("human", "Summary so far:\n{summary}\n\nNew messages:\n{messages}"),
+    ]
+)
+
+
+def summarize_with_model(
+    model: BaseChatModel, max_words: int = DEFAULT_MAX_SUMMARY_TOKENS // 2
+) -> Summarizer:
+    """Build a summarizer folding messages into the summary with a chat model
+
+    Args:
+        model (BaseChatModel): chat model writing the summary
+        max_words (int): summary length asked from the model
+
+    Returns:
+        Summarizer: function from the summary so far and new messages to the new summary
+    """
+    chain = SUMMARY_PROMPT.partial(max_words=str(max_words)) | model | StrOutputParser()
+
+    def summarize(summary: str, messages: list[BaseMessage]) -> str:
+        return chain.invoke({"summary": summary or "(empty)", "messages": get_buffer_string(messages)})
+
+    return summarize
+
+
+@cache
+def get_summarizer() -> Summarizer:
+    from llm_factory import get_chat_model
+    from settings import settings
+
+    return summarize_with_model(get_chat_model(settings.small_model))
+
+
+class SummarizingChatMessageHistory(BaseChatMessageHistory):
+    """Token budget chat history keeping a summary of the messages it drops.
+
+    Messages leaving the window of `history` are folded into a running
+    summary by `summarize` on a worker thread, one batch at a time per
+    session, so adding messages never waits for the model. The finished
+    summary replaces the previous one in a single assignment and is shown
+    as a system message before the window. Facts from `extract_facts`,
+    such as the ids of created orders, are taken from the dropped messages
+    at once and kept verbatim next to the summary.
+
+    `max_summary_tokens` is taken from the window budget of `history`, and
+    a summary longer than that is cut, so the prompt never grows past the
+    budget the history was opened with.
+
+    `summary` and `facts` continue a summary saved earlier. `save_summary`
+    gets the summary and facts after every batch, on the worker thread, so
+    a reopened session still knows what left its window; messages dropped
+    but not yet summarized when the process stops are lost.
+    """
+
+    def __init__(
+        self,
+        history: TokenBudgetChatMessageHistory,
+        summarize: Summarizer,
+        extract_facts: FactExtractor | None = None,
+        max_summary_tokens: int = DEFAULT_MAX_SUMMARY_TOKENS,
+        executor: Executor = summary_executor,
+        summary: str = "",
+        facts: Iterable[str] = (),
+        save_summary: SummarySaver | None = None,
+    ) -> None:
+        if history.max_tokens <= max_summary_tokens:
+            raise ValueError(f"history budget {history.max_tokens} leaves no room for the summary")
+        history.max_tokens -= max_summary_tokens
+        history.on_evict = self._evicted
+        self.history = history
+        self.summarize = summarize
+        self.extract_facts = extract_facts
+        self.max_summary_tokens = max_summary_tokens
+        self.executor = executor
+        self.save_summary = save_summary
+        self.summary = summary
+        self.facts: dict[str, None] = dict.fromkeys(facts)
+        self._summary_message = self._render()
+        self._pending: list[BaseMessage] = []
+        self._running = False
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    @property
+    def messages(self) -> list[BaseMessage]:  # pyright: ignore[reportIncompatibleVariableOverride]
+        summary_message = self._summary_message
+        window = self.history.messages
+        return [summary_message, *window] if summary_message is not None else window
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        self.history.add_messages(messages)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._pending = []
+            self.summary = ""
+            self.facts = {}
+            self._summary_message = None
+        self.history.clear()
+
+    def wait_for_summary(self, timeout: float | None = None) -> bool:
+        """Wait until every dropped message is in the summary
+
+        Args:
+            timeout (float | None): seconds to wait, no limit if None
+
+        Returns:
+            bool: False if the timeout expired first
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._running, timeout)
+
+    def _evicted(self, messages: list[BaseMessage]) -> None:
+        # Runs inside add_messages: no model call here
+        facts = list(self.extract_facts(messages)) if self.extract_facts is not None else []
+        with self._lock:
+            self._pending.extend(messages)
+            if facts:
+                for fact in facts:
+                    self.facts.pop(fact, None)
+                    self.facts[fact] = None
+                while len(self.facts) > MAX_FACTS:
+                    del self.facts[next(iter(self.facts))]
+                self._summary_message = self._render()
+            start = not self._running
+            self._running = True
+        if start:
+            self.executor.submit(self._summarize_pending)
+
+    def _summarize_pending(self) -> None:
+        while True:
+            with self._lock:
+                batch, self._pending = self._pending, []
+                generation = self._generation
+                summary = self.summary
+                if not batch:
+                    self._running = False
+                    self._idle.notify_all()
+                    return
+            try:
+                summary = self.summarize(summary, batch)
+            except Exception:
+                logger.exception("history summary failed, %d messages left out", len(batch))
+            with self._lock:
+                if generation != self._generation:
+                    continue
+                self.summary = summary
+                self._summary_message = self._render()
+                # Under the lock, so a cleared session is never saved again
+                if self.save_summary is not None:
+                    try:
+                        self.save_summary(summary, list(self.facts))
+                    except Exception:
+                        logger.exception("saving history summary failed")
+
+    def _render(self) -> SystemMessage | None:
+        facts = "\n".join(f"- {fact}" for fact in self.facts)
+        summary = self.summary
+        while True:
+            sections = [f"Summary of the earlier conversation:\n{summary}"] if summary else []
+            if facts:
+                sections.append(f"Facts from the earlier conversation:\n{facts}")
+            if not sections:
+                return None
+            message = SystemMessage(content="\n\n".join(sections))
+            if not summary or self.history.token_counter(message) <= self.max_summary_tokens:
+                return message
+            # Cut the summary, never the facts
+            words = summary.split()
+            summary = " ".join(words[: len(words) * 3 // 4])
@@ -0,0 +1,84 @@
+from typing import Callable, Sequence
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage, HumanMessage
+from langchain_core.messages.utils import count_tokens_approximately
+
+DEFAULT_MAX_HISTORY_TOKENS = 4_000
+
+TokenCounter = Callable[[BaseMessage], int]
+EvictionHandler = Callable[[list[BaseMessage]], None]
+
+
+def approximate_token_count(message: BaseMessage) -> int:
+    return count_tokens_approximately([message])
+
+
+class TokenBudgetChatMessageHistory(BaseChatMessageHistory):
+    """Chat history that exposes only the last messages fitting a token budget.
+
+    Every message is counted once when it is added and the window start
+    only moves forward, so keeping the window costs O(new messages) per
+    turn. The window always starts on a human message and never drops the
+    last one. Messages behind the window are released, so memory stays
+    bounded by the budget. `on_evict`, if set, gets the messages leaving
+    the window, in order, right before they are released.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = DEFAULT_MAX_HISTORY_TOKENS,
+        token_counter: TokenCounter = approximate_token_count,
+    ) -> None:
+        self.max_tokens = max_tokens
+        self.token_counter = token_counter
+        self._messages: list[BaseMessage] = []
+        self._token_counts: list[int] = []
+        self._window_start = 0
+        self._window_tokens = 0
+        self._last_human_index = 0
+        self.on_evict: EvictionHandler | None = None
+
+    @property
+    def messages(self) -> list[BaseMessage]:  # pyright: ignore[reportIncompatibleVariableOverride]
+        return self._messages[self._window_start :]
+
+    @property
+    def window_tokens(self) -> int:
+        return self._window_tokens
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        self._append(messages, [self.token_counter(message) for message in messages])
+
+    def _append(self, messages: Sequence[BaseMessage], token_counts: Sequence[int]) -> None:
+        for message, token_count in zip(messages, token_counts):
+            if isinstance(message, HumanMessage):
+                self._last_human_index = len(self._messages)
+            self._messages.append(message)
+            self._token_counts.append(token_count)
+            self._window_tokens += token_count
+        self._shrink_window()
+
+    def _shrink_window(self) -> None:
+        window_start = self._window_start
+        while self._window_start < self._last_human_index and (
+            self._window_tokens > self.max_tokens
+            or not isinstance(self._messages[self._window_start], HumanMessage)
+        ):
+            self._window_tokens -= self._token_counts[self._window_start]
+            self._window_start += 1
+        if self.on_evict is not None and self._window_start > window_start:
+            self.on_evict(self._messages[window_start : self._window_start])
+        # Released in halves, so trimming the lists stays amortized O(1)
+        if self._window_start > len(self._messages) // 2:
+            del self._messages[: self._window_start]
+            del self._token_counts[: self._window_start]
+            self._last_human_index -= self._window_start
+            self._window_start = 0
+
+    def clear(self) -> None:
+        self._messages = []
+        self._token_counts = []
+        self._window_start = 0
+        self._window_tokens = 0
+        self._last_human_index = 0
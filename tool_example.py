@@ -1,18 +1,8 @@
-import os
-
-from langchain_core.chat_history import InMemoryChatMessageHistory
 from langchain_core.messages import HumanMessage
 from langchain_core.tools import tool
-from langchain_mistralai import ChatMistralAI
 from pydantic import Field
 
-from settings import settings
-
-if "MISTRAL_API_KEY" not in os.environ:
-    os.environ["MISTRAL_API_KEY"] = settings.api_key
-
-DEFAULT_SESSION_ID = "default"
-chat_history = InMemoryChatMessageHistory()
+from llm_factory import get_chat_model_with_tools
 
 
 @tool
@@ -29,11 +19,7 @@ def solve_equation(
     return -b / a
 
 
-llm = ChatMistralAI(
-    model="mistral-large-latest",  # pyright: ignore[reportCallIssue]
-    temperature=0,
-)
-llm_with_tools = llm.bind_tools([solve_equation])
+llm_with_tools = get_chat_model_with_tools("mistral-large-latest", [solve_equation])
 
 
 ai_message = llm_with_tools.invoke("Solve equal 20x + 100 = 0")
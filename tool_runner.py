@@ -0,0 +1,163 @@
+import contextvars
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Mapping, Sequence
+
+from langchain_core.messages import ToolCall, ToolMessage
+from langchain_core.tools import BaseTool
+
+DEFAULT_TOOL_TIMEOUT = 30.0
+MAX_TOOL_WORKERS = 8
+# Timed out calls of one tool that may still hold a worker; past this,
+# calls of the tool fail at once instead of taking more workers
+MAX_STUCK_CALLS_PER_TOOL = 2
+
+# Tool name, run time in seconds or None if the call never ran, and whether the call failed
+ToolObserver = Callable[[str, float | None, bool], None]
+# Runs the tool call it gets on the worker thread, e.g. under a profiler
+ToolCallWrapper = Callable[[Callable[[], Any]], Any]
+
+tool_executor = ThreadPoolExecutor(max_workers=MAX_TOOL_WORKERS, thread_name_prefix="tool")
+
+_stuck_calls: Counter[str] = Counter()
+_stuck_lock = threading.Lock()
+
+
+class _ToolTimeout(Exception):
+    """Timeout of the runner, unlike a TimeoutError raised by the tool itself"""
+
+
+class _ToolRun:
+    def __init__(self, tool: BaseTool, tool_call: ToolCall) -> None:
+        self.tool = tool
+        self.tool_call = tool_call
+        self.started = threading.Event()
+        self.started_at = 0.0
+        self.finished = False
+        self.timed_out = False
+
+
+def _run_tool_call(
+    run: _ToolRun, observe_tool: ToolObserver | None, wrap_call: ToolCallWrapper | None
+) -> ToolMessage:
+    run.started_at = time.monotonic()
+    run.started.set()
+    started_at = time.perf_counter()
+    failed = True
+    try:
+        if wrap_call is None:
+            tool_result = run.tool.invoke(run.tool_call["args"])
+        else:
+            tool_result = wrap_call(lambda: run.tool.invoke(run.tool_call["args"]))
+        failed = False
+    finally:
+        with _stuck_lock:
+            run.finished = True
+            if run.timed_out:
+                _stuck_calls[run.tool.name] -= 1
+        # A timed out call was already reported as failed by the caller
+        if observe_tool is not None and not run.timed_out:
+            observe_tool(run.tool.name, time.perf_counter() - started_at, failed)
+    return ToolMessage(
+        content=tool_result,
+        name=run.tool_call["name"],
+        tool_call_id=run.tool_call["id"],  # pyright: ignore[reportArgumentType]
+    )
+
+
+def _wait_for_tool_call(future: Future[ToolMessage], run: _ToolRun, timeout: float) -> ToolMessage:
+    # The timeout runs from the start of the call, time queued for a worker
+    # is bounded separately so a busy pool cannot block the step forever
+    if not run.started.wait(timeout) and future.cancel():
+        raise _ToolTimeout(f"not started within {timeout}s, the tool pool is busy")
+    run.started.wait()
+    try:
+        return future.result(timeout=max(0.0, run.started_at + timeout - time.monotonic()))
+    except TimeoutError:
+        if future.done():
+            raise  # raised by the tool
+        with _stuck_lock:
+            if not run.finished:
+                run.timed_out = True
+                _stuck_calls[run.tool.name] += 1
+                raise _ToolTimeout(f"timed out after {timeout}s") from None
+        return future.result()
+
+
+def _error_message(tool_call: ToolCall, error: str) -> ToolMessage:
+    return ToolMessage(
+        content=f"Error: {error}",
+        name=tool_call["name"],
+        tool_call_id=tool_call["id"],  # pyright: ignore[reportArgumentType]
+        status="error",
+    )
+
+
+def run_tool_calls(
+    tool_calls: Sequence[ToolCall],
+    tools_by_name: Mapping[str, BaseTool],
+    timeouts: Mapping[str, float] | None = None,
+    executor: ThreadPoolExecutor = tool_executor,
+    observe_tool: ToolObserver | None = None,
+    wrap_call: ToolCallWrapper | None = None,
+) -> list[ToolMessage]:
+    """Run tool calls concurrently
+
+    A failed or timed out call becomes an error ToolMessage, the other
+    calls are not affected. `observe_tool` is called once per call, also
+    for unknown tools and timed out calls, which are reported as failed
+    when they time out; calls that never ran get None as their run time. The timeout of a call runs from when it starts
+    on a worker; a call still queued after its timeout is cancelled. A
+    timed out call cannot be stopped and keeps its worker until it
+    returns, so a tool with `MAX_STUCK_CALLS_PER_TOOL` such calls fails
+    new calls at once. Every call runs in a copy of the caller context, so
+    tools and `observe_tool` see the same run config as the caller.
+
+    Args:
+        tool_calls (Sequence[ToolCall]): tool calls of the AI message
+        tools_by_name (Mapping[str, BaseTool]): available tools
+        timeouts (Mapping[str, float] | None): timeout in seconds per tool name
+        executor (ThreadPoolExecutor): pool the calls run on
+        observe_tool (ToolObserver | None): called with tool name, run time in seconds
+            or None if the call never ran, and whether the call failed
+        wrap_call (ToolCallWrapper | None): runs every tool call on its worker
+
+    Returns:
+        list[ToolMessage]: tool results in the order of tool_calls
+    """
+    timeouts = timeouts or {}
+    runs: list[tuple[_ToolRun, Future[ToolMessage]] | str] = []
+    for tool_call in tool_calls:
+        tool = tools_by_name.get(tool_call["name"])
+        if tool is None:
+            runs.append(f"unknown tool {tool_call['name']}")
+        elif _stuck_calls[tool.name] >= MAX_STUCK_CALLS_PER_TOOL:
+            runs.append(f"{tool.name} is still running earlier calls that timed out")
+        else:
+            run = _ToolRun(tool, tool_call)
+            future = executor.submit(
+                contextvars.copy_context().run, _run_tool_call, run, observe_tool, wrap_call
+            )
+            runs.append((run, future))
+
+    outputs = []
+    for tool_call, run in zip(tool_calls, runs):
+        if isinstance(run, str):
+            if observe_tool is not None:
+                observe_tool(tool_call["name"], None, True)
+            outputs.append(_error_message(tool_call, run))
+            continue
+
+        timeout = timeouts.get(tool_call["name"], DEFAULT_TOOL_TIMEOUT)
+        try:
+            outputs.append(_wait_for_tool_call(run[1], run[0], timeout))
+        except _ToolTimeout as error:
+            if observe_tool is not None:
+                seconds = time.monotonic() - run[0].started_at if run[0].started.is_set() else None
+                observe_tool(tool_call["name"], seconds, True)
+            outputs.append(_error_message(tool_call, str(error)))
+        except Exception as error:
+            outputs.append(_error_message(tool_call, repr(error)))
+    return outputs